@@ -2,23 +2,21 @@ import streamlit as st
 from datetime import date, timedelta
 import os
 import uuid
-from PIL import Image, ImageDraw, ImageFont
-from pdf2image import convert_from_path, convert_from_bytes
-from io import BytesIO
-import textwrap
-from streamlit_drawable_canvas import st_canvas
-import pandas as pd
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-from email.header import Header
-from email.utils import formataddr
+from PIL import Image
 import re
 import json
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import threading
+import pdf_raster
+import form_render
+import field_checks
+import sheets_logger
+import school_directory
+import artifact_store
+import metrics
+import warmup
+import render_service
+# gspread·oauth2client·smtplib·email·numpy(signature)·캔버스 컴포넌트는
+# 처음 필요한 단계에서 불러오며(1단계는 Streamlit과 학교 조회표만 사용), warmup이 미리 불러 둡니다.
 
 PDF_TEMPLATE_PATH = "consent.pdf"
 TRANSFER_FORM_PATH = "transfer.pdf"
@@ -30,7 +28,24 @@ XLSX_FILE_PATH = "school_data.xlsx"
 MAIL_FROM = os.getenv("MAIL_FROM")
 MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
 SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = int(os.getenv("SMTP_PORT"))
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+MAIL_OUTBOX_PATH = os.getenv("MAIL_OUTBOX_PATH", "mail_outbox.sqlite3")
+DIGEST_INTERVAL_MINUTES = float(os.getenv("DIGEST_INTERVAL_MINUTES", "60"))
+DIGEST_ZIP = os.getenv("DIGEST_ZIP", "0") == "1"
+SHEETS_JOURNAL_PATH = os.getenv("SHEETS_JOURNAL_PATH", "sheets_journal.sqlite3")
+SHEETS_BATCH_SIZE = int(os.getenv("SHEETS_BATCH_SIZE", "20"))
+SHEETS_FLUSH_INTERVAL = float(os.getenv("SHEETS_FLUSH_INTERVAL", "10"))
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR")
+ARTIFACT_TTL = float(os.getenv("ARTIFACT_TTL", "3600"))
+ARTIFACT_MAX_MB = int(os.getenv("ARTIFACT_MAX_MB", "256"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_MAX_BACKLOG = int(os.getenv("RENDER_MAX_BACKLOG", "8"))
+SCHOOL_PICKER_LIMIT = int(os.getenv("SCHOOL_PICKER_LIMIT", "30"))
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_JSON_LOG = os.getenv("METRICS_JSON_LOG")
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "60"))
 
 # ────────────────────────────────────────────────────────
 def init_gspread_client():
@@ -38,6 +53,9 @@ def init_gspread_client():
     st.secrets["GSHEET"]["SERVICE_ACCOUNT_KEY"] 에 담긴 JSON 문자열을 파싱하여
     OAuth2 인증을 수행하고, gspread 클라이언트를 반환합니다.
     """
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
     service_account_info = json.loads(st.secrets["GSHEET"]["SERVICE_ACCOUNT_KEY"])
     scopes = [
         "https://spreadsheets.google.com/feeds",
@@ -72,16 +90,30 @@ def get_worksheet():
     except Exception:
         worksheet = sh.get_worksheet(0)
     return worksheet
+
+@st.cache_resource
+def get_sheets_logger():
+    """
+    프로세스당 하나의 시트 기록기를 만들고, 저널에 남은 행을 모아 올리는 스레드를 시작합니다.
+    """
+    logger = sheets_logger.SheetsLogger(
+        get_worksheet,
+        SHEETS_JOURNAL_PATH,
+        batch_size=SHEETS_BATCH_SIZE,
+        flush_interval=SHEETS_FLUSH_INTERVAL,
+    )
+    return logger.start()
 # ────────────────────────────────────────────────────────
 
 # ────────────────────────────────────────────────────────
+@metrics.timed("log_submission_to_sheets")
 def log_submission_to_sheets(school: str, grade: str, student_name: str, transfer_date: date):
     """
     제출 완료 시 호출합니다.
-    [타임스탬프(한국 시간), 학교명, 학생 성명, 전학 예정 학년, 전학 예정일] 순서로 시트에 한 줄을 추가합니다.
+    [타임스탬프(한국 시간), 학교명, 학생 성명, 전학 예정 학년, 전학 예정일] 순서로 한 줄을 저널에 쌓고,
+    시트에는 get_sheets_logger()가 모아서 기록합니다.
     """
     try:
-        ws = get_worksheet()
         # 기존 grade, student_name 처리 유지
         if not grade:
             grade = st.session_state.get("next_grade_input", "")
@@ -99,8 +131,9 @@ def log_submission_to_sheets(school: str, grade: str, student_name: str, transfe
 
         # 전학 예정일을 문자열로 변환 (ISO)
         transfer_date_str = transfer_date.strftime("%Y-%m-%d") if transfer_date else ""
-        ws.append_row([now, school, student_name, grade, transfer_date_str])
+        get_sheets_logger().log([now, school, student_name, grade, transfer_date_str])
     except Exception as e:
+        metrics.inc("log_submission_to_sheets_failures_total")
         st.error(f"구글 시트 로깅 중 오류 발생: {e}")
 # ────────────────────────────────────────────────────────
 
@@ -121,14 +154,50 @@ def grade_to_english(grade):
         return f"{number.group()}gr"
     return grade
 
+@metrics.timed("convert_pdf_to_images")
 def convert_pdf_to_images(pdf_path, dpi=150):
     try:
-        images = convert_from_path(pdf_path, dpi=dpi)
+        images = pdf_raster.rasterize_pdf(pdf_path, dpi=dpi)
         return images
     except Exception as e:
+        metrics.inc("convert_pdf_to_images_failures_total")
         st.error(f"PDF를 이미지로 변환 중 오류 발생: {e}")
         return None
 
+@st.cache_resource
+def start_warm_up():
+    """
+    프로세스당 한 번, 백그라운드에서 무거운 모듈과 학교 조회표·샘플 이미지·양식 페이지·글꼴을 미리 준비합니다.
+    RENDER_WORKERS > 0이면 양식 페이지·글꼴은 작업 프로세스가 준비하므로 이 프로세스에서는 건너뜁니다.
+    단계별 소요 시간은 metrics의 warmup_seconds로 남습니다.
+    """
+    steps = warmup.default_steps(
+        XLSX_FILE_PATH,
+        [(CONSENT_SAMPLE_PATH, 150), (TRANSFER_SAMPLE_PATH, 150)],
+        (PDF_TEMPLATE_PATH, TRANSFER_FORM_PATH),
+        FONT_PATH,
+        render_in_process=RENDER_WORKERS <= 0,
+    )
+    thread = threading.Thread(target=warmup.run, args=(steps,), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+start_warm_up()
+
+@st.cache_resource
+def start_metrics_export():
+    """
+    METRICS_PORT가 있으면 /metrics(Prometheus)·/metrics.json을 열고,
+    METRICS_JSON_LOG가 있으면 METRICS_LOG_INTERVAL초마다 JSON 한 줄씩 기록합니다.
+    """
+    if METRICS_PORT:
+        metrics.serve(int(METRICS_PORT))
+    if METRICS_JSON_LOG:
+        metrics.start_json_log(METRICS_JSON_LOG, METRICS_LOG_INTERVAL)
+    return True
+
+start_metrics_export()
+
 st.markdown("""
     <style>
     .title {
@@ -170,16 +239,18 @@ st.markdown('<div class="instruction-message">🍀 진  행 순  서 🍀<br> 
 if 'stage' not in st.session_state:
     st.session_state.stage = 1
     st.session_state.agree_to_collection = "none"
-    st.session_state.schools_by_region = {}
     st.session_state.selected_region = ""
     st.session_state.selected_school = ""
     st.session_state.student_name = ""
     st.session_state.move_date = None
     st.session_state.student_birth_date = None
-    st.session_state.pdf_bytes = None
+    st.session_state.applicant = None
+    st.session_state.final_pdf = {}
+    st.session_state.preview_handles = []
     st.session_state.filename = None
     st.session_state.next_grade_input = ""
     st.session_state.transfer_date_input = None
+    st.session_state.field_results = {}
 
 
 def validate_inputs(student_name, parent_name, student_school, student_birth_date,
@@ -194,9 +265,129 @@ def validate_inputs(student_name, parent_name, student_school, student_birth_dat
 
     return True, ""
 
-def send_pdf_email(pdf_data, filename, recipient_email):
+@st.cache_resource
+def get_mail_outbox():
+    """
+    프로세스당 하나의 발송함을 열고 백그라운드 발송 스레드를 시작합니다.
+    """
+    import mail_outbox
+
+    settings = mail_outbox.SmtpSettings(
+        host=SMTP_SERVER,
+        port=SMTP_PORT,
+        username=MAIL_FROM,
+        password=MAIL_PASSWORD,
+        starttls=SMTP_STARTTLS,
+    )
+    outbox = mail_outbox.MailOutbox(MAIL_OUTBOX_PATH, settings, pool_size=SMTP_POOL_SIZE)
+    return outbox.start()
+
+@st.cache_resource
+def get_mail_digest():
+    """
+    묶음 발송 학교의 제출을 모으는 대기열입니다. 발송함과 같은 SQLite 파일을 쓰며,
+    백그라운드 스레드가 기한이 된 묶음을 발송함에 넣습니다.
+    """
+    import mail_outbox
+
+    digest = mail_outbox.DigestQueue(
+        get_mail_outbox(),
+        default_interval=DIGEST_INTERVAL_MINUTES * 60,
+        sender_name="전입학예정확인서 시스템",
+        zip_attachments=DIGEST_ZIP,
+    )
+    return digest.start()
+
+@st.cache_resource
+def get_render_service():
+    """
+    프로세스당 하나의 렌더링 프로세스 풀입니다. 동시에 RENDER_WORKERS건을 렌더링하고,
+    RENDER_MAX_BACKLOG건까지 대기시키며 그 이상은 거절합니다.
+    작업 프로세스마다 양식 레이어 캐시를 LAYER_CACHE_MB씩 가지므로 최대 RENDER_WORKERS × LAYER_CACHE_MB를 씁니다.
+    """
+    return render_service.RenderService(
+        FONT_PATH, workers=RENDER_WORKERS, max_backlog=RENDER_MAX_BACKLOG,
+        templates=(PDF_TEMPLATE_PATH, TRANSFER_FORM_PATH),
+    )
+
+def render_submission(applicant, stamps, final=True):
+    """
+    프로세스 풀에서 미리보기 초안과 (final이면) 최종 PDF를 만들고, 기다리는 동안 대기 순서와 예상 시간을 보여 줍니다.
+    RENDER_WORKERS=0이면 이 스레드에서 바로 렌더링합니다. 대기열이 가득 차면 ServiceBusy가 전달됩니다.
+    """
+    templates = (PDF_TEMPLATE_PATH, TRANSFER_FORM_PATH)
+    if RENDER_WORKERS <= 0:
+        return form_render.render_application(
+            applicant, stamps, templates=templates, font_path=FONT_PATH, preview=True, final=final
+        )
+    ticket = get_render_service().submit(applicant, stamps, templates, final=final)
+    status = st.empty()
+    while not ticket.wait(timeout=0.5):
+        position = ticket.position()
+        if position:
+            eta = ticket.eta()
+            message = f"제출이 많아 대기 중입니다. 대기 순서: {position}번째"
+            if eta:
+                message += f", 예상 대기 시간: 약 {eta:.0f}초"
+            status.info(message)
+        else:
+            status.info("전입학예정확인서를 만들고 있습니다.")
+    status.empty()
+    return ticket.result()
+
+def final_pdf_builder(applicant, strokes, final_pdf):
+    """
+    4단계의 내려받기·제출에서 쓰는 최종 PDF 생성 함수를 만듭니다. 처음 부를 때 한 번만 최종 해상도로 렌더링해
+    저장소에 두고(final_pdf["handle"]), 이후에는 저장된 바이트를 돌려줍니다.
+    download_button의 data 콜백은 스크립트 밖 스레드에서 실행되므로 필요한 값을 미리 붙잡아 둡니다.
+    렌더링 대기열이 가득 차면 제출과 같은 안내를 띄우고 None을 돌려줍니다. 콜백 안의 안내는 화면에 나오지 않으므로
+    final_pdf["busy"]를 남겨 다음 실행에서 4단계가 보여 줍니다.
+    """
+    import signature
+
+    store = get_artifact_store()
+    service = get_render_service() if RENDER_WORKERS > 0 else None
+    templates = (PDF_TEMPLATE_PATH, TRANSFER_FORM_PATH)
+
+    def build():
+        with final_pdf["lock"]:
+            pdf_bytes = store.get(final_pdf["handle"]) if final_pdf.get("handle") else None
+            if pdf_bytes is None:
+                stamps = form_render.signature_stamps(*(signature.process_strokes(d)[1] for d in strokes))
+                try:
+                    with metrics.timed("render_final"):
+                        if service is None:
+                            rendered = form_render.render_application(applicant, stamps, templates, FONT_PATH)
+                        else:
+                            rendered = service.submit(applicant, stamps, templates, preview=False).result()
+                except render_service.ServiceBusy:
+                    final_pdf["busy"] = True
+                    st.warning("지금 제출이 많아 처리할 수 없습니다. 잠시 후 다시 제출해주세요.")
+                    return None
+                pdf_bytes = rendered.pdf_bytes
+                metrics.inc("rendered_pdf_bytes_total", len(pdf_bytes))
+                final_pdf["handle"] = store.put(pdf_bytes)
+            return pdf_bytes
+
+    return build
+
+@st.cache_resource
+def get_artifact_store():
+    """
+    세션별 PDF·미리보기를 디스크에 보관하는 프로세스 공용 저장소입니다. 세션 상태에는 핸들만 둡니다.
+    """
+    return artifact_store.ArtifactStore(
+        ARTIFACT_DIR, ttl=ARTIFACT_TTL, max_bytes=ARTIFACT_MAX_MB * 1024 * 1024
+    )
+
+@metrics.timed("send_pdf_email")
+def send_pdf_email(pdf_data, filename, recipient_email, delivery=school_directory.IMMEDIATE):
+    """
+    제출 PDF를 학교로 보냅니다. delivery가 묶음 발송이면 바로 보내지 않고 묶음 대기열에 넣습니다.
+    """
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     if not re.match(pattern, recipient_email):
+        metrics.inc("send_pdf_email_failures_total")
         st.error(f"유효하지 않은 이메일 주소입니다: {recipient_email}")
         return False
 
@@ -208,6 +399,24 @@ def send_pdf_email(pdf_data, filename, recipient_email):
     else:
         email_filename = "Confirmation of Prospective School Transfer.pdf"
 
+    if delivery.mode == "digest":
+        interval = None if delivery.interval_minutes is None else delivery.interval_minutes * 60
+        try:
+            get_mail_digest().add(MAIL_FROM, recipient_email, filename, email_filename, pdf_data, interval=interval)
+            metrics.inc("mail_submissions_total", delivery="digest")
+            return True
+        except Exception as e:
+            metrics.inc("send_pdf_email_failures_total")
+            st.error(f"이메일 발송 예약 실패: {e}")
+            return False
+
+    from email import encoders
+    from email.header import Header
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.utils import formataddr
+
     msg = MIMEMultipart()
     msg['From'] = formataddr((str(Header("전입학예정확인서 시스템", 'utf-8')), MAIL_FROM))
     msg['To'] = recipient_email
@@ -224,473 +433,381 @@ def send_pdf_email(pdf_data, filename, recipient_email):
     msg.attach(part)
 
     try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(MAIL_FROM, MAIL_PASSWORD)
-        server.sendmail(MAIL_FROM, recipient_email, msg.as_string())
-        server.quit()
+        message = msg.as_bytes()
+        get_mail_outbox().enqueue(MAIL_FROM, recipient_email, message)
+        metrics.inc("mail_enqueued_bytes_total", len(message))
+        metrics.inc("mail_submissions_total", delivery="immediate")
         return True
     except Exception as e:
-        st.error(f"이메일 발송 실패: {e}")
+        metrics.inc("send_pdf_email_failures_total")
+        st.error(f"이메일 발송 예약 실패: {e}")
         st.error("이메일 설정을 확인하고 다시 시도해주세요.")
         return False
 
 def clear_session_state():
+    handles = [(st.session_state.get("final_pdf") or {}).get("handle"), *(st.session_state.get("preview_handles") or [])]
+    get_artifact_store().discard(*[handle for handle in handles if handle])
     keys_to_keep = []
     for key in list(st.session_state.keys()):
         if key not in keys_to_keep:
             del st.session_state[key]
 
-def format_phone_number(phone_input):
-    digits = ''.join(filter(str.isdigit, phone_input))
-    if len(digits) != 11 or not digits.startswith('010'):
-        return None, "휴대전화 번호는 010으로 시작하며 숫자로만 작성하세요."
-    # 010-XXXX-XXXX 형식으로 변환
-    formatted = f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
-    return formatted, None
+# ────────────────────────────────────────────────────────
+# 3단계 입력칸별 검사기: 입력값 → (저장할 값, 오류 메시지 또는 None). 규칙은 field_checks에 있습니다.
+STAGE3_CHECKS = {
+    "student_name_input": field_checks.check_hangul_name,
+    "student_school_input": field_checks.check_student_school,
+    "parent_name_input": field_checks.check_hangul_name,
+    "relationship_input": field_checks.check_relationship,
+    "parent_phone_input": field_checks.check_phone,
+    "address_input": field_checks.check_address,
+    "next_grade_num_input": field_checks.check_next_grade,
+}
+
+def validate_field(key):
+    """
+    입력칸 하나만 검사해 (입력값, 저장할 값, 오류)를 세션에 보관합니다. text_input의 on_change 콜백입니다.
+    """
+    raw = st.session_state.get(key) or ""
+    value, error = STAGE3_CHECKS[key](raw) if raw else ("", None)
+    st.session_state.field_results[key] = (raw, value, error)
+    metrics.inc("field_validations_total")
 
-# 1단계: 지역 및 학교 선택
-if st.session_state.stage == 1:
-    st.subheader("1단계: 지역 및 학교")
-    st.markdown('<div class="instruction-message">전입 예정 지역 및 전학 예정 학교를 선택하세요.</div>', unsafe_allow_html=True)
+def field_value(key):
+    """
+    검사해 둔 값을 반환합니다. 마지막 검사 뒤 입력이 바뀌었으면 그 칸만 다시 검사합니다.
+    """
+    result = st.session_state.field_results.get(key)
+    if result is None or result[0] != (st.session_state.get(key) or ""):
+        validate_field(key)
+        result = st.session_state.field_results[key]
+    return result[1]
+
+def checked_text_input(label, key, placeholder):
+    st.text_input(label, placeholder=placeholder, key=key, on_change=validate_field, args=(key,))
+    result = st.session_state.field_results.get(key)
+    if result and result[2]:
+        st.error(result[2])
 
-    try:
-        df = pd.read_excel(XLSX_FILE_PATH)
-        if not all(col in df.columns for col in ['지역', '학교', '이메일']):
-            st.error("XLSX 파일에 '지역', '학교', '이메일' 컬럼이 있어야 합니다. 파일 내용을 확인하고 다시 시도해주세요.")
-            st.stop()
-        st.session_state.schools_by_region = df.groupby('지역')['학교'].apply(list).to_dict()
-        regions = list(st.session_state.schools_by_region.keys())
-    except Exception as e:
-        st.error(f"XLSX 파일을 읽는 중 오류가 발생했습니다: {e}. 파일 경로 및 형식을 확인해주세요. 경로: {XLSX_FILE_PATH}")
-        st.stop()
+# ────────────────────────────────────────────────────────
+# 단계별 실행(rerun) 횟수와 실행 시간을 기록합니다. st.stop()/st.rerun()으로 끝난 실행도 포함됩니다.
+# 3단계 입력 중의 조각 실행은 fragment_runs_total로 따로 셉니다.
+metrics.inc("stage_runs_total", stage=st.session_state.stage)
+with metrics.timed("stage", stage=st.session_state.stage):
+    # 3단계 입력 조각입니다. 아래 3단계 분기에서 부르며, 본문은 3단계 코드와 같은 깊이로 둡니다.
+    @st.fragment
+    def stage3_fields():
+        """
+        3단계 입력칸입니다. 칸을 고치면 스크립트 전체가 아니라 이 조각만 다시 실행됩니다.
+        """
+        metrics.inc("fragment_runs_total", fragment="stage3_fields")
+        # 3행×2열 레이아웃: 왼쪽(학생), 오른쪽(법정대리인)
+        col1, col2 = st.columns(2)
+        with col1:
+            checked_text_input("(학생) 성명", "student_name_input", "예) 한잎새")
+
+            # (학생) 생년월일
+            today = date.today()
+            st.date_input(
+                "(학생) 생년월일",
+                value=None,
+                min_value=today - timedelta(days=30*365),
+                max_value=today + timedelta(days=30*365),
+                key="student_birth_date_input"
+            )
 
-    st.session_state.selected_region = st.selectbox("전입 예정 지역을 선택하세요.", regions)
+            checked_text_input(
+                "(학생) 현 소속 학교 및 학년", "student_school_input",
+                "예) 00초등학교, 00중학교, 00고등학교 1학년"
+            )
+        with col2:
+            checked_text_input("(법정대리인) 성명", "parent_name_input", "예) 한나무")
+            checked_text_input("(법정대리인) 학생과의 관계", "relationship_input", "예) 부, 모, 조부, 조모 등")
+            checked_text_input("(법정대리인) 휴대전화 번호", "parent_phone_input", "예) 01056785678")
+
+        # 순차 배열: 전입 예정일, 전입 예정 주소, 전학 예정일, 전학 예정 학교, 전학 예정 학년
+        st.date_input("전입 예정일", value=None, key="move_date_input")
+        checked_text_input("전입 예정 주소", "address_input", "예) 행복택지 A-1블록 사랑아파트")
+        st.date_input("전학 예정일", value=None, key="transfer_date_input")
+        st.text_input("전학 예정 학교", value=st.session_state.selected_school, disabled=True)
+        checked_text_input("전학 예정 학년", "next_grade_num_input", "예) 3학년 → 3 / 숫자만 입력")
+
+    @st.fragment
+    def stage3_signatures():
+        """
+        서명 캔버스 두 개입니다. 서명하는 동안에는 이 조각만 다시 실행되며,
+        캔버스 비트맵 대신 획 경로(json_data)만 세션에 보관합니다.
+        """
+        from streamlit_drawable_canvas import st_canvas
+
+        metrics.inc("fragment_runs_total", fragment="stage3_signatures")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("학생 서명")
+            canvas_student = st_canvas(
+                fill_color="rgba(255, 255, 255, 0)",
+                stroke_width=5,
+                background_color="rgba(255, 255, 255, 0)",
+                height=150,
+                width=300,
+                drawing_mode="freedraw",
+                key="student_sign_canvas"
+            )
+        with col2:
+            st.write("법정대리인 서명")
+            canvas_parent = st_canvas(
+                fill_color="rgba(255, 255, 255, 0)",
+                stroke_width=5,
+                background_color="rgba(255, 255, 255, 0)",
+                height=150,
+                width=300,
+                drawing_mode="freedraw",
+                key="parent_sign_canvas"
+            )
+        st.session_state.signature_strokes = (canvas_student.json_data, canvas_parent.json_data)
 
-    available_schools = st.session_state.schools_by_region.get(st.session_state.selected_region, [])
-    if not available_schools:
-        st.warning("선택한 지역에 학교 정보가 없습니다. 다른 지역을 선택해주세요.")
-        st.session_state.selected_school = ""
-    else:
-        st.session_state.selected_school = st.selectbox("전학 예정 학교를 선택하세요.", available_schools)
+    # 1단계: 지역 및 학교 선택
+    if st.session_state.stage == 1:
+        st.subheader("1단계: 지역 및 학교")
+        st.markdown('<div class="instruction-message">전입 예정 지역 및 전학 예정 학교를 선택하세요.</div>', unsafe_allow_html=True)
 
-    if st.button("✒️다음 단계로"):
-        if st.session_state.selected_region and st.session_state.selected_school:
-            st.session_state.stage = 2
-            st.rerun()
-        else:
-            st.warning("지역과 학교를 모두 선택하세요.")
-
-# 2단계: 개인정보 수집·이용 동의서
-elif st.session_state.stage == 2:
-    st.subheader("2단계: 개인정보 수집·이용 동의서")
-    st.markdown('<div class="instruction-message">개인정보 수집·이용 동의서를 확인 후 진행하세요.</div>', unsafe_allow_html=True)
-
-    consent_images = convert_pdf_to_images(CONSENT_SAMPLE_PATH, dpi=150)
-    if consent_images:
-        with st.expander("📄 개인정보 수집·이용 동의서", expanded=True):
-            for i, image in enumerate(consent_images):
-                st.image(image, use_container_width=True)
-    else:
-        st.error("동의서 샘플 PDF를 불러올 수 없습니다. 파일 경로를 확인해주세요.")
-
-    consent_choice = st.radio(
-        "☞ 위와 같이 개인정보 수집·이용에 동의하십니까?",
-        options=["동의합니다.", "동의하지 않습니다."],
-        index=None,
-        key="consent_radio"
-    )
-    if consent_choice == "동의합니다.":
-        if st.button("✒️다음 단계로"):
-            st.session_state.stage = 3
-            st.rerun()
-    elif consent_choice == "동의하지 않습니다.":
-        st.warning("개인정보 수집·이용에 동의 시에만 다음 단계로 진행할 수 있습니다.")
-
-# 3단계: 전입학예정확인서
-elif st.session_state.stage == 3:
-    st.subheader("3단계: 전입학예정확인서")
-    st.markdown('<div class="instruction-message">모든 작성칸을 올바르게 작성하세요.</div>', unsafe_allow_html=True)
-
-    transfer_images = convert_pdf_to_images(TRANSFER_SAMPLE_PATH, dpi=150)
-    if transfer_images:
-        with st.expander("📄 전입학예정확인서 예시", expanded=True):
-            for i, image in enumerate(transfer_images):
-                st.image(image, use_container_width=True)
-    else:
-        st.error("전입학예정확인서 샘플 PDF를 불러올 수 없습니다. 파일 경로를 확인해주세요.")
-
-    # ────────────────────────────────────────────────────────
-    # 3행×2열 레이아웃: 왼쪽(학생), 오른쪽(법정대리인)
-    col1, col2 = st.columns(2)
-    with col1:
-        # (학생) 성명
-        student_name = st.text_input(
-            "(학생) 성명",
-            placeholder="예) 한잎새",
-            key="student_name_input"
-        )
-        if student_name and not re.match(r'^[가-힣]+$', student_name):
-            st.error("한글로만 작성하세요.")
-            st.session_state.student_name = ""
-        else:
-            st.session_state.student_name = student_name
-
-        # (학생) 생년월일
-        today = date.today()
-        min_date = today - timedelta(days=30*365)
-        max_date = today + timedelta(days=30*365)
-        st.session_state.student_birth_date = st.date_input(
-            "(학생) 생년월일",
-            value=None,
-            min_value=min_date,
-            max_value=max_date,
-            key="student_birth_date_input"
-        )
+        try:
+            directory = school_directory.load_directory(XLSX_FILE_PATH)
+            regions = directory.regions
+        except school_directory.DirectoryFormatError:
+            st.error("XLSX 파일에 '지역', '학교', '이메일' 컬럼이 있어야 합니다. 파일 내용을 확인하고 다시 시도해주세요.")
+            st.stop()
+        except Exception as e:
+            st.error(f"XLSX 파일을 읽는 중 오류가 발생했습니다: {e}. 파일 경로 및 형식을 확인해주세요. 경로: {XLSX_FILE_PATH}")
+            st.stop()
 
-        # (학생) 현 소속 학교 및 학년
-        student_school = st.text_input(
-            "(학생) 현 소속 학교 및 학년",
-            placeholder="예) 00초등학교, 00중학교, 00고등학교 1학년",
-            key="student_school_input"
-        )
-        if student_school:
-            if "학교" not in student_school:
-                st.error("'학교'와 '학년' 단어를 반드시 포함하여 작성하세요.")
-                student_school = ""
-            elif not re.search(r"\d+학년", student_school):
-                st.error("'학교'와 '학년' 단어를 반드시 포함하여 작성하세요.")
-                student_school = ""
-            elif not re.match(r'^[가-힣0-9\s]+$', student_school) or re.match(r'^\d+$', student_school):
-                st.error("한글과 숫자로만 작성하세요.")
-                student_school = ""
-    with col2:
-        # (법정대리인) 성명
-        parent_name = st.text_input(
-            "(법정대리인) 성명",
-            placeholder="예) 한나무",
-            key="parent_name_input"
-        )
-        if parent_name and not re.match(r'^[가-힣]+$', parent_name):
-            st.error("한글로만 작성하세요.")
-            parent_name = ""
-
-        # (법정대리인) 학생과의 관계
-        relationship = st.text_input(
-            "(법정대리인) 학생과의 관계",
-            placeholder="예) 부, 모, 조부, 조모 등",
-            key="relationship_input"
-        )
-        if relationship and not re.match(r'^[가-힣\s]+$', relationship):
-            st.error("한글로만 작성하세요.")
-            relationship = ""
-
-        # (법정대리인) 휴대전화 번호
-        parent_phone_input = st.text_input(
-            "(법정대리인) 휴대전화 번호",
-            placeholder="예) 01056785678",
-            key="parent_phone_input"
-        )
-        if parent_phone_input:
-            formatted_parent_phone, error = format_phone_number(parent_phone_input)
-            if error:
-                st.error(error)
-                parent_phone = ""
+        st.session_state.selected_region = st.selectbox("전입 예정 지역을 선택하세요.", regions)
+
+        available_schools = directory.schools(st.session_state.selected_region)
+        if not available_schools:
+            st.warning("선택한 지역에 학교 정보가 없습니다. 다른 지역을 선택해주세요.")
+            st.session_state.selected_school = ""
+        elif len(available_schools) > SCHOOL_PICKER_LIMIT:
+            # 학교가 많은 지역은 전체 목록 대신 서버에서 검색한 상위 결과만 브라우저로 보냅니다.
+            school_query = st.text_input(
+                "전학 예정 학교 이름을 검색하세요. (초성 검색 가능, 예: ㅁㄱㅊ)",
+                key="school_query_input"
+            )
+            matches = directory.search(st.session_state.selected_region, school_query, SCHOOL_PICKER_LIMIT)
+            if matches:
+                st.session_state.selected_school = st.selectbox(
+                    f"전학 예정 학교를 선택하세요. (검색 결과 상위 {SCHOOL_PICKER_LIMIT}개까지 표시)", matches
+                )
             else:
-                parent_phone = formatted_parent_phone
+                st.warning("검색 결과가 없습니다. 학교 이름을 다시 입력해주세요.")
+                st.session_state.selected_school = ""
         else:
-            parent_phone = ""
-
-    # ────────────────────────────────────────────────────────
-    # 순차 배열: 전입 예정일, 전입 예정 주소, 전학 예정일, 전학 예정 학교, 전학 예정 학년
-    st.session_state.move_date = st.date_input(
-        "전입 예정일",
-        value=None,
-        key="move_date_input"      # 키 이름 통일
-    )
+            st.session_state.selected_school = st.selectbox("전학 예정 학교를 선택하세요.", available_schools)
 
-    address = st.text_input(
-        "전입 예정 주소",
-        placeholder="예) 행복택지 A-1블록 사랑아파트",
-        key="address_input"
-    )
-    if address and not re.match(r'^[가-힣a-zA-Z0-9\s\-]+$', address):
-        st.error("한글, 알파벳, 숫자, 기호로만 작성하세요.")
-        address = ""
-
-    # (전학) 전학 예정일
-    transfer_date = st.date_input(
-        "전학 예정일",
-        value=None,
-        key="transfer_date_input"   # 키를 새로 지정
-    )
-    st.session_state.transfer_date = transfer_date
+        if st.button("✒️다음 단계로"):
+            if st.session_state.selected_region and st.session_state.selected_school:
+                st.session_state.stage = 2
+                st.rerun()
+            else:
+                st.warning("지역과 학교를 모두 선택하세요.")
 
-    # (전학) 전학 예정 학교
-    school_name = st.text_input(
-        "전학 예정 학교",
-        value=st.session_state.selected_school,
-        disabled=True
-    )
+    # 2단계: 개인정보 수집·이용 동의서
+    elif st.session_state.stage == 2:
+        st.subheader("2단계: 개인정보 수집·이용 동의서")
+        st.markdown('<div class="instruction-message">개인정보 수집·이용 동의서를 확인 후 진행하세요.</div>', unsafe_allow_html=True)
 
-    # (전학) 전학 예정 학년
-    next_grade_raw = st.text_input(
-        "전학 예정 학년",
-        placeholder="예) 3학년 → 3 / 숫자만 입력",
-        key="next_grade_num_input"
-    )
-    if next_grade_raw:
-        if re.fullmatch(r"[1-6]", next_grade_raw):
-            next_grade = f"{next_grade_raw}학년"
+        consent_images = convert_pdf_to_images(CONSENT_SAMPLE_PATH, dpi=150)
+        if consent_images:
+            with st.expander("📄 개인정보 수집·이용 동의서", expanded=True):
+                for i, image in enumerate(consent_images):
+                    st.image(image, use_container_width=True)
         else:
-            st.error("1~6 사이의 숫자만 입력하세요.")
-            next_grade = ""
-    else:
-        next_grade = ""
-
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write("학생 서명")
-        canvas_student = st_canvas(
-            fill_color="rgba(255, 255, 255, 0)",
-            stroke_width=5,
-            background_color="rgba(255, 255, 255, 0)",
-            height=150,
-            width=300,
-            drawing_mode="freedraw",
-            key="student_sign_canvas"
-        )
-    with col2:
-        st.write("법정대리인 서명")
-        canvas_parent = st_canvas(
-            fill_color="rgba(255, 255, 255, 0)",
-            stroke_width=5,
-            background_color="rgba(255, 255, 255, 0)",
-            height=150,
-            width=300,
-            drawing_mode="freedraw",
-            key="parent_sign_canvas"
-        )
+            st.error("동의서 샘플 PDF를 불러올 수 없습니다. 파일 경로를 확인해주세요.")
 
-    if st.button("✒️다음 단계로"):
-        valid, error = validate_inputs(
-            st.session_state.student_name,
-            parent_name,
-            student_school,
-            st.session_state.student_birth_date,
-            parent_phone,
-            address,
-            transfer_date,    
-            next_grade,
-            st.session_state.move_date,
-            relationship
+        consent_choice = st.radio(
+            "☞ 위와 같이 개인정보 수집·이용에 동의하십니까?",
+            options=["동의합니다.", "동의하지 않습니다."],
+            index=None,
+            key="consent_radio"
         )
-        if not valid:
-            st.error(error)
-            st.stop()
-
-        st.session_state.next_grade_input = next_grade
-        
-        try:
-            def calculate_signature_coverage(image_data):
-                alpha_channel = image_data[:, :, 3]
-                drawn_pixels = (alpha_channel > 0).sum()
-                total_pixels = image_data.shape[0] * image_data.shape[1]
-                return drawn_pixels / total_pixels
+        if consent_choice == "동의합니다.":
+            if st.button("✒️다음 단계로"):
+                st.session_state.stage = 3
+                st.rerun()
+        elif consent_choice == "동의하지 않습니다.":
+            st.warning("개인정보 수집·이용에 동의 시에만 다음 단계로 진행할 수 있습니다.")
+
+    # 3단계: 전입학예정확인서
+    elif st.session_state.stage == 3:
+        st.subheader("3단계: 전입학예정확인서")
+        st.markdown('<div class="instruction-message">모든 작성칸을 올바르게 작성하세요.</div>', unsafe_allow_html=True)
+
+        transfer_images = convert_pdf_to_images(TRANSFER_SAMPLE_PATH, dpi=150)
+        if transfer_images:
+            with st.expander("📄 전입학예정확인서 예시", expanded=True):
+                for i, image in enumerate(transfer_images):
+                    st.image(image, use_container_width=True)
+        else:
+            st.error("전입학예정확인서 샘플 PDF를 불러올 수 없습니다. 파일 경로를 확인해주세요.")
 
-            student_coverage = calculate_signature_coverage(canvas_student.image_data)
-            parent_coverage = calculate_signature_coverage(canvas_parent.image_data)
+        stage3_fields()
+        stage3_signatures()
 
-            if student_coverage < 0.05 or parent_coverage < 0.05:
-                st.warning("학생과 법정대리인 모두 올바르게 서명하세요.")
+        if st.button("✒️다음 단계로"):
+            # 바뀐 칸만 다시 검사하고, 나머지는 입력할 때 검사해 둔 결과를 씁니다.
+            values = {key: field_value(key) for key in STAGE3_CHECKS}
+            st.session_state.student_name = values["student_name_input"]
+            st.session_state.student_birth_date = st.session_state.get("student_birth_date_input")
+            st.session_state.move_date = st.session_state.get("move_date_input")
+            st.session_state.transfer_date = st.session_state.get("transfer_date_input")
+            student_school = values["student_school_input"]
+            parent_name = values["parent_name_input"]
+            relationship = values["relationship_input"]
+            parent_phone = values["parent_phone_input"]
+            address = values["address_input"]
+            transfer_date = st.session_state.transfer_date
+            school_name = st.session_state.selected_school
+            next_grade = values["next_grade_num_input"]
+
+            valid, error = validate_inputs(
+                st.session_state.student_name,
+                parent_name,
+                student_school,
+                st.session_state.student_birth_date,
+                parent_phone,
+                address,
+                transfer_date,
+                next_grade,
+                st.session_state.move_date,
+                relationship
+            )
+            if not valid:
+                st.error(error)
                 st.stop()
 
-            student_sign_buffer = BytesIO()
-            parent_sign_buffer = BytesIO()
-            Image.fromarray(canvas_student.image_data.astype('uint8'), mode='RGBA').save(student_sign_buffer, format='PNG', optimize=True)
-            Image.fromarray(canvas_parent.image_data.astype('uint8'), mode='RGBA').save(parent_sign_buffer, format='PNG', optimize=True)
-
-            pages1 = convert_from_path(PDF_TEMPLATE_PATH, dpi=200)
-            page1 = pages1[0].convert('RGBA')
-            pages2 = convert_from_path(TRANSFER_FORM_PATH, dpi=200)
-            page2 = pages2[0].convert('RGBA')
-            draw1 = ImageDraw.Draw(page1)
-            draw2 = ImageDraw.Draw(page2)
-
-            consent_positions = {
-                "{{date.today}}": [(1100, 1550)],
-                "{{student_name}}": [(825, 1695)],
-                "{{student_sign_path}}": [(1060, 1665)],
-                "{{parent_name}}": [(825, 1835)],
-                "{{parent_sign_path}}": [(1060, 1810)],
-                "{{school_name}}": [(925, 1988)],
-            }
-            transfer_positions = {
-                "{{student_name}}": [(462, 420), (825, 1755)],
-                "{{parent_name}}": [(1110, 420), (825, 1888)],
-                "{{student_school}}": [(462, 625)],
-                "{{relationship}}": [(1110, 520)],
-                "{{student_birth_date}}": [(462, 520)],
-                "{{parent_phone}}": [(1110, 620)],
-                "{{move_date}}": [(462, 825)],
-                "{{address}}": [(1110, 810), (490, 1170)],
-                "{{transfer_date}}": [(462, 930)],
-                "{{school_name}}": [(462, 1035), (310, 1235), (925, 2056)],
-                "{{next_grade}}": [(1110, 1035), (840, 1235)],
-                "{{date.today}}": [(1100, 1620)],
-                "{{student_sign_path}}": [(1060, 1730)],
-                "{{parent_sign_path}}": [(1060, 1870)],
-            }
-
-            def get_font(key, idx):
-                if key == "{{address}}" and idx == 0:
-                    return ImageFont.truetype(FONT_PATH, 32)
-                if key == "{{address}}" and idx == 1:
-                    return ImageFont.truetype(FONT_PATH, 40)
-                if key == "{{student_school}}" and idx == 0:
-                    return ImageFont.truetype(FONT_PATH, 32)
-                return ImageFont.truetype(FONT_PATH, 42)
-
-            consent_map = {
-                "{{student_name}}": st.session_state.student_name,
-                "{{parent_name}}": parent_name,
-                "{{date.today}}": date.today().strftime("%Y년 %m월 %d일"),
-                "{{school_name}}": school_name,
-            }
-            transfer_map = {
-                **consent_map,
-                "{{student_school}}": student_school,
-                "{{relationship}}": relationship,
-                "{{student_birth_date}}": st.session_state.student_birth_date.strftime("%Y년 %m월 %d일"),
-                "{{parent_phone}}": parent_phone,
-                "{{move_date}}": st.session_state.move_date.strftime("%Y년 %m월 %d일"),
-                "{{address}}": address,
-                "{{transfer_date}}": transfer_date.strftime("%Y년 %m월 %d일"),
-                "{{next_grade}}": next_grade,
-            }
-
-            def draw_texts(draw, positions, data_map, is_transfer=False):
-                for key, coords in positions.items():
-                    for idx, (x, y) in enumerate(coords):
-                        text = data_map.get(key, "")
-                        font = get_font(key, idx)
-                        if not is_transfer:
-                            if key in ["{{student_name}}", "{{parent_name}}", "{{student_sign_path}}", "{{parent_sign_path}}"]:
-                                x -= 15
-                        else:
-                            if key == "{{address}}":
-                                if idx == 0:
-                                    x -= 7
-                                    wrapped_lines = textwrap.wrap(text, width=11)
-                                    current_y = y
-                                    for line in wrapped_lines:
-                                        draw.text((x, current_y), line, font=font, fill='black')
-                                        current_y += font.getbbox(line)[3] - font.getbbox(line)[1]
-                                    continue
-                                elif idx == 1:
-                                    x -= 50
-                            if key == "{{next_grade}}" and idx == 1:
-                                x += 50
-                        draw.text((x, y), text, font=font, fill='black')
-
-            draw_texts(draw1, consent_positions, consent_map, is_transfer=False)
-            student_sign_buffer.seek(0)
-            parent_sign_buffer.seek(0)
-            sign1 = Image.open(student_sign_buffer).resize((312, 104)).convert('RGBA')
-            sign2 = Image.open(parent_sign_buffer).resize((312, 104)).convert('RGBA')
-            for x, y in consent_positions.get("{{student_sign_path}}", []):
-                page1.paste(sign1, (x - 15, y), sign1)
-            for x, y in consent_positions.get("{{parent_sign_path}}", []):
-                page1.paste(sign2, (x - 15, y), sign2)
-
-            draw_texts(draw2, transfer_positions, transfer_map, is_transfer=True)
-            student_sign_buffer.seek(0)
-            parent_sign_buffer.seek(0)
-            sign1 = Image.open(student_sign_buffer).resize((312, 104)).convert('RGBA')
-            sign2 = Image.open(parent_sign_buffer).resize((312, 104)).convert('RGBA')
-            for x, y in transfer_positions.get("{{student_sign_path}}", []):
-                page2.paste(sign1, (x, y), sign1)
-            for x, y in transfer_positions.get("{{parent_sign_path}}", []):
-                page2.paste(sign2, (x, y), sign2)
-
-            buffer = BytesIO()
-            page1 = page1.convert('RGB')
-            page2 = page2.convert('RGB')
-            page1.save(buffer, format='PDF', quality=70)
-            page2.save(buffer, format='PDF', append=True, save_all=True, quality=70)
-            pdf_bytes = buffer.getvalue()
-            filename = f"전입학예정확인서_{school_name}_{next_grade}.pdf"
-
-            st.session_state.pdf_bytes = pdf_bytes
-            st.session_state.filename = filename
-            st.session_state.stage = 4
-            st.rerun()
-
-        except Exception as e:
-            st.error(f"PDF 생성 중 오류 발생: {e}")
-        finally:
+            st.session_state.next_grade_input = next_grade
+        
             try:
-                student_sign_buffer.close()
-                parent_sign_buffer.close()
+                # 획 경로로 면적을 검사하고, 서명 도장을 출력 해상도에서 바로 그립니다.
+                import signature
+
+                student_stamp, parent_stamp = (
+                    signature.process_strokes(json_data)[1]
+                    for json_data in st.session_state.get("signature_strokes", (None, None))
+                )
+
+                if student_stamp is None or parent_stamp is None:
+                    st.warning("학생과 법정대리인 모두 올바르게 서명하세요.")
+                    st.stop()
+
+                applicant = {
+                    "student_name": st.session_state.student_name,
+                    "student_birth_date": st.session_state.student_birth_date,
+                    "student_school": student_school,
+                    "parent_name": parent_name,
+                    "relationship": relationship,
+                    "parent_phone": parent_phone,
+                    "move_date": st.session_state.move_date,
+                    "address": address,
+                    "transfer_date": transfer_date,
+                    "school_name": school_name,
+                    "next_grade": next_grade,
+                }
+                # 여기서는 저해상도 초안 미리보기만 만들고, 최종 PDF는 4단계에서 내려받거나 제출할 때 만듭니다.
+                with metrics.timed("render"):
+                    rendered = render_submission(
+                        applicant, form_render.signature_stamps(student_stamp, parent_stamp), final=False
+                    )
+                filename = form_render.output_filename(school_name, next_grade)
+
+                store = get_artifact_store()
+                st.session_state.applicant = applicant
+                st.session_state.final_pdf = {"lock": threading.Lock()}
+                st.session_state.preview_handles = [store.put(preview) for preview in rendered.previews]
+                st.session_state.filename = filename
+                st.session_state.stage = 4
+                st.rerun()
+
+            except render_service.ServiceBusy:
+                st.warning("지금 제출이 많아 처리할 수 없습니다. 작성한 내용은 그대로 두고 잠시 후 다시 제출해주세요.")
             except Exception as e:
-                st.warning(f"메모리 버퍼 정리 중 오류 발생: {e}")
-
-# 4단계: 미리보기 및 제출
-elif st.session_state.stage == 4:
-    st.subheader("4단계: 미리보기 및 제출")
-    st.markdown('<div class="instruction-message">미리보기를 통해 최종 확인 후 제출하세요.</div>', unsafe_allow_html=True)
-
-    if st.session_state.pdf_bytes and st.session_state.filename:
-        try:
-            images = convert_from_bytes(st.session_state.pdf_bytes, dpi=150)
-            with st.expander("📄 전입학예정확인서 미리보기", expanded=True):
-                for i, image in enumerate(images):
-                    st.image(image, use_container_width=True)
-
-            st.download_button(
-                label="💾 전입학예정확인서 내려받기",
-                data=st.session_state.pdf_bytes,
-                file_name=st.session_state.filename,
-                mime='application/pdf'
+                st.error(f"PDF 생성 중 오류 발생: {e}")
+
+    # 4단계: 미리보기 및 제출
+    elif st.session_state.stage == 4:
+        st.subheader("4단계: 미리보기 및 제출")
+        st.markdown('<div class="instruction-message">미리보기를 통해 최종 확인 후 제출하세요.</div>', unsafe_allow_html=True)
+
+        store = get_artifact_store()
+        images = [store.get(handle) for handle in st.session_state.get("preview_handles") or []]
+        if images and all(images) and st.session_state.filename:
+            build_final_pdf = final_pdf_builder(
+                st.session_state.applicant,
+                st.session_state.get("signature_strokes", (None, None)),
+                st.session_state.final_pdf,
             )
-
-            if st.button("📮 전입학예정확인서 제출하기"):
-                with st.spinner("제출 중입니다. 잠시만 기다려 주세요."):
-                    try:
-                        df = pd.read_excel(XLSX_FILE_PATH)
-                        email_series = df[df['학교'] == st.session_state.selected_school]['이메일']
-                        if email_series.empty:
-                            st.error(f"학교 '{st.session_state.selected_school}'에 해당하는 이메일이 없습니다.")
-                            st.error("오류가 발생했습니다. 다시 처음부터 진행해주세요.")
-                            clear_session_state()
-                            st.stop()
-                        selected_school_email = email_series.values[0]
-                        if send_pdf_email(st.session_state.pdf_bytes, st.session_state.filename, selected_school_email):
-                            st.success("정상적으로 제출되었습니다. 협조해 주셔서 감사합니다.")
-                            log_submission_to_sheets(
-                                st.session_state.selected_school,
-                                st.session_state.next_grade_input,
-                                st.session_state.student_name,
-                                st.session_state.get("transfer_date", None)
-                            )
-                            clear_session_state()
-                        else:
+            if st.session_state.final_pdf.pop("busy", False):
+                st.warning("지금 제출이 많아 처리할 수 없습니다. 잠시 후 다시 제출해주세요.")
+            try:
+                with st.expander("📄 전입학예정확인서 미리보기", expanded=True):
+                    for i, image in enumerate(images):
+                        st.image(image, use_container_width=True)
+
+                # 최종 PDF는 내려받기를 누를 때 만듭니다(이미 제출용으로 만들었으면 그대로 씁니다).
+                st.download_button(
+                    label="💾 전입학예정확인서 내려받기",
+                    data=build_final_pdf,
+                    file_name=st.session_state.filename,
+                    mime='application/pdf'
+                )
+
+                if st.button("📮 전입학예정확인서 제출하기"):
+                    with st.spinner("제출 중입니다. 잠시만 기다려 주세요."):
+                        try:
+                            directory = school_directory.load_directory(XLSX_FILE_PATH)
+                            selected_school_email = directory.email_for(st.session_state.selected_school)
+                            if not selected_school_email:
+                                st.error(f"학교 '{st.session_state.selected_school}'에 해당하는 이메일이 없습니다.")
+                                st.error("오류가 발생했습니다. 다시 처음부터 진행해주세요.")
+                                clear_session_state()
+                                st.stop()
+                            delivery = directory.delivery_for(st.session_state.selected_school)
+                            pdf_bytes = build_final_pdf()
+                            if pdf_bytes is None:
+                                # build_final_pdf가 이미 안내했습니다. 작성한 내용은 그대로 둡니다.
+                                st.session_state.final_pdf.pop("busy", None)
+                            elif send_pdf_email(pdf_bytes, st.session_state.filename, selected_school_email, delivery):
+                                if delivery.mode == "digest":
+                                    st.success("정상적으로 제출되었습니다. 이 학교는 제출된 확인서를 모아 정해진 시간마다 한 번에 받습니다. 협조해 주셔서 감사합니다.")
+                                else:
+                                    st.success("정상적으로 제출되어 발송 대기 중입니다. 잠시 후 학교로 자동 발송됩니다. 협조해 주셔서 감사합니다.")
+                                log_submission_to_sheets(
+                                    st.session_state.selected_school,
+                                    st.session_state.next_grade_input,
+                                    st.session_state.student_name,
+                                    st.session_state.get("transfer_date", None)
+                                )
+                                clear_session_state()
+                            else:
+                                st.error("오류가 발생했습니다. 다시 처음부터 진행해주세요.")
+                                clear_session_state()
+                        except Exception as e:
+                            st.error(f"이메일 발송 중 오류 발생: {e}")
                             st.error("오류가 발생했습니다. 다시 처음부터 진행해주세요.")
                             clear_session_state()
-                    except Exception as e:
-                        st.error(f"이메일 발송 중 오류 발생: {e}")
-                        st.error("오류가 발생했습니다. 다시 처음부터 진행해주세요.")
-                        clear_session_state()
-        except Exception as e:
-            st.error(f"PDF 미리보기 이미지 생성 중 오류 발생: {e}")
-            st.error("PDF 파일을 다운로드하여 확인해 주세요.")
-            st.download_button(
-                label="💾 전입학예정확인서 내려받기",
-                data=st.session_state.pdf_bytes,
-                file_name=st.session_state.filename,
-                mime='application/pdf'
-            )
+            except Exception as e:
+                st.error(f"PDF 미리보기 이미지 생성 중 오류 발생: {e}")
+                st.error("PDF 파일을 다운로드하여 확인해 주세요.")
+                st.download_button(
+                    label="💾 전입학예정확인서 내려받기",
+                    data=build_final_pdf,
+                    file_name=st.session_state.filename,
+                    mime='application/pdf'
+                )
+                clear_session_state()
+        elif st.session_state.get("preview_handles"):
+            st.error("작성한 지 오래되어 PDF가 만료되었습니다. 처음부터 다시 진행해주세요.")
+            clear_session_state()
+        else:
+            st.error("PDF가 생성되지 않았습니다. 3단계로 돌아가 PDF를 생성해 주세요.")
             clear_session_state()
-    else:
-        st.error("PDF가 생성되지 않았습니다. 3단계로 돌아가 PDF를 생성해 주세요.")
-        clear_session_state()
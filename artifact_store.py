@@ -0,0 +1,133 @@
+"""
+세션별로 만든 PDF·미리보기 바이트를 디스크에 보관하고, 세션 상태에는 핸들(문자열)만 둡니다.
+
+- ttl초 동안 읽히지 않은 항목은 만료되어 지워집니다(버려진 세션 정리).
+- 전체 크기가 max_bytes를 넘으면 가장 오래 읽히지 않은 항목부터 지웁니다(LRU).
+- 파일은 프로세스 전용 임시 디렉터리에 두며, 프로세스 종료 시 디렉터리째 지웁니다.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_Entry = namedtuple("_Entry", ["path", "size", "last_access"])
+
+
+class ArtifactStore:
+    """
+    parent_dir 아래(None이면 시스템 임시 디렉터리)에 전용 디렉터리를 만들어 사용합니다.
+    """
+
+    def __init__(self, parent_dir=None, ttl=3600.0, max_bytes=256 * 1024 * 1024):
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix="artifacts-", dir=parent_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"stored": 0, "hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        atexit.register(self.close)
+
+    # ────────────────────────────────────────────────────────
+    def put(self, data):
+        """
+        바이트를 파일로 쓰고 핸들을 반환합니다. 쓰는 김에 만료·용량 초과 항목을 정리합니다.
+        """
+        handle = uuid.uuid4().hex
+        path = os.path.join(self.root, handle)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._entries[handle] = _Entry(path, len(data), time.monotonic())
+            self._disk_bytes += len(data)
+            self._counters["stored"] += 1
+            self._sweep_locked()
+        return handle
+
+    def get(self, handle):
+        """
+        핸들의 바이트를 읽어 반환합니다. 만료되었거나 지워진 항목이면 None입니다.
+        """
+        with self._lock:
+            entry = self._entries.get(handle) if handle else None
+            if entry is not None and time.monotonic() - entry.last_access > self.ttl:
+                self._remove_locked(handle)
+                self._counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries[handle] = entry._replace(last_access=time.monotonic())
+            self._entries.move_to_end(handle)
+            self._counters["hits"] += 1
+        try:
+            with open(entry.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # 읽는 사이에 다른 세션의 put()이 LRU로 지운 경우입니다.
+            return None
+
+    def discard(self, *handles):
+        with self._lock:
+            for handle in handles:
+                if handle in self._entries:
+                    self._remove_locked(handle)
+
+    def usage(self):
+        """
+        보관 중인 항목 수·디스크 사용량과 누적 카운터, 프로세스 최대 RSS(가능한 경우)를 반환합니다.
+        """
+        with self._lock:
+            stats = {
+                "artifacts": len(self._entries),
+                "disk_bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes,
+                **self._counters,
+            }
+        if resource is not None:
+            # 리눅스의 ru_maxrss 단위는 KiB입니다.
+            stats["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            self._disk_bytes = 0
+        shutil.rmtree(self.root, ignore_errors=True)
+    # ────────────────────────────────────────────────────────
+
+    # ────────────────────────────────────────────────────────
+    def _remove_locked(self, handle):
+        entry = self._entries.pop(handle)
+        self._disk_bytes -= entry.size
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def _sweep_locked(self):
+        # 접근 순서대로 정렬되어 있으므로 앞쪽만 확인하면 됩니다.
+        now = time.monotonic()
+        while self._entries:
+            handle, entry = next(iter(self._entries.items()))
+            if now - entry.last_access > self.ttl:
+                self._counters["expired"] += 1
+            elif self._disk_bytes > self.max_bytes and len(self._entries) > 1:
+                self._counters["evicted"] += 1
+            else:
+                break
+            self._remove_locked(handle)
+    # ────────────────────────────────────────────────────────
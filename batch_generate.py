@@ -0,0 +1,172 @@
+"""
+신청자 명단(CSV/XLSX)과 미리 받은 서명 이미지로 전입학예정확인서 PDF를 일괄 생성합니다.
+
+    python batch_generate.py applicants.xlsx -o out --workers 8
+
+명단에는 COLUMNS의 열이 모두 있어야 합니다.
+'학생 서명', '법정대리인 서명' 열은 서명 이미지 경로이며, 상대 경로는 명단 파일 위치를 기준으로 합니다.
+각 행은 렌더링 전에 앱과 같은 입력 규칙(field_checks)과 날짜 형식으로 검사하며,
+통과하지 못한 행은 틀린 열 이름과 함께 보고하고 건너뜁니다.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from PIL import Image
+
+import field_checks
+import form_layout
+import form_render
+import signature
+
+COLUMNS = {
+    "학생 성명": "student_name",
+    "학생 생년월일": "student_birth_date",
+    "현 소속 학교 및 학년": "student_school",
+    "법정대리인 성명": "parent_name",
+    "학생과의 관계": "relationship",
+    "휴대전화 번호": "parent_phone",
+    "전입 예정일": "move_date",
+    "전입 예정 주소": "address",
+    "전학 예정일": "transfer_date",
+    "전학 예정 학교": "school_name",
+    "전학 예정 학년": "next_grade",
+    "학생 서명": "student_sign",
+    "법정대리인 서명": "parent_sign",
+}
+DATE_FIELDS = ("student_birth_date", "move_date", "transfer_date")
+FIELD_COLUMNS = {field: col for col, field in COLUMNS.items()}
+
+
+# ────────────────────────────────────────────────────────
+def read_applicants(path):
+    """
+    명단을 읽어 ([(행 번호, 신청자 정보, (학생 서명 경로, 법정대리인 서명 경로)), ...], [(행 번호, 오류), ...])를
+    반환합니다. 검사를 통과하지 못한 행은 앞 목록에 넣지 않습니다.
+    """
+    if path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str)
+    missing = [col for col in COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"명단에 다음 열이 없습니다: {', '.join(missing)}")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    rows = []
+    invalid = []
+    for index, record in enumerate(df.fillna("").to_dict("records"), start=1):
+        try:
+            applicant, signs = check_applicant(record, base_dir)
+        except ValueError as e:
+            invalid.append((index, e))
+            continue
+        rows.append((index, applicant, signs))
+    return rows, invalid
+
+
+def check_applicant(record, base_dir):
+    """
+    명단 한 행을 앱과 같은 규칙으로 검사해 (신청자 정보, 서명 경로 쌍)을 반환합니다.
+    처음 걸린 열을 "열 이름: 오류" 형식의 ValueError로 알립니다.
+    """
+    applicant = {field: str(record[col]).strip() for col, field in COLUMNS.items()}
+    for field, value in applicant.items():
+        if not value:
+            raise ValueError(f"{FIELD_COLUMNS[field]}: 빈칸입니다.")
+    # 명단에는 '2학년'처럼 적은 경우가 많으므로 앱의 학년 입력(숫자만)에 맞춥니다.
+    applicant["next_grade"] = re.sub(r"\s*학년$", "", applicant["next_grade"])
+    for field, check in field_checks.FIELD_CHECKS.items():
+        value, error = check(applicant[field])
+        if error:
+            raise ValueError(f"{FIELD_COLUMNS[field]}: {error}")
+        applicant[field] = value
+    for field in DATE_FIELDS:
+        value = pd.to_datetime(applicant[field], errors="coerce")
+        if pd.isna(value):
+            raise ValueError(f"{FIELD_COLUMNS[field]}: 날짜로 읽을 수 없습니다({applicant[field]}).")
+        applicant[field] = value.date()
+    signs = []
+    for field in ("student_sign", "parent_sign"):
+        sign_path = os.path.join(base_dir, applicant.pop(field))
+        if not os.path.isfile(sign_path):
+            raise ValueError(f"{FIELD_COLUMNS[field]}: 파일이 없습니다({sign_path}).")
+        signs.append(sign_path)
+    return applicant, tuple(signs)
+
+
+def _init_worker(font_path):
+    # 작업 프로세스마다 렌더 계획과 글꼴을 한 번 준비합니다.
+    form_layout.get_plans(font_path)
+
+
+def _render_one(index, applicant, signs, out_dir, templates, font_path, backend, profile):
+    with Image.open(signs[0]) as student_sign, Image.open(signs[1]) as parent_sign:
+        stamps = form_render.signature_stamps(signature.make_stamp(student_sign), signature.make_stamp(parent_sign))
+    pdf_bytes = form_render.render_application(
+        applicant, stamps, templates, font_path, backend=backend, profile=profile
+    ).pdf_bytes
+    filename = f"{index:04d}_{form_render.output_filename(applicant['school_name'], applicant['next_grade'])}"
+    with open(os.path.join(out_dir, filename), "wb") as f:
+        f.write(pdf_bytes)
+    return len(pdf_bytes)
+# ────────────────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="전입학예정확인서 PDF 일괄 생성")
+    parser.add_argument("applicants", help="신청자 명단 (.csv 또는 .xlsx)")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", choices=("vector", "raster"), default=form_render.RENDER_BACKEND)
+    parser.add_argument("--profile", choices=tuple(form_render.PROFILES), default=None,
+                        help="raster 출력 프로필 (기본: OUTPUT_PROFILE 환경 변수)")
+    parser.add_argument("--dpi", type=int, default=None, help="raster 출력 해상도 (기본: OUTPUT_DPI 또는 200)")
+    parser.add_argument("--font", default="malgun.ttf")
+    parser.add_argument("--consent", default="consent.pdf")
+    parser.add_argument("--transfer", default="transfer.pdf")
+    args = parser.parse_args(argv)
+
+    rows, invalid = read_applicants(args.applicants)
+    os.makedirs(args.output_dir, exist_ok=True)
+    templates = (args.consent, args.transfer)
+    profile = form_render.get_profile(args.profile, args.dpi)
+
+    start = time.perf_counter()
+    total_bytes = 0
+    failures = list(invalid)
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(args.font,)
+    ) as executor:
+        futures = {
+            executor.submit(
+                _render_one, index, applicant, signs, args.output_dir, templates, args.font, args.backend,
+                profile,
+            ): index
+            for index, applicant, signs in rows
+        }
+        for future in as_completed(futures):
+            try:
+                total_bytes += future.result()
+            except Exception as e:
+                failures.append((futures[future], e))
+    elapsed = time.perf_counter() - start
+
+    total = len(rows) + len(invalid)
+    done = total - len(failures)
+    # 출력 프로필은 raster 출력에만 쓰입니다.
+    output = f"raster, {profile.name} {profile.dpi} dpi" if args.backend == "raster" else args.backend
+    print(f"{done}/{total} forms in {elapsed:.2f} s "
+          f"({done / elapsed if elapsed else 0:.1f} forms/sec, {total_bytes / 1024:.0f} KiB, "
+          f"{args.workers} workers, {output})")
+    for index, error in sorted(failures, key=lambda item: item[0]):
+        print(f"  row {index}: {error}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
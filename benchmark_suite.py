@@ -0,0 +1,461 @@
+"""
+3단계 렌더링 파이프라인을 단계별로 측정하고, 기준값(baseline)과 비교해 성능 저하를 찾습니다.
+
+    python benchmark_suite.py --font malgun.ttf -n 30 --save-baseline   # 기준값 저장
+    python benchmark_suite.py --font malgun.ttf -n 30                   # 기준값과 비교
+    python benchmark_suite.py --font malgun.ttf --only draft --scenario placement --draft-dpi 72 100
+
+측정 단계
+- template_legacy : 예전 방식. 제출마다 poppler 2회 + RGBA·RGB 변환
+- template_raster : 양식 PDF 2장을 poppler로 차례로 래스터화 (캐시가 없을 때의 비용)
+- template_raster_parallel : 같은 작업을 PDF_RASTER_WORKERS/PDF_RASTER_THREADS 설정으로 동시에
+- template_copy   : 템플릿 저장소에서 그릴 페이지 사본 2장 받기 (제출마다의 비용)
+- signature_legacy : 예전 방식. 면적 계산 + PNG 왕복 + 늘려서 크기 맞춤
+- signature       : st_canvas 배열 2개 → 서명 도장 (signature.process_signature)
+- signature_strokes : st_canvas json_data 2개 → 서명 도장 (signature.process_strokes)
+- text_draw       : 두 페이지에 글자 쓰기
+- signature_paste : 두 페이지에 서명 도장 붙이기
+- pdf_raster      : 그린 페이지를 raster PDF로 인코딩 (OUTPUT_PROFILE)
+- pdf_vector      : vector PDF 생성
+- preview         : 미리보기 WebP 인코딩
+- draft           : DRAFT_DPI에서 바로 그린 미리보기 초안 (render_draft)
+- end_to_end      : render_application(preview=True) 전체
+
+시나리오(--scenario, --only가 없으면 모두 실행)
+- fidelity  : raster 출력 프로필(--dpi 해상도별)의 인코딩 시간·크기와 color@LAYOUT_DPI 대비 화질
+              (PSNR, 잉크 픽셀 불일치율)
+- placement : --draft-dpi 해상도별 미리보기 초안과 최종 출력의 작성칸 위치 차이
+              (계획의 기준점 오차, 작성칸별 잉크 경계 상자 차이, 페이지 단위 = 1/LAYOUT_DPI 인치)
+
+입력은 고정 시드로 만든 합성 신청자·서명이라 실행마다 같습니다.
+시간은 p50/p95, 메모리는 한 번 더 실행해 tracemalloc(파이썬 할당)과 RSS 최고치 증가분(리눅스)을 잽니다.
+기준값은 기계마다 다르므로 로컬 .cache/에 저장하며, p50 또는 메모리가 --tolerance 이상 늘면 종료 코드 1을 반환합니다.
+
+렌더링 단계에는 기계와 무관한 메모리 예산(MEMORY_BUDGETS)도 있어, 넘으면 기준값과 상관없이 종료 코드 1입니다.
+Pillow 페이지 버퍼는 tracemalloc에 잡히지 않으므로 RSS 최고치로 재며, glibc가 해제한 큰 버퍼를 붙잡아 두지 않도록
+MALLOC_MMAP_THRESHOLD_를 고정한 채 스스로 다시 실행합니다(--no-budget으로 끔).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageDraw
+from pypdf import PdfReader
+
+import form_layout
+import form_render
+import pdf_raster
+import signature
+
+DEFAULT_BASELINE = os.path.join(".cache", "benchmark_baseline.json")
+SCENARIOS = ("fidelity", "placement")
+MMAP_THRESHOLD = "131072"
+
+# 단계 → (파이썬 할당 최고치 MiB, RSS 최고치 증가분 MiB). 200 DPI 출력 기준이며,
+# raster 경로는 그린 페이지를 한 장(RGB 11.6 MiB)씩만 들고 있다는 전제입니다.
+MEMORY_BUDGETS = {
+    "pdf_raster": (2, 16),
+    "draft": (1, 12),
+    "end_to_end": (2, 32),
+}
+
+
+# ────────────────────────────────────────────────────────
+def sample_applicant():
+    return {
+        "student_name": "한잎새",
+        "student_birth_date": date(2017, 1, 1),
+        "student_school": "대한초등학교 1학년",
+        "parent_name": "한나무",
+        "relationship": "부",
+        "parent_phone": "010-5678-5678",
+        "move_date": date(2025, 2, 2),
+        "address": "행복택지 A-1블록 사랑아파트 101동 1001호",
+        "transfer_date": date(2025, 3, 1),
+        "school_name": "민국초등학교",
+        "next_grade": "2학년",
+    }
+
+
+def _sample_paths(seed, size, strokes):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(strokes):
+        x, y = rng.uniform(10, 60), rng.uniform(20, size[1] - 20)
+        points = [(x, y)]
+        while x < size[0] - 20:
+            x += rng.uniform(8, 20)
+            y = min(size[1] - 10, max(10, y + rng.uniform(-25, 25)))
+            points.append((x, y))
+        paths.append(points)
+    return paths
+
+
+def sample_canvas(seed, size=(300, 150), strokes=3):
+    """
+    st_canvas(stroke_width=5)의 image_data처럼 투명 바탕에 검은 획이 있는 (높이, 너비, 4) uint8 배열입니다.
+    """
+    canvas = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    for points in _sample_paths(seed, size, strokes):
+        draw.line(points, fill=(0, 0, 0, 255), width=5, joint="curve")
+    return np.asarray(canvas)
+
+
+def sample_strokes(seed, size=(300, 150), strokes=3):
+    """
+    sample_canvas()와 같은 획을 st_canvas의 json_data(fabric.js 경로) 형태로 만듭니다.
+    """
+    return {"objects": [
+        {"type": "path", "strokeWidth": 5,
+         "path": [["M", *points[0]], *(["L", *point] for point in points[1:])]}
+        for points in _sample_paths(seed, size, strokes)
+    ]}
+
+
+def sample_render_inputs():
+    """
+    합성 신청자·서명으로 (동의서 값, 전입학예정확인서 값, 서명 도장)을 만듭니다.
+    """
+    consent_values, transfer_values = form_render.build_field_values(sample_applicant(), today=date(2025, 1, 2))
+    stamps = form_render.signature_stamps(*(signature.process_signature(sample_canvas(seed))[1] for seed in (1, 2)))
+    return consent_values, transfer_values, stamps
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+# 예전 방식(비교용)
+def legacy_pages(templates):
+    """제출마다 poppler 2회 + RGBA 변환 + RGB 변환."""
+    return [
+        pdf_raster.convert_from_path(path, dpi=form_layout.LAYOUT_DPI)[0].convert('RGBA').convert('RGB')
+        for path in templates
+    ]
+
+
+def legacy_stamp(image_data):
+    """면적 계산 + PNG(optimize) 인코딩 → 디코딩 → 늘려서 크기 맞춤 + RGBA 변환."""
+    alpha_channel = image_data[:, :, 3]
+    coverage = (alpha_channel > 0).sum() / (image_data.shape[0] * image_data.shape[1])
+    buffer = BytesIO()
+    Image.fromarray(image_data.astype('uint8'), mode='RGBA').save(buffer, format='PNG', optimize=True)
+    buffer.seek(0)
+    return coverage, Image.open(buffer).resize(form_layout.SIGNATURE_BOX).convert('RGBA')
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+def _peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # 리눅스 4.0+에서 VmHWM을 현재 RSS로 되돌립니다.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def run_case(setup, func, runs):
+    """
+    setup()이 만든 인자로 func를 runs번 실행해 시간을 재고, 한 번 더 실행해 메모리를 잽니다.
+    setup 시간은 측정에서 빠집니다.
+    """
+    durations = []
+    for _ in range(runs):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    args = setup()
+    rss_reset = _reset_peak_rss()
+    rss_before = _peak_rss()
+    tracemalloc.start()
+    func(*args)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = _peak_rss()
+
+    durations.sort()
+    return {
+        "p50_ms": statistics.median(durations),
+        "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        "python_peak_bytes": python_peak,
+        "rss_peak_delta_bytes": rss_after - rss_before if rss_reset and rss_before and rss_after else None,
+    }
+
+
+def build_cases(templates, font_path):
+    applicant = sample_applicant()
+    canvases = (sample_canvas(1), sample_canvas(2))
+    stroke_data = (sample_strokes(1), sample_strokes(2))
+    consent_values, transfer_values, stamps = sample_render_inputs()
+    consent_plan, transfer_plan = form_layout.get_plans(font_path)
+    pages = form_render.render_pages(consent_values, transfer_values, stamps, templates, font_path)
+
+    def blank_pages():
+        return ([pdf_raster.get_template_page(path, dpi=form_layout.LAYOUT_DPI) for path in templates],)
+
+    def draw(page_list, values_list, stamps):
+        for page, plan, values in zip(page_list, (consent_plan, transfer_plan), values_list):
+            form_layout.render_page(page, plan, values, stamps)
+
+    no_args = lambda: ()
+    return {
+        "template_legacy": (no_args, lambda: legacy_pages(templates)),
+        "template_raster": (
+            no_args,
+            lambda: [pdf_raster.convert_from_path(path, dpi=form_layout.LAYOUT_DPI, thread_count=1)
+                    for path in templates],
+        ),
+        "template_raster_parallel": (
+            no_args,
+            lambda: pdf_raster.convert_many([(path, form_layout.LAYOUT_DPI) for path in templates]),
+        ),
+        "template_copy": (no_args, blank_pages),
+        "signature_legacy": (no_args, lambda: [legacy_stamp(c) for c in canvases]),
+        "signature": (no_args, lambda: [signature.process_signature(c) for c in canvases]),
+        "signature_strokes": (no_args, lambda: [signature.process_strokes(d) for d in stroke_data]),
+        "text_draw": (blank_pages, lambda p: draw(p, (consent_values, transfer_values), {})),
+        "signature_paste": (blank_pages, lambda p: draw(p, ({}, {}), stamps)),
+        "pdf_raster": (no_args, lambda: form_render.render_raster(
+            consent_values, transfer_values, stamps, templates, font_path, pages=pages)),
+        "pdf_vector": (no_args, lambda: form_render.render_vector(
+            consent_values, transfer_values, stamps, templates, font_path)),
+        "preview": (no_args, lambda: form_render.encode_previews(pages)),
+        "draft": (no_args, lambda: form_render.render_draft(
+            consent_values, transfer_values, stamps, templates, font_path)),
+        "end_to_end": (no_args, lambda: form_render.render_application(
+            applicant, form_render.signature_stamps(*(signature.process_signature(c)[1] for c in canvases)),
+            templates, font_path, preview=True)),
+    }
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+# 시나리오: 시간 외에 화질·배치를 확인하는 보고
+def decoded_pages(pdf_bytes, sizes):
+    """
+    raster PDF에 들어간 페이지 이미지를 꺼내 sizes(LAYOUT_DPI 페이지 크기)로 맞춘 회색조 배열로 돌려줍니다.
+    """
+    return [
+        np.asarray(page.images[0].image.convert("L").resize(size, Image.BILINEAR), dtype=np.float64)
+        for page, size in zip(PdfReader(BytesIO(pdf_bytes)).pages, sizes)
+    ]
+
+
+def fidelity(reference, candidate):
+    """(PSNR dB, 잉크 픽셀 불일치율)을 반환합니다. 잉크는 밝기 128 미만인 픽셀입니다."""
+    mse = statistics.mean(float(np.mean((r - c) ** 2)) for r, c in zip(reference, candidate))
+    psnr = float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+    mismatch = statistics.mean(float(np.mean((r < 128) != (c < 128))) for r, c in zip(reference, candidate))
+    return psnr, mismatch
+
+
+def profile_fidelity(templates, font_path, dpis, runs):
+    """
+    [(프로필@해상도, p50 ms, 바이트, PSNR, 잉크 불일치율), ...]. 기준은 color 프로필, LAYOUT_DPI 출력입니다.
+    """
+    consent_values, transfer_values, stamps = sample_render_inputs()
+    pages = form_render.render_pages(consent_values, transfer_values, stamps, templates, font_path)
+    sizes = [page.size for page in pages]
+
+    def encode(profile):
+        return form_render.render_raster(None, None, None, templates, font_path, pages=pages, profile=profile)
+
+    reference = decoded_pages(encode(form_render.get_profile("color", form_layout.LAYOUT_DPI)), sizes)
+    rows = []
+    for name in form_render.PROFILES:
+        for dpi in dpis:
+            profile = form_render.get_profile(name, dpi)
+            data = encode(profile)
+            p50 = run_case(lambda: (), lambda: encode(profile), runs)["p50_ms"]
+            psnr, mismatch = fidelity(reference, decoded_pages(data, sizes))
+            rows.append((f"{name}@{dpi}", p50, len(data), psnr, mismatch))
+    return rows
+
+
+def field_extents(plans, values_list, stamps, templates, dpi):
+    """
+    작성칸을 하나씩 흰 페이지에 그려 잉크 경계 상자(왼쪽, 위, 오른쪽, 아래)를 페이지 단위로 반환합니다.
+    """
+    unit = form_layout.LAYOUT_DPI / dpi
+    extents = []
+    for plan, values, path in zip(plans, values_list, templates):
+        size = pdf_raster.get_template_page(path, dpi=dpi).size
+        for op in plan.texts + plan.images:
+            if not (values.get(op.key) or stamps.get(op.key)):
+                continue
+            page = Image.new("RGB", size, "white")
+            single = form_layout.RenderPlan(*(((op,), ()) if op in plan.texts else ((), (op,))), dpi=dpi)
+            form_layout.render_page(page, single, values, stamps)
+            bbox = page.convert("L").point(lambda v: 255 if v < 128 else 0).getbbox()
+            if bbox:
+                extents.append((op.key, tuple(v * unit for v in bbox)))
+    return extents
+
+
+def draft_placement(templates, font_path, dpis):
+    """
+    [(초안 해상도, 기준점 오차, 잉크 경계 최대 차이, 평균 차이), ...]. 단위는 페이지 단위입니다.
+    """
+    consent_values, transfer_values, stamps = sample_render_inputs()
+    values_list = (consent_values, transfer_values)
+    final_plans = form_layout.get_plans(font_path)
+    final_extents = field_extents(final_plans, values_list, stamps, templates, form_layout.LAYOUT_DPI)
+    rows = []
+    for dpi in dpis:
+        draft_plans = form_layout.get_plans(font_path, dpi)
+        anchor = max(form_layout.placement_error(draft, final) for draft, final in zip(draft_plans, final_plans))
+        draft_extents = field_extents(draft_plans, values_list, stamps, templates, dpi)
+        edges = [abs(d - f) for (_, de), (_, fe) in zip(draft_extents, final_extents) for d, f in zip(de, fe)]
+        rows.append((dpi, anchor, max(edges), statistics.mean(edges)))
+    return rows
+
+
+def print_scenarios(names, templates, font_path, args):
+    if "fidelity" in names:
+        for name, p50, size, psnr, mismatch in profile_fidelity(templates, font_path, args.dpi, args.runs):
+            print(f"{name:<24} {p50:9.2f} ms {size / 1024:8.1f} KiB  PSNR {psnr:5.1f} dB  ink mismatch {mismatch:.2%}")
+    if "placement" in names:
+        for dpi, anchor, max_edge, mean_edge in draft_placement(templates, font_path, args.draft_dpi):
+            print(f"{'draft@' + str(dpi):<24} anchor error {anchor:.2f}  field ink edges: max {max_edge:.2f}, "
+                  f"mean {mean_edge:.2f} units (1 draft pixel = {form_layout.LAYOUT_DPI / dpi:.2f})")
+
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+def compare(results, baseline, tolerance):
+    """
+    기준값 대비 p50 시간이나 메모리(파이썬 할당 최고치)가 tolerance 비율 이상 늘어난 단계 목록을 반환합니다.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("p50_ms", "python_peak_bytes"):
+            if base.get(metric) and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append((name, metric, base[metric], result[metric]))
+    return regressions
+
+
+def over_budget(results):
+    """
+    MEMORY_BUDGETS를 넘은 (단계, 지표, 예산 바이트, 측정 바이트) 목록을 반환합니다. RSS를 못 잰 단계는 파이썬 할당만 봅니다.
+    """
+    exceeded = []
+    for name, (python_mib, rss_mib) in MEMORY_BUDGETS.items():
+        result = results.get(name)
+        if not result:
+            continue
+        for metric, budget in (("python_peak_bytes", python_mib), ("rss_peak_delta_bytes", rss_mib)):
+            value = result[metric]
+            if value is not None and value > budget * 2**20:
+                exceeded.append((name, metric, budget * 2**20, value))
+    return exceeded
+
+
+def print_table(results, baseline):
+    print(f"{'stage':<24} {'p50 ms':>9} {'p95 ms':>9} {'py peak':>10} {'rss peak':>10} {'p50 vs base':>12}")
+    for name, r in results.items():
+        rss = "-" if r["rss_peak_delta_bytes"] is None else f"{r['rss_peak_delta_bytes'] / 2**20:7.1f} MiB"
+        base = baseline.get(name, {}).get("p50_ms")
+        delta = f"{(r['p50_ms'] / base - 1) * 100:+10.1f} %" if base else ""
+        print(f"{name:<24} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} "
+              f"{r['python_peak_bytes'] / 2**20:6.1f} MiB {rss:>10} {delta:>12}")
+# ────────────────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="렌더링 파이프라인 단계별 벤치마크")
+    parser.add_argument("-n", "--runs", type=int, default=20)
+    parser.add_argument("--font", default="malgun.ttf")
+    parser.add_argument("--consent", default="consent.pdf")
+    parser.add_argument("--transfer", default="transfer.pdf")
+    parser.add_argument("--only", nargs="+", help="측정할 단계 이름")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="성능 저하로 볼 증가 비율 (기본 0.2)")
+    parser.add_argument("--json", help="결과를 JSON 파일로도 저장")
+    parser.add_argument("--no-budget", action="store_true", help="메모리 예산 검사를 하지 않음")
+    parser.add_argument("--scenario", nargs="*", choices=SCENARIOS,
+                        help="실행할 시나리오 (기본: --only가 없으면 모두, 빈 목록이면 없음)")
+    parser.add_argument("--dpi", type=int, nargs="+", default=[form_layout.LAYOUT_DPI, 150],
+                        help="fidelity 시나리오에서 출력 프로필을 잴 해상도 목록")
+    parser.add_argument("--draft-dpi", type=int, nargs="+", default=[72, form_render.DRAFT_DPI],
+                        help="placement 시나리오에서 미리보기 초안을 확인할 해상도 목록")
+    args = parser.parse_args(argv)
+
+    if not args.no_budget and sys.platform.startswith("linux") and "MALLOC_MMAP_THRESHOLD_" not in os.environ:
+        # 환경 변수는 프로세스 시작 때만 적용되므로 같은 인자로 다시 실행합니다.
+        env = {**os.environ, "MALLOC_MMAP_THRESHOLD_": MMAP_THRESHOLD}
+        args_list = sys.argv[1:] if argv is None else list(argv)
+        os.execve(sys.executable, [sys.executable, os.path.abspath(__file__), *args_list], env)
+
+    templates = (args.consent, args.transfer)
+    cases = build_cases(templates, args.font)
+    selected = args.only or list(cases)
+    unknown = [name for name in selected if name not in cases]
+    if unknown:
+        parser.error(f"알 수 없는 단계: {', '.join(unknown)} (가능: {', '.join(cases)})")
+
+    results = {}
+    for name in selected:
+        setup, func = cases[name]
+        try:
+            func(*setup())  # 워밍업
+        except Exception as e:
+            print(f"{name:<24} 건너뜀: {e}", file=sys.stderr)
+            continue
+        results[name] = run_case(setup, func, args.runs)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+    scenarios = args.scenario if args.scenario is not None else ([] if args.only else SCENARIOS)
+    print_scenarios(scenarios, templates, args.font, args)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "created_at": time.time(), "results": results}, f, indent=2)
+        print(f"기준값을 저장했습니다: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, before, after in regressions:
+        print(f"성능 저하: {name} {metric} {before:.2f} → {after:.2f}", file=sys.stderr)
+    exceeded = [] if args.no_budget else over_budget(results)
+    for name, metric, budget, value in exceeded:
+        print(f"메모리 예산 초과: {name} {metric} {value / 2**20:.1f} MiB > {budget / 2**20:.0f} MiB", file=sys.stderr)
+    return 1 if regressions or exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+3단계 입력칸 검사기입니다. 앱의 입력칸과 일괄 생성(batch_generate)의 명단 검사가 같은 규칙을 씁니다.
+검사기는 입력 문자열 → (저장할 값, 오류 메시지 또는 None)을 반환합니다.
+"""
+import re
+
+
+def format_phone_number(phone_input):
+    digits = ''.join(filter(str.isdigit, phone_input))
+    if len(digits) != 11 or not digits.startswith('010'):
+        return None, "휴대전화 번호는 010으로 시작하며 숫자로만 작성하세요."
+    # 010-XXXX-XXXX 형식으로 변환
+    formatted = f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
+    return formatted, None
+
+
+def check_hangul_name(raw):
+    if not re.match(r'^[가-힣]+$', raw):
+        return "", "한글로만 작성하세요."
+    return raw, None
+
+
+def check_student_school(raw):
+    if "학교" not in raw or not re.search(r"\d+학년", raw):
+        return "", "'학교'와 '학년' 단어를 반드시 포함하여 작성하세요."
+    if not re.match(r'^[가-힣0-9\s]+$', raw) or re.match(r'^\d+$', raw):
+        return "", "한글과 숫자로만 작성하세요."
+    return raw, None
+
+
+def check_relationship(raw):
+    if not re.match(r'^[가-힣\s]+$', raw):
+        return "", "한글로만 작성하세요."
+    return raw, None
+
+
+def check_phone(raw):
+    formatted, error = format_phone_number(raw)
+    return formatted or "", error
+
+
+def check_address(raw):
+    if not re.match(r'^[가-힣a-zA-Z0-9\s\-]+$', raw):
+        return "", "한글, 알파벳, 숫자, 기호로만 작성하세요."
+    return raw, None
+
+
+def check_next_grade(raw):
+    if not re.fullmatch(r"[1-6]", raw):
+        return "", "1~6 사이의 숫자만 입력하세요."
+    return f"{raw}학년", None
+
+
+# 신청자 정보(form_render.build_field_values의 applicant) 필드 → 검사기
+FIELD_CHECKS = {
+    "student_name": check_hangul_name,
+    "student_school": check_student_school,
+    "parent_name": check_hangul_name,
+    "relationship": check_relationship,
+    "parent_phone": check_phone,
+    "address": check_address,
+    "next_grade": check_next_grade,
+}
@@ -0,0 +1,207 @@
+"""
+동의서·전입학예정확인서의 작성칸 배치를 선언적으로 정의하고,
+프로세스당 한 번 검증·컴파일하여 렌더 계획(RenderPlan)으로 만듭니다.
+
+배치 좌표·글꼴 크기·서명 상자(SIGNATURE_BOX)의 단위는 포인트(1/72인치)가 아니라 1/200인치입니다
+(배치 단위, LAYOUT_UNITS_PER_INCH). 1단위는 0.36pt이므로 글꼴 크기 42는 약 15pt입니다.
+양식을 LAYOUT_DPI(= 200)로 래스터화하면 배치 단위 하나가 정확히 한 픽셀이 됩니다.
+get_plans(font_path, dpi)는 같은 배치에 dpi / LAYOUT_UNITS_PER_INCH를 곱해 그 해상도의 픽셀 계획으로 컴파일하므로,
+미리보기용 저해상도 초안과 최종 출력이 같은 배치를 공유합니다(vector 출력은 계획의 픽셀에 72/dpi를 곱해 pt로 씁니다).
+"""
+import re
+import textwrap
+from dataclasses import dataclass
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+LAYOUT_UNITS_PER_INCH = 200
+# 기본 래스터 해상도입니다. 이 해상도에서는 배치 단위와 픽셀이 같습니다.
+LAYOUT_DPI = LAYOUT_UNITS_PER_INCH
+DEFAULT_FONT_SIZE = 42
+SIGNATURE_BOX = (312, 104)
+
+# 키 → 배치 목록. 좌표·크기는 모두 배치 단위(1/200인치)입니다. 배치 항목의 옵션:
+#   at   : 기준 좌표 (x, y), 페이지 왼쪽 위에서부터
+#   dx   : x 보정값 (기본 0)
+#   size : 글꼴 크기 (기본 DEFAULT_FONT_SIZE, pt가 아닌 배치 단위)
+#   wrap : 한 줄 최대 글자 수 (지정 시 줄바꿈하여 아래로 이어 씀)
+#   type : "text" 또는 "image" (서명)
+CONSENT_LAYOUT = {
+    "{{date.today}}": [{"at": (1100, 1550)}],
+    "{{student_name}}": [{"at": (825, 1695), "dx": -15}],
+    "{{student_sign_path}}": [{"at": (1060, 1665), "dx": -15, "type": "image"}],
+    "{{parent_name}}": [{"at": (825, 1835), "dx": -15}],
+    "{{parent_sign_path}}": [{"at": (1060, 1810), "dx": -15, "type": "image"}],
+    "{{school_name}}": [{"at": (925, 1988)}],
+}
+
+TRANSFER_LAYOUT = {
+    "{{student_name}}": [{"at": (462, 420)}, {"at": (825, 1755)}],
+    "{{parent_name}}": [{"at": (1110, 420)}, {"at": (825, 1888)}],
+    "{{student_school}}": [{"at": (462, 625), "size": 32}],
+    "{{relationship}}": [{"at": (1110, 520)}],
+    "{{student_birth_date}}": [{"at": (462, 520)}],
+    "{{parent_phone}}": [{"at": (1110, 620)}],
+    "{{move_date}}": [{"at": (462, 825)}],
+    "{{address}}": [
+        {"at": (1110, 810), "dx": -7, "size": 32, "wrap": 11},
+        {"at": (490, 1170), "dx": -50, "size": 40},
+    ],
+    "{{transfer_date}}": [{"at": (462, 930)}],
+    "{{school_name}}": [{"at": (462, 1035)}, {"at": (310, 1235)}, {"at": (925, 2056)}],
+    "{{next_grade}}": [{"at": (1110, 1035)}, {"at": (840, 1235), "dx": 50}],
+    "{{date.today}}": [{"at": (1100, 1620)}],
+    "{{student_sign_path}}": [{"at": (1060, 1730), "type": "image"}],
+    "{{parent_sign_path}}": [{"at": (1060, 1870), "type": "image"}],
+}
+
+_KEY_PATTERN = re.compile(r"^\{\{[a-z_.]+\}\}$")
+_OPTIONS = {"at", "dx", "size", "wrap", "type"}
+
+
+@dataclass(frozen=True)
+class TextOp:
+    key: str
+    x: int
+    y: int
+    font: ImageFont.FreeTypeFont
+    wrap: int = 0
+
+
+@dataclass(frozen=True)
+class ImageOp:
+    key: str
+    x: int
+    y: int
+    size: tuple = SIGNATURE_BOX
+
+
+@dataclass(frozen=True)
+class RenderPlan:
+    texts: tuple
+    images: tuple
+    dpi: int = LAYOUT_DPI
+
+
+# ────────────────────────────────────────────────────────
+def validate_layout(layout):
+    """
+    배치 정의가 올바른지 확인하고, 잘못된 경우 ValueError를 발생시킵니다.
+    """
+    for key, placements in layout.items():
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"잘못된 작성칸 키입니다: {key}")
+        if not placements:
+            raise ValueError(f"{key}: 배치가 비어 있습니다.")
+        for idx, placement in enumerate(placements):
+            where = f"{key}[{idx}]"
+            unknown = set(placement) - _OPTIONS
+            if unknown:
+                raise ValueError(f"{where}: 알 수 없는 옵션 {sorted(unknown)}")
+            at = placement.get("at")
+            if not (isinstance(at, tuple) and len(at) == 2 and all(isinstance(v, int) for v in at)):
+                raise ValueError(f"{where}: 'at'은 (x, y) 정수 좌표여야 합니다.")
+            if not isinstance(placement.get("dx", 0), int):
+                raise ValueError(f"{where}: 'dx'는 정수여야 합니다.")
+            kind = placement.get("type", "text")
+            if kind not in ("text", "image"):
+                raise ValueError(f"{where}: 'type'은 'text' 또는 'image'여야 합니다.")
+            if kind == "image" and ("size" in placement or "wrap" in placement):
+                raise ValueError(f"{where}: 서명 배치에는 'size'/'wrap'을 지정할 수 없습니다.")
+            size = placement.get("size", DEFAULT_FONT_SIZE)
+            if not (isinstance(size, int) and size > 0):
+                raise ValueError(f"{where}: 'size'는 양의 정수여야 합니다.")
+            wrap = placement.get("wrap", 0)
+            if not (isinstance(wrap, int) and wrap >= 0):
+                raise ValueError(f"{where}: 'wrap'은 0 이상의 정수여야 합니다.")
+
+
+@lru_cache(maxsize=None)
+def load_font(font_path, size):
+    """
+    (글꼴 경로, 크기)별로 한 번만 TrueType 글꼴을 읽어 재사용합니다.
+    """
+    return ImageFont.truetype(font_path, size)
+
+
+def compile_layout(layout, font_path, dpi=LAYOUT_DPI):
+    """
+    배치 정의를 검증한 뒤 좌표 보정과 글꼴 로딩을 끝낸 RenderPlan으로 컴파일합니다.
+    배치 단위 좌표·글꼴 크기·서명 상자에 dpi / LAYOUT_UNITS_PER_INCH를 곱해 가장 가까운 픽셀로 맞춥니다.
+    """
+    validate_layout(layout)
+    scale = dpi / LAYOUT_UNITS_PER_INCH
+    box = (max(1, round(SIGNATURE_BOX[0] * scale)), max(1, round(SIGNATURE_BOX[1] * scale)))
+    texts = []
+    images = []
+    for key, placements in layout.items():
+        for placement in placements:
+            x, y = placement["at"]
+            x, y = round((x + placement.get("dx", 0)) * scale), round(y * scale)
+            if placement.get("type", "text") == "image":
+                images.append(ImageOp(key, x, y, box))
+            else:
+                font = load_font(font_path, max(1, round(placement.get("size", DEFAULT_FONT_SIZE) * scale)))
+                texts.append(TextOp(key, x, y, font, placement.get("wrap", 0)))
+    return RenderPlan(tuple(texts), tuple(images), dpi)
+
+
+@lru_cache(maxsize=None)
+def get_plans(font_path, dpi=LAYOUT_DPI):
+    """
+    dpi 해상도의 (동의서 계획, 전입학예정확인서 계획)을 프로세스당 한 번 컴파일하여 반환합니다.
+    """
+    return compile_layout(CONSENT_LAYOUT, font_path, dpi), compile_layout(TRANSFER_LAYOUT, font_path, dpi)
+
+
+def placement_error(plan, reference):
+    """
+    같은 배치에서 컴파일한 두 계획의 작성칸 기준점이 배치 단위로 가장 크게 어긋난 거리를 반환합니다.
+    반올림만으로 생기는 오차는 낮은 쪽 해상도의 반 픽셀(LAYOUT_UNITS_PER_INCH / dpi / 2 단위) 이하입니다.
+    """
+    if len(plan.texts) != len(reference.texts) or len(plan.images) != len(reference.images):
+        raise ValueError("서로 다른 배치에서 컴파일한 계획입니다.")
+    error = 0.0
+    for op, ref in zip(plan.texts + plan.images, reference.texts + reference.images):
+        if op.key != ref.key:
+            raise ValueError("서로 다른 배치에서 컴파일한 계획입니다.")
+        error = max(
+            error,
+            abs(op.x * LAYOUT_UNITS_PER_INCH / plan.dpi - ref.x * LAYOUT_UNITS_PER_INCH / reference.dpi),
+            abs(op.y * LAYOUT_UNITS_PER_INCH / plan.dpi - ref.y * LAYOUT_UNITS_PER_INCH / reference.dpi),
+        )
+    return error
+# ────────────────────────────────────────────────────────
+
+
+def render_page(page, plan, values, stamps):
+    """
+    page 위에 plan에 따라 글자를 쓰고 서명 이미지를 붙입니다.
+    values는 키 → 문자열, stamps는 키 → SIGNATURE_BOX 크기의 RGBA 이미지입니다.
+    plan의 서명 상자가 도장과 크기가 다르면(저해상도 초안) 도장을 줄여 붙입니다.
+    """
+    draw = ImageDraw.Draw(page)
+    for op in plan.texts:
+        text = values.get(op.key, "")
+        if not text:
+            continue
+        if op.wrap:
+            current_y = op.y
+            for line in textwrap.wrap(text, width=op.wrap):
+                draw.text((op.x, current_y), line, font=op.font, fill='black')
+                bbox = op.font.getbbox(line)
+                current_y += bbox[3] - bbox[1]
+        else:
+            draw.text((op.x, op.y), text, font=op.font, fill='black')
+    for op in plan.images:
+        stamp = stamps.get(op.key)
+        if stamp is not None:
+            if stamp.size != op.size:
+                stamp = stamp.resize(op.size, Image.BOX)
+            page.paste(stamp, (op.x, op.y), stamp)
+    return page
+
+
+validate_layout(CONSENT_LAYOUT)
+validate_layout(TRANSFER_LAYOUT)
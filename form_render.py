@@ -0,0 +1,365 @@
+"""
+작성된 값과 서명으로 최종 PDF(동의서 1쪽 + 전입학예정확인서 1쪽)를 만듭니다.
+
+- vector : 원본 양식 PDF 페이지를 그대로 두고, 글자와 서명만 오버레이로 얹습니다.
+- raster : 양식을 LAYOUT_DPI로 래스터화해 PIL로 그린 뒤 출력 프로필에 맞춰 이미지 페이지로 저장합니다.
+           페이지는 한 장씩 그려(흑백 양식은 'L' 모드) 바로 PDF에 덧붙이고 놓으므로,
+           그린 페이지가 동시에 두 장 이상 메모리에 있지 않습니다.
+
+RENDER_BACKEND 환경 변수로 기본 방식을 고르며, vector에 필요한
+pypdf/reportlab을 불러올 수 없으면 raster로 대신 생성합니다.
+
+raster 출력 프로필(OUTPUT_PROFILE, 배포별 기본값)
+- color   : RGB JPEG (기존 출력)
+- gray    : 회색조 JPEG
+- bilevel : 1비트 흑백, CCITT G4 (Pillow에 libtiff가 없으면 JPEG)
+OUTPUT_DPI를 지정하면 프로필의 해상도(기본 LAYOUT_DPI)를 바꾸며, 양식과 배치를 그 해상도로 받아 바로 그립니다.
+OUTPUT_PROFILE과 OUTPUT_DPI는 raster 출력에만 적용됩니다. vector 출력(기본값)은 원본 양식 PDF를 그대로 쓰므로
+색 모드·해상도를 바꿀 페이지 이미지가 없으며, 함께 지정하면 warm_up()이 경고를 남깁니다.
+
+미리보기는 최종 페이지를 줄이지 않고 DRAFT_DPI(기본 100)로 양식을 받아 같은 배치로 따로 그립니다(render_draft()).
+그래서 4단계 미리보기에는 최종 PDF가 필요 없으며, 최종 PDF는 제출하거나 내려받을 때만 만듭니다.
+"""
+import logging
+import os
+import textwrap
+from collections import namedtuple
+from dataclasses import dataclass, replace
+from datetime import date
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image, features
+
+import form_layout
+import layer_cache
+import pdf_raster
+
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "vector")
+DATE_FORMAT = "%Y년 %m월 %d일"
+PREVIEW_DPI = 150
+DRAFT_DPI = int(os.getenv("DRAFT_DPI", "100"))
+
+RenderedForm = namedtuple("RenderedForm", ["pdf_bytes", "previews"])
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    name: str
+    mode: str
+    dpi: int = form_layout.LAYOUT_DPI
+    quality: int = 70
+
+
+PROFILES = {
+    "color": OutputProfile("color", "RGB"),
+    "gray": OutputProfile("gray", "L"),
+    "bilevel": OutputProfile("bilevel", "1"),
+}
+OUTPUT_PROFILE = os.getenv("OUTPUT_PROFILE", "color")
+OUTPUT_DPI = os.getenv("OUTPUT_DPI")
+
+
+def get_profile(profile=None, dpi=None):
+    """
+    프로필 이름(또는 OutputProfile)과 해상도로 출력 프로필을 고릅니다.
+    지정하지 않으면 OUTPUT_PROFILE, OUTPUT_DPI 환경 변수를 따릅니다.
+    """
+    if not isinstance(profile, OutputProfile):
+        name = profile or OUTPUT_PROFILE
+        if name not in PROFILES:
+            raise ValueError(f"알 수 없는 출력 프로필입니다: {name} (가능: {', '.join(PROFILES)})")
+        profile = PROFILES[name]
+    dpi = dpi or OUTPUT_DPI
+    if dpi:
+        profile = replace(profile, dpi=int(dpi))
+    return profile
+
+
+# ────────────────────────────────────────────────────────
+def iter_pages(consent_values, transfer_values, stamps, templates, font_path, dpi=form_layout.LAYOUT_DPI):
+    """
+    dpi 해상도의 양식 페이지 사본 위에 PIL로 그린 [동의서, 전입학예정확인서]를 한 장씩 내보냅니다.
+    페이지는 양식 모드('L' 또는 'RGB') 그대로이며, 받는 쪽이 다음 페이지 전에 앞 페이지를 놓으면 한 장만 메모리에 있습니다.
+    학교·날짜 필드는 layer_cache에 미리 그려 둔 페이지를 쓰고, 신청자별 필드와 서명만 새로 그립니다.
+    """
+    consent_plan, transfer_plan = form_layout.get_plans(font_path, dpi)
+    jobs = [(templates[0], consent_plan, consent_values), (templates[1], transfer_plan, transfer_values)]
+    for layer, (_, plan, values) in zip(layer_cache.get_layers(jobs, font_path), jobs):
+        page = layer.copy()
+        form_layout.render_page(page, plan, layer_cache.dynamic_values(values), stamps)
+        yield page
+        del page
+
+
+def render_pages(consent_values, transfer_values, stamps, templates, font_path, dpi=form_layout.LAYOUT_DPI):
+    """
+    iter_pages()의 두 페이지를 목록으로 반환합니다(두 장을 함께 써야 할 때만 사용).
+    """
+    return list(iter_pages(consent_values, transfer_values, stamps, templates, font_path, dpi))
+
+
+def prepare_page(page, profile, page_dpi=form_layout.LAYOUT_DPI):
+    """
+    page_dpi로 그린 페이지를 프로필의 해상도와 색 모드로 바꿉니다. 해상도가 같으면 크기를 바꾸지 않습니다.
+    1비트는 디더링 없이 임계값으로 나눠 글자 가장자리를 깔끔하게 유지합니다.
+    흑백('L') 양식도 프로필의 모드로 바꾸며(color면 RGB), 모드가 이미 맞으면 사본을 만들지 않습니다.
+    """
+    if profile.dpi != page_dpi:
+        scale = profile.dpi / page_dpi
+        page = page.resize((round(page.width * scale), round(page.height * scale)), Image.BOX)
+    if profile.mode == "1":
+        return page.convert("L").convert("1", dither=Image.Dither.NONE)
+    if page.mode == profile.mode:
+        return page
+    return page.convert(profile.mode)
+
+
+def render_raster(consent_values, transfer_values, stamps, templates, font_path, pages=None, profile=None):
+    """
+    iter_pages()로 그린 페이지를 출력 프로필에 맞춰 한 장씩 이미지 PDF에 덧붙입니다.
+    이미 그린 pages(LAYOUT_DPI)가 있으면 다시 그리지 않고 프로필 해상도로 맞춥니다.
+    """
+    profile = get_profile(profile)
+    page_dpi = form_layout.LAYOUT_DPI
+    if not pages:
+        # 프로필 해상도의 양식·배치로 바로 그려, 200 DPI 그림을 키우거나 줄이지 않습니다.
+        page_dpi = profile.dpi
+        pages = iter_pages(consent_values, transfer_values, stamps, templates, font_path, dpi=page_dpi)
+    # quality는 JPEG 페이지에만 쓰이며, 1비트 페이지(CCITT)에 넘기면 Pillow가 거부합니다.
+    options = {} if profile.mode == "1" else {"quality": profile.quality}
+    buffer = BytesIO()
+    for index, page in enumerate(pages):
+        page = prepare_page(page, profile, page_dpi)
+        page.save(buffer, format='PDF', append=index > 0, resolution=profile.dpi, **options)
+        del page
+    return buffer.getvalue()
+
+
+def encode_previews(pages, dpi=PREVIEW_DPI, page_dpi=form_layout.LAYOUT_DPI):
+    """
+    page_dpi로 그린 페이지를 미리보기 해상도로 (필요하면 줄여) WebP(미지원 시 PNG) 바이트 목록으로 만듭니다.
+    """
+    image_format = "WEBP" if features.check("webp") else "PNG"
+    scale = dpi / page_dpi
+    previews = []
+    for page in pages:
+        if scale != 1:
+            page = page.resize((round(page.width * scale), round(page.height * scale)), Image.BOX)
+        buffer = BytesIO()
+        page.save(buffer, format=image_format, quality=80, method=0)
+        previews.append(buffer.getvalue())
+    return previews
+
+
+def render_draft(consent_values, transfer_values, stamps, templates, font_path, dpi=None):
+    """
+    DRAFT_DPI(또는 dpi) 해상도에서 바로 그린 미리보기 바이트 목록을 반환합니다.
+    최종 출력과 같은 배치를 해상도만 바꿔 컴파일하므로 작성칸 위치가 같습니다.
+    """
+    dpi = dpi or DRAFT_DPI
+    pages = iter_pages(consent_values, transfer_values, stamps, templates, font_path, dpi=dpi)
+    return encode_previews(pages, dpi=dpi, page_dpi=dpi)
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+@lru_cache(maxsize=8)
+def _read_template(abs_path, mtime_ns):
+    with open(abs_path, "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def _register_font(font_path):
+    """
+    reportlab에 TrueType 글꼴을 한 번만 등록하고 글꼴 이름을 반환합니다.
+    PDF에는 실제로 사용한 글자만 서브셋으로 포함됩니다.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    name = "FormFont-" + os.path.splitext(os.path.basename(font_path))[0]
+    pdfmetrics.registerFont(TTFont(name, font_path))
+    return name
+
+
+def _draw_overlay(canvas, plan, values, stamps, font_name, page_height):
+    """
+    RenderPlan의 픽셀 좌표(좌상단 기준, plan.dpi)를 PDF 포인트 좌표(좌하단 기준)로 바꿔 그립니다.
+    PIL의 draw.text는 y를 글꼴 상단(ascent)으로 쓰므로 기준선은 y + ascent입니다.
+    """
+    from reportlab.lib.utils import ImageReader
+
+    scale = 72 / plan.dpi
+    for op in plan.texts:
+        text = values.get(op.key, "")
+        if not text:
+            continue
+        ascent = op.font.getmetrics()[0]
+        canvas.setFont(font_name, op.font.size * scale)
+        lines = textwrap.wrap(text, width=op.wrap) if op.wrap else [text]
+        current_y = op.y
+        for line in lines:
+            canvas.drawString(op.x * scale, page_height - (current_y + ascent) * scale, line)
+            bbox = op.font.getbbox(line)
+            current_y += bbox[3] - bbox[1]
+    for op in plan.images:
+        stamp = stamps.get(op.key)
+        if stamp is None:
+            continue
+        width, height = op.size
+        canvas.drawImage(
+            ImageReader(stamp),
+            op.x * scale,
+            page_height - (op.y + height) * scale,
+            width=width * scale,
+            height=height * scale,
+            mask='auto',
+        )
+
+
+@lru_cache(maxsize=4)
+def _overlay_base(consent_key, transfer_key):
+    from pdf_overlay import OverlayBase
+
+    return OverlayBase([(_read_template(*consent_key), 0), (_read_template(*transfer_key), 0)])
+
+
+def _template_key(pdf_path):
+    abs_path = os.path.abspath(pdf_path)
+    return abs_path, os.stat(abs_path).st_mtime_ns
+
+
+def render_vector(consent_values, transfer_values, stamps, templates, font_path):
+    """
+    원본 양식 PDF 페이지 위에 글자·서명 오버레이를 얹어 벡터 PDF를 만듭니다.
+    래스터 경로와 같은 RenderPlan 좌표를 사용하며, 양식 자체는 프로세스당 한 번만 파싱합니다.
+    """
+    from reportlab.pdfgen.canvas import Canvas
+
+    consent_plan, transfer_plan = form_layout.get_plans(font_path)
+    font_name = _register_font(font_path)
+    base = _overlay_base(_template_key(templates[0]), _template_key(templates[1]))
+
+    overlay_buffer = BytesIO()
+    canvas = Canvas(overlay_buffer, pageCompression=1)
+    for (plan, values), (width, height) in zip(
+        ((consent_plan, consent_values), (transfer_plan, transfer_values)),
+        base.page_sizes,
+    ):
+        canvas.setPageSize((width, height))
+        _draw_overlay(canvas, plan, values, stamps, font_name, height)
+        canvas.showPage()
+    canvas.save()
+    return base.stamp(overlay_buffer.getvalue())
+# ────────────────────────────────────────────────────────
+
+
+def render_pdf(consent_values, transfer_values, stamps, templates, font_path, backend=None, pages=None,
+               profile=None):
+    """
+    선택된 방식(backend 또는 RENDER_BACKEND)으로 최종 PDF 바이트를 만듭니다.
+    consent_values/transfer_values는 키 → 문자열, stamps는 키 → 서명 RGBA 이미지입니다.
+    profile은 raster 출력에만 쓰입니다.
+    """
+    backend = backend or RENDER_BACKEND
+    if backend == "vector":
+        try:
+            return render_vector(consent_values, transfer_values, stamps, templates, font_path)
+        except ImportError:
+            pass
+    return render_raster(
+        consent_values, transfer_values, stamps, templates, font_path, pages=pages, profile=profile
+    )
+
+
+def warm_up(templates, font_path, backend=None):
+    """
+    최종(raster면 출력 프로필 해상도까지)·초안 해상도의 렌더 계획과 양식 페이지를 준비하고,
+    vector 방식이면 글꼴 등록과 양식 PDF 파싱까지 미리 해 둡니다.
+    vector 방식인데 OUTPUT_PROFILE/OUTPUT_DPI가 지정되어 있으면 적용되지 않는다고 경고합니다.
+    """
+    vector = (backend or RENDER_BACKEND) == "vector"
+    dpis = {form_layout.LAYOUT_DPI, DRAFT_DPI}
+    if not vector:
+        dpis.add(get_profile().dpi)
+    for dpi in dpis:
+        form_layout.get_plans(font_path, dpi)
+    pdf_raster.warm_up_templates([(path, dpi) for path in templates for dpi in sorted(dpis)])
+    if vector:
+        if "OUTPUT_PROFILE" in os.environ or OUTPUT_DPI:
+            logger.warning(
+                "RENDER_BACKEND=vector에서는 OUTPUT_PROFILE(%s)/OUTPUT_DPI(%s)가 적용되지 않습니다. "
+                "raster 출력에만 쓰입니다.", OUTPUT_PROFILE, OUTPUT_DPI,
+            )
+        try:
+            _register_font(font_path)
+            _overlay_base(_template_key(templates[0]), _template_key(templates[1]))
+        except ImportError:
+            pass
+
+
+# ────────────────────────────────────────────────────────
+def build_field_values(applicant, today=None):
+    """
+    신청자 정보로 (동의서 값, 전입학예정확인서 값) 사전을 만듭니다.
+    applicant의 student_birth_date, move_date, transfer_date는 date, 나머지는 문자열입니다.
+    """
+    today = today or date.today()
+    consent_values = {
+        "{{student_name}}": applicant["student_name"],
+        "{{parent_name}}": applicant["parent_name"],
+        "{{date.today}}": today.strftime(DATE_FORMAT),
+        "{{school_name}}": applicant["school_name"],
+    }
+    transfer_values = {
+        **consent_values,
+        "{{student_school}}": applicant["student_school"],
+        "{{relationship}}": applicant["relationship"],
+        "{{student_birth_date}}": applicant["student_birth_date"].strftime(DATE_FORMAT),
+        "{{parent_phone}}": applicant["parent_phone"],
+        "{{move_date}}": applicant["move_date"].strftime(DATE_FORMAT),
+        "{{address}}": applicant["address"],
+        "{{transfer_date}}": applicant["transfer_date"].strftime(DATE_FORMAT),
+        "{{next_grade}}": applicant["next_grade"],
+    }
+    return consent_values, transfer_values
+
+
+def signature_stamps(student_stamp, parent_stamp):
+    """
+    signature.process_signature()/make_stamp()로 만든 도장을 서명 자리 키에 대응시킵니다.
+    같은 도장 이미지를 모든 서명 자리와 두 출력 방식에서 그대로 재사용합니다.
+    """
+    return {
+        "{{student_sign_path}}": student_stamp,
+        "{{parent_sign_path}}": parent_stamp,
+    }
+
+
+def output_filename(school_name, next_grade):
+    return f"전입학예정확인서_{school_name}_{next_grade}.pdf"
+
+
+def render_application(applicant, stamps, templates, font_path, backend=None, preview=False, profile=None,
+                       final=True):
+    """
+    신청자 한 명의 최종 PDF를 만듭니다. Streamlit과 일괄 생성 CLI가 함께 사용합니다.
+    stamps는 signature_stamps()의 결과이며,
+    preview=True이면 DRAFT_DPI 초안 미리보기도 함께 반환합니다.
+    final=False이면 최종 PDF를 만들지 않으며 pdf_bytes는 None입니다(3단계 → 4단계 미리보기용).
+    """
+    consent_values, transfer_values = build_field_values(applicant)
+    previews = []
+    if preview:
+        previews = render_draft(consent_values, transfer_values, stamps, templates, font_path)
+    pdf_bytes = None
+    if final:
+        pdf_bytes = render_pdf(
+            consent_values, transfer_values, stamps, templates, font_path, backend=backend, profile=profile,
+        )
+    return RenderedForm(pdf_bytes, previews)
+# ────────────────────────────────────────────────────────
@@ -0,0 +1,105 @@
+"""
+학교와 날짜만으로 정해지는 필드({{school_name}}, {{date.today}})를 미리 그려 둔 양식 페이지를 보관합니다.
+
+(양식 버전, 해상도, 글꼴, 학교, 날짜) 단위로 한 번 그린 페이지를 재사용하므로,
+제출마다 신청자별 필드와 서명만 그리면 됩니다.
+보관량은 LAYER_CACHE_MB로 제한하며, 넘치면 가장 오래 쓰이지 않은 페이지부터 버립니다(LRU).
+한도는 프로세스마다 따로 적용되므로, render_service 작업 프로세스 N개면 최대 N × LAYER_CACHE_MB입니다.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import form_layout
+import pdf_raster
+
+LAYER_CACHE_MB = int(os.getenv("LAYER_CACHE_MB", "128"))
+STATIC_KEYS = ("{{school_name}}", "{{date.today}}")
+
+# 키 → 압축 보관된 페이지('L' 또는 'RGB')
+_layers = OrderedDict()
+_layers_bytes = 0
+_layers_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "evicted": 0}
+
+
+def _page_bytes(page):
+    return page.width * page.height * len(page.getbands())
+
+
+def _layer_key(template_path, plan, font_path, values):
+    abs_path = os.path.abspath(template_path)
+    stat = os.stat(abs_path)
+    static = tuple((key, values.get(key, "")) for key in STATIC_KEYS)
+    return (abs_path, stat.st_mtime_ns, stat.st_size, plan.dpi, os.path.abspath(font_path), static)
+
+
+def _store(key, page):
+    global _layers_bytes
+    with _layers_lock:
+        if key in _layers:
+            return
+        _layers[key] = page
+        _layers_bytes += _page_bytes(page)
+        while _layers_bytes > LAYER_CACHE_MB * 1024 * 1024 and len(_layers) > 1:
+            _, evicted = _layers.popitem(last=False)
+            _layers_bytes -= _page_bytes(evicted)
+            _counters["evicted"] += 1
+
+
+def dynamic_values(values):
+    """
+    미리 그린 필드를 뺀, 제출마다 그려야 하는 값만 남깁니다.
+    """
+    return {key: value for key, value in values.items() if key not in STATIC_KEYS}
+
+
+def get_layers(jobs, font_path):
+    """
+    jobs는 [(양식 경로, RenderPlan, 값), ...]이며, 양식은 각 계획의 해상도(plan.dpi)로 래스터화합니다.
+    학교·날짜 필드까지 그려진 보관 페이지('L' 또는 'RGB') 목록을 반환합니다. 공유 객체이므로 고치지 말고 사본에 그리세요.
+    캐시에 없는 페이지는 양식을 (동시에) 받아 고정 필드만 그린 뒤 보관합니다.
+    """
+    keys = [_layer_key(path, plan, font_path, values) for path, plan, values in jobs]
+    layers = []
+    with _layers_lock:
+        for key in keys:
+            layer = _layers.get(key)
+            if layer is not None:
+                _layers.move_to_end(key)
+                _counters["hits"] += 1
+            else:
+                _counters["misses"] += 1
+            layers.append(layer)
+
+    missing = [i for i, layer in enumerate(layers) if layer is None]
+    for dpi in sorted({jobs[i][1].dpi for i in missing}):
+        batch = [i for i in missing if jobs[i][1].dpi == dpi]
+        templates = pdf_raster.get_template_pages([jobs[i][0] for i in batch], dpi=dpi)
+        for i, page in zip(batch, templates):
+            _, plan, values = jobs[i]
+            static = {key: values[key] for key in STATIC_KEYS if key in values}
+            form_layout.render_page(page, plan, static, {})
+            layers[i] = pdf_raster.compact_page(page)
+            _store(keys[i], layers[i])
+
+    return layers
+
+
+def get_pages(jobs, font_path):
+    """
+    get_layers()의 사본 목록을 반환합니다. 흑백 양식은 'L' 그대로 두어 RGB의 1/3 메모리만 씁니다.
+    """
+    return [layer.copy() for layer in get_layers(jobs, font_path)]
+
+
+def stats():
+    with _layers_lock:
+        return {"layers": len(_layers), "bytes": _layers_bytes, **_counters}
+
+
+def clear():
+    global _layers_bytes
+    with _layers_lock:
+        _layers.clear()
+        _layers_bytes = 0
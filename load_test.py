@@ -0,0 +1,488 @@
+"""
+여러 보호자가 동시에 1~4단계를 거쳐 제출하는 상황을 Streamlit AppTest로 재현해,
+동시 세션 수에 따른 종단 지연 시간 분포·처리량·자원 사용량을 측정합니다.
+
+    python load_test.py --concurrency 1,2,4,8,16 --walks 3
+
+- 세션마다 AppTest 하나를 스레드 하나에서 돌립니다. 실제 서버처럼 한 프로세스 안이므로
+  cache_resource 자원(렌더링 풀, 발송함, 시트 기록기, 저장소)을 모든 세션이 함께 씁니다.
+- SMTP 서버와 gspread는 로컬 대역으로 바꿉니다. 실제 메일·시트에는 아무것도 가지 않습니다.
+  SMTP는 127.0.0.1에 띄운 수신 서버(tests/smtp_stand_in.py, 메시지당 --smtp-delay초),
+  구글 시트는 append_rows만 기록하는 가짜 gspread 모듈(호출당 --sheets-delay초)입니다.
+- AppTest는 컴포넌트와 상호작용할 수 없으므로, 서명 캔버스는 benchmark_suite.sample_strokes()의
+  합성 획을 돌려주는 대역으로 바꿉니다.
+- 입력값(학교, 성명, 연락처 등)은 --seed로 정해지는 대본에 따라 세션마다 다르게 만듭니다.
+
+종단 지연 시간은 한 세션의 단계별 실행 시간 합이며, --think 대기 시간은 뺍니다.
+자원 사용량은 이 프로세스와 렌더링 작업 프로세스의 CPU 사용률·최대 RSS(리눅스 /proc 기준)입니다.
+처리량이 최고치의 90%에 처음 닿는 동시 세션 수를 포화 지점으로 보고합니다. 그 위로는 지연 시간만 늘어납니다.
+
+세션을 동시에 돌리려고 AppTest의 비공개 내부(prepare_app_test())를 고치므로, Streamlit 1.65.0에서 확인한
+1.65.x에서만 실행합니다(requirements-dev.txt에 같은 범위로 고정). 다른 버전에서는 시작할 때 멈춥니다.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import streamlit as st
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+import benchmark_suite
+import metrics
+import school_directory
+from tests.smtp_stand_in import SmtpStandIn
+
+APP_PATH = "Confirmation_of_Prospective_School_Transfer.py"
+XLSX_FILE_PATH = "school_data.xlsx"
+MAIL_FROM = "load-test@example.com"
+SATURATION_RATIO = 0.9
+# prepare_app_test()가 고치는 AppTest 내부를 확인한 Streamlit 버전(부 버전까지)입니다.
+CHECKED_STREAMLIT = "1.65"
+
+STUDENT_NAMES = ("한잎새", "김하늘", "이바다", "박노을", "최여름", "정가을")
+PARENT_NAMES = ("한나무", "김산", "이강", "박별", "최들", "정솔")
+RELATIONSHIPS = ("부", "모", "조부", "조모")
+
+CanvasResult = namedtuple("CanvasResult", "image_data json_data")
+
+
+# ────────────────────────────────────────────────────────
+class WorksheetStandIn:
+    """
+    gspread Worksheet 대역입니다. append_rows 호출마다 delay초 기다린 뒤 행을 메모리에 쌓습니다.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.rows = []
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def append_rows(self, rows, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.rows.extend(rows)
+            self.calls += 1
+
+
+def install_stand_ins(smtp, worksheet, workdir):
+    """
+    앱이 처음 불러오기 전에 gspread·oauth2client·캔버스 모듈을 대역으로 바꾸고,
+    발송함·시트 저널·저장소가 workdir 안의 파일과 로컬 SMTP 서버를 쓰도록 환경 변수를 맞춥니다.
+    """
+    spreadsheet = types.SimpleNamespace(worksheet=lambda name: worksheet, get_worksheet=lambda index: worksheet)
+    client = types.SimpleNamespace(open_by_key=lambda key: spreadsheet)
+    gspread = types.ModuleType("gspread")
+    gspread.authorize = lambda credentials: client
+
+    service_account = types.ModuleType("oauth2client.service_account")
+    service_account.ServiceAccountCredentials = types.SimpleNamespace(
+        from_json_keyfile_dict=lambda info, scopes: object()
+    )
+    oauth2client = types.ModuleType("oauth2client")
+    oauth2client.service_account = service_account
+
+    canvas = types.ModuleType("streamlit_drawable_canvas")
+
+    def st_canvas(key=None, **kwargs):
+        # 세션마다 정해 둔 번호로 학생·법정대리인 서명을 서로 다르게 그립니다.
+        seed = st.session_state.get("load_test_seed", 0) * 2 + (key == "parent_sign_canvas")
+        return CanvasResult(None, benchmark_suite.sample_strokes(seed))
+
+    canvas.st_canvas = st_canvas
+
+    sys.modules.update({
+        "gspread": gspread,
+        "oauth2client": oauth2client,
+        "oauth2client.service_account": service_account,
+        "streamlit_drawable_canvas": canvas,
+    })
+    os.environ.update({
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp.server_address[1]),
+        "SMTP_STARTTLS": "0",
+        "MAIL_FROM": MAIL_FROM,
+        "MAIL_OUTBOX_PATH": os.path.join(workdir, "mail_outbox.sqlite3"),
+        "SHEETS_JOURNAL_PATH": os.path.join(workdir, "sheets_journal.sqlite3"),
+        "SHEETS_FLUSH_INTERVAL": "1",
+        "ARTIFACT_DIR": os.path.join(workdir, "artifacts"),
+    })
+    os.environ.pop("MAIL_PASSWORD", None)
+
+
+def prepare_app_test():
+    """
+    AppTest는 한 번에 한 세션만 돈다고 보고 실행마다 프로세스 전역 상태를 바꿉니다.
+    여러 스레드에서 동시에 돌리기 위해, 실제 서버처럼 모든 세션이 아래를 하나씩 함께 쓰도록 고정합니다.
+
+    - 런타임: 실행마다 새 가짜 런타임을 Runtime._instance에 넣고 끝나면 None으로 지우므로,
+      그 사이 실행 중인 다른 세션이 런타임을 잃습니다.
+    - 스크립트 바이트코드: 실행마다 새로 컴파일해 그 시간이 측정에 섞이고,
+      파이썬 3.11에서는 여러 스레드가 동시에 ast.parse를 부르면 SystemError가 날 수 있습니다.
+    - global.appTest 설정: 실행 동안만 config.get_option을 바꿔 켜므로, 먼저 끝난 세션이 되돌리면
+      다른 세션의 위젯이 AppTest용 정보(선택 상자 format_func 등)를 남기지 못합니다. 설정 자체를 켜 둡니다.
+    - st.secrets: AppTest.secrets를 쓰면 실행마다 바꿨다가 되돌리므로, 전역으로 한 번만 채웁니다.
+
+    공개 API가 아닌 Runtime._instance, testing.v1.app_test 모듈의 이름들, ScriptCache, Secrets._secrets에 기대므로
+    CHECKED_STREAMLIT 버전이 아니면 RuntimeError를 일으킵니다. 세션 조작 자체는 공개 AppTest API만 씁니다.
+    """
+    if st.__version__.split(".")[:2] != CHECKED_STREAMLIT.split("."):
+        raise RuntimeError(
+            f"load_test는 Streamlit {CHECKED_STREAMLIT}.x의 AppTest 내부에 맞춰져 있습니다(설치됨: {st.__version__})."
+        )
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = app_test.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = app_test.MediaFileManager(app_test.MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = app_test.DataframeSourceManager()
+    runtime.cache_storage_manager = app_test.MemoryCacheStorageManager()
+    runtime.bidi_component_registry = app_test.BidiComponentManager()
+    Runtime._instance = runtime
+    # AppTest의 대입은 하위 클래스에만 남아 공유 런타임을 건드리지 않습니다.
+    app_test.Runtime = type("_RuntimeSlot", (Runtime,), {})
+
+    config.set_option("global.appTest", True)
+
+    shared = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared
+
+    secrets = Secrets()
+    secrets._secrets = {"GSHEET": {"SERVICE_ACCOUNT_KEY": "{}", "SPREADSHEET_ID": "load-test"}}
+    st.secrets = secrets
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+def session_scripts(count, seed):
+    """
+    학교 조회표에서 이메일이 있는 학교를 골라, 세션별 입력 대본(dict) count개를 만듭니다.
+    """
+    rng = random.Random(seed)
+    directory = school_directory.load_directory(XLSX_FILE_PATH)
+    choices = [
+        (region, school)
+        for region in directory.regions
+        for school in directory.schools(region)
+        if directory.email_for(school)
+    ]
+    today = date.today()
+    scripts = []
+    for index in range(count):
+        region, school = rng.choice(choices)
+        grade = rng.randint(1, 6)
+        scripts.append({
+            "seed": seed * 100003 + index,
+            "region": region,
+            "school": school,
+            "many_schools": len(directory.schools(region)) > int(os.getenv("SCHOOL_PICKER_LIMIT", "30")),
+            "text": {
+                "student_name_input": rng.choice(STUDENT_NAMES),
+                "student_school_input": f"대한초등학교 {max(1, grade - 1)}학년",
+                "parent_name_input": rng.choice(PARENT_NAMES),
+                "relationship_input": rng.choice(RELATIONSHIPS),
+                "parent_phone_input": f"010{rng.randrange(10 ** 8):08d}",
+                "address_input": f"행복택지 A-{rng.randint(1, 9)}블록",
+                "next_grade_num_input": str(grade),
+            },
+            "dates": {
+                "student_birth_date_input": date(today.year - 6 - grade, rng.randint(1, 12), rng.randint(1, 28)),
+                "move_date_input": today + timedelta(days=rng.randint(7, 60)),
+                "transfer_date_input": today + timedelta(days=rng.randint(7, 60)),
+            },
+        })
+    return scripts
+
+
+def walk(script, app_path, think=0.0, timeout=120):
+    """
+    대본대로 1~4단계를 거쳐 제출하고, 단계별 소요 시간(초)과 결과를 반환합니다.
+    결과는 "ok", "busy"(렌더링 대기열 가득 참), "error" 중 하나이며, 실패하면 단계와 화면 메시지를 함께 남깁니다.
+    """
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    at.session_state["load_test_seed"] = script["seed"]
+    steps = {}
+
+    def step(stage, action):
+        start = time.perf_counter()
+        action()
+        steps[stage] = steps.get(stage, 0.0) + time.perf_counter() - start
+        if think:
+            time.sleep(think)
+
+    def result(outcome, stage=None):
+        try:
+            messages = [element.value for element in (*at.exception, *at.error, *at.warning)]
+        except Exception:
+            messages = []  # 첫 실행이 끝나기 전에 실패하면 읽을 화면이 없습니다.
+        return {"outcome": outcome, "stage": stage, "steps": steps, "messages": messages[:3]}
+
+    try:
+        step(1, lambda: at.run())
+        step(1, lambda: at.selectbox[0].select(script["region"]).run())
+        if script["many_schools"]:
+            step(1, lambda: at.text_input(key="school_query_input").input(script["school"]).run())
+        step(1, lambda: at.selectbox[1].select(script["school"]).run())
+        step(1, lambda: at.button[0].click().run())
+        if at.session_state["stage"] != 2:
+            return result("error", 1)
+
+        step(2, lambda: at.radio(key="consent_radio").set_value("동의합니다.").run())
+        step(2, lambda: at.button[0].click().run())
+        if at.session_state["stage"] != 3:
+            return result("error", 2)
+
+        for key, value in script["text"].items():
+            at.text_input(key=key).input(value)
+        for key, value in script["dates"].items():
+            at.date_input(key=key).set_value(value)
+        step(3, lambda: at.run())
+        step(3, lambda: at.button[0].click().run())
+        if at.session_state["stage"] != 4:
+            busy = any("제출이 많아" in element.value for element in at.warning)
+            return result("busy" if busy else "error", 3)
+
+        step(4, lambda: at.button[0].click().run())
+        if not at.success:
+            busy = any("제출이 많아" in element.value for element in at.warning)
+            return result("busy" if busy else "error", 4)
+    except Exception as e:
+        outcome = result("error", max(steps, default=1))
+        outcome["messages"].insert(0, f"{type(e).__name__}: {e}")
+        return outcome
+    return result("ok")
+# ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+def _proc_stat_cpu(pid):
+    # /proc/<pid>/stat의 utime+stime(초). 명령 이름에 공백이 있을 수 있어 마지막 ')' 뒤부터 셉니다.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def _proc_status(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss(pid):
+    # 리눅스 4.0+에서 VmHWM을 현재 RSS로 되돌립니다.
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _workers():
+    # 렌더링 풀 등 이 프로세스가 띄운 작업 프로세스들입니다.
+    return [child.pid for child in multiprocessing.active_children()]
+
+
+def _cpu_seconds():
+    times = os.times()
+    return times.user + times.system + sum(_proc_stat_cpu(pid) for pid in _workers())
+
+
+def _counter(name):
+    return sum(c["value"] for c in metrics.snapshot()["counters"] if c["name"] == name)
+
+
+def _quantile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def immediate_count(scripts, sessions):
+    # 성공한 제출 중 즉시 발송 학교로 간 건수입니다. 묶음 발송 학교는 기한이 되어야 메일이 나갑니다.
+    directory = school_directory.load_directory(XLSX_FILE_PATH)
+    return sum(
+        directory.delivery_for(script["school"]).mode == "immediate"
+        for script, session in zip(scripts, sessions) if session["outcome"] == "ok"
+    )
+
+
+def wait_for_mail(smtp, expected, timeout):
+    """
+    수신 서버가 받은 메시지가 expected개가 될 때까지 기다린 시간(초)을 반환합니다. 시간이 넘으면 None입니다.
+    """
+    start = time.perf_counter()
+    while len(smtp.received) < expected:
+        if time.perf_counter() - start > timeout:
+            return None
+        time.sleep(0.05)
+    return time.perf_counter() - start
+
+
+def run_level(concurrency, scripts, smtp, worksheet, app_path, think, timeout, drain_timeout):
+    """
+    concurrency개 스레드로 scripts를 모두 걷고, 지연 시간·처리량·자원 사용량을 모아 반환합니다.
+    """
+    for pid in [os.getpid(), *_workers()]:
+        _reset_peak_rss(pid)
+    cpu_before = _cpu_seconds()
+    rejected_before = _counter("render_rejected_total")
+    received_before = len(smtp.received)
+    rows_before = len(worksheet.rows)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as pool:
+        sessions = list(pool.map(lambda script: walk(script, app_path, think, timeout), scripts))
+    elapsed = time.perf_counter() - start
+    cpu = _cpu_seconds() - cpu_before
+
+    ok = [s for s in sessions if s["outcome"] == "ok"]
+    drain = wait_for_mail(smtp, received_before + immediate_count(scripts, sessions), drain_timeout)
+
+    totals = [sum(s["steps"].values()) for s in ok]
+    self_peak = _proc_status(os.getpid(), "VmHWM")
+    worker_peaks = [_proc_status(pid, "VmHWM") for pid in _workers()]
+    return {
+        "concurrency": concurrency,
+        "sessions": len(sessions),
+        "ok": len(ok),
+        "busy": sum(s["outcome"] == "busy" for s in sessions),
+        "errors": sum(s["outcome"] == "error" for s in sessions),
+        "elapsed_s": elapsed,
+        "throughput_per_min": len(ok) / elapsed * 60 if elapsed else 0.0,
+        "latency_s": {
+            "p50": _quantile(totals, 0.5),
+            "p95": _quantile(totals, 0.95),
+            "p99": _quantile(totals, 0.99),
+            "max": max(totals, default=None),
+        },
+        "stage_p95_s": {
+            stage: _quantile([s["steps"][stage] for s in ok if stage in s["steps"]], 0.95) for stage in (1, 2, 3, 4)
+        },
+        "cpu_percent": cpu / elapsed * 100 if elapsed else 0.0,
+        "rss_peak_bytes": self_peak,
+        "worker_rss_peak_bytes": sum(p for p in worker_peaks if p) or None,
+        "render_rejected": _counter("render_rejected_total") - rejected_before,
+        "mail_received": len(smtp.received) - received_before,
+        "mail_drain_s": drain,
+        "sheet_rows": len(worksheet.rows) - rows_before,
+        "failures": [
+            {"stage": s["stage"], "outcome": s["outcome"], "messages": s["messages"]}
+            for s in sessions if s["outcome"] != "ok"
+        ][:5],
+    }
+
+
+def saturation_point(levels):
+    """
+    처리량이 최고치의 SATURATION_RATIO 이상이 되는 가장 낮은 동시 세션 수의 결과를 반환합니다.
+    """
+    best = max((level["throughput_per_min"] for level in levels), default=0.0)
+    if not best:
+        return None
+    return next(level for level in levels if level["throughput_per_min"] >= best * SATURATION_RATIO)
+
+
+def _fmt(value, scale=1.0, digits=2):
+    return "-" if value is None else f"{value * scale:.{digits}f}"
+
+
+def print_table(levels):
+    print(
+        f"{'sessions':>8} {'ok':>9} {'busy':>6} {'error':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7}"
+        f" {'per min':>7} {'st3 p95':>8} {'st4 p95':>8} {'cpu %':>6} {'rss MiB':>8} {'pool MiB':>8} {'mail s':>6}"
+    )
+    for level in levels:
+        latency, stages = level["latency_s"], level["stage_p95_s"]
+        print(
+            f"{level['concurrency']:>8} {level['ok']:>5}/{level['sessions']:<3} {level['busy']:>6} {level['errors']:>6}"
+            f" {_fmt(latency['p50']):>7} {_fmt(latency['p95']):>7} {_fmt(latency['p99']):>7} {_fmt(latency['max']):>7}"
+            f" {level['throughput_per_min']:>7.1f} {_fmt(stages[3]):>8} {_fmt(stages[4]):>8}"
+            f" {level['cpu_percent']:>6.0f} {_fmt(level['rss_peak_bytes'], 1 / 2**20, 0):>8}"
+            f" {_fmt(level['worker_rss_peak_bytes'], 1 / 2**20, 0):>8} {_fmt(level['mail_drain_s'], digits=1):>6}"
+        )
+        for failure in level["failures"]:
+            print(f"       - {failure['outcome']} @ {failure['stage']}단계: {' / '.join(failure['messages'])}")
+# ────────────────────────────────────────────────────────
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8", help="쉼표로 구분한 동시 세션 수 목록")
+    parser.add_argument("--walks", type=int, default=2, help="동시 세션 하나가 처음부터 제출까지 반복하는 횟수")
+    parser.add_argument("--think", type=float, default=0.0, help="단계 조작 사이 대기 시간(초, 지연 시간에서 제외)")
+    parser.add_argument("--smtp-delay", type=float, default=0.05, help="SMTP 대역의 메시지당 응답 지연(초)")
+    parser.add_argument("--sheets-delay", type=float, default=0.3, help="시트 대역의 append_rows 호출당 지연(초)")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest 실행 한 번의 제한 시간(초)")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="메일 배달을 기다리는 최대 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app", default=APP_PATH)
+    parser.add_argument("--json", help="결과를 JSON 파일로도 저장")
+    args = parser.parse_args(argv)
+    levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+    app_path = os.path.abspath(args.app)
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir:
+        smtp = SmtpStandIn(args.smtp_delay).start()
+        worksheet = WorksheetStandIn(args.sheets_delay)
+        install_stand_ins(smtp, worksheet, workdir)
+        prepare_app_test()
+        # 세션마다 되풀이되는 사용 중단 경고 등으로 결과가 묻히지 않게 합니다.
+        streamlit.logger.set_log_level("error")
+
+        # 첫 세션은 예열(모듈 로딩, 렌더링 풀 기동, 양식 래스터화)이 섞이므로 측정에서 뺍니다.
+        warm_scripts = session_scripts(1, args.seed - 1)
+        warm = walk(warm_scripts[0], app_path, timeout=args.timeout)
+        if warm["outcome"] != "ok":
+            print(f"예열 세션이 실패했습니다({warm['stage']}단계): {' / '.join(warm['messages'])}", file=sys.stderr)
+            return 1
+        wait_for_mail(smtp, immediate_count(warm_scripts, [warm]), args.drain_timeout)
+
+        results = []
+        for index, concurrency in enumerate(levels):
+            scripts = session_scripts(concurrency * args.walks, args.seed + index)
+            results.append(run_level(
+                concurrency, scripts, smtp, worksheet, app_path, args.think, args.timeout, args.drain_timeout
+            ))
+            print(f"동시 {concurrency}세션 완료: {results[-1]['ok']}/{results[-1]['sessions']}건 성공", file=sys.stderr)
+        smtp.shutdown()
+
+    print(f"CPU {os.cpu_count()}개, 렌더링 작업 프로세스 {os.getenv('RENDER_WORKERS', '2')}개, 세션당 반복 {args.walks}회")
+    print_table(results)
+    saturated = saturation_point(results)
+    if saturated:
+        print(
+            f"포화 지점: 동시 {saturated['concurrency']}세션"
+            f" (처리량 {saturated['throughput_per_min']:.1f}건/분, p95 {_fmt(saturated['latency_s']['p95'])}초)"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "levels": results}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,518 @@
+"""
+제출 메일을 SQLite 발송함(outbox)에 넣고, 백그라운드 작업 스레드가 꺼내 보냅니다.
+
+- 작업 스레드마다 인증된 SMTP 연결을 하나씩 유지하여 재사용합니다(연결 풀).
+- 일시적 오류는 지수 백오프로 재시도하고, 영구 오류(5xx)나 최대 시도 횟수 초과 시 'failed'로 남깁니다.
+- 서버에 연결·인증하지 못한 경우(예: 앱 비밀번호 교체 후 535)는 메일 탓이 아니므로,
+  시도 횟수와 상관없이 발송함에 두고 백오프하며 다시 시도합니다(smtp_unavailable_total).
+- 프로세스가 중단되어도 발송함에 남은 메일은 다음 시작 시 다시 발송됩니다.
+
+묶음 발송(DigestQueue)을 쓰는 학교의 제출 PDF는 같은 SQLite 파일의 digest_items 표에 모아 두었다가,
+가장 오래된 제출이 간격을 넘기면 한 통(PDF 여러 개 또는 zip 하나 첨부)으로 만들어 발송함에 넣습니다.
+발송 효율은 smtp_connections_total, mail_sent_bytes_total을 mail_submissions_total로 나누어 봅니다.
+"""
+import io
+import smtplib
+import sqlite3
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+
+import metrics
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    message BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+_DIGEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digest_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    title TEXT NOT NULL,
+    attachment_name TEXT NOT NULL,
+    pdf BLOB NOT NULL,
+    due_at REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS digest_items_recipient ON digest_items (sender, recipient, id);
+"""
+
+
+@dataclass(frozen=True)
+class SmtpSettings:
+    host: str
+    port: int
+    username: str = None
+    password: str = None
+    starttls: bool = True
+    timeout: float = 30
+
+
+def _server_unavailable(error):
+    """
+    메일 내용과 무관하게 서버에 연결·인증하지 못한 오류인지 봅니다. 연결이 복구되면 그대로 다시 보냅니다.
+    SMTPException도 OSError의 하위 클래스이므로, 서버 응답 오류는 종류별로 따로 가립니다.
+    """
+    if isinstance(error, smtplib.SMTPException):
+        return isinstance(error, (
+            smtplib.SMTPAuthenticationError,
+            smtplib.SMTPConnectError,
+            smtplib.SMTPHeloError,
+            smtplib.SMTPNotSupportedError,
+            smtplib.SMTPServerDisconnected,
+        ))
+    return isinstance(error, OSError)
+
+
+class _PooledConnection:
+    """
+    작업 스레드 하나가 소유하는 SMTP 연결입니다.
+    오래 놀고 있던 연결은 NOOP으로 확인한 뒤 재사용하고, 끊겼으면 다시 연결합니다.
+    """
+
+    IDLE_CHECK_SECONDS = 30
+    IDLE_CLOSE_SECONDS = 120
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.server = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        s = self.settings
+        server = smtplib.SMTP(s.host, s.port, timeout=s.timeout)
+        metrics.inc("smtp_connections_total")
+        try:
+            if s.starttls:
+                server.starttls()
+            if s.username and s.password:
+                server.login(s.username, s.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+
+    def get(self):
+        if self.server is not None and time.monotonic() - self.last_used > self.IDLE_CHECK_SECONDS:
+            try:
+                if self.server.noop()[0] != 250:
+                    self.close()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self.server is None:
+            self._connect()
+        return self.server
+
+    def sendmail(self, sender, recipient, message):
+        reused = self.server is not None
+        try:
+            self.get().sendmail(sender, recipient, message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            if not reused:
+                raise
+            # 재사용하던 연결이 끊긴 경우 새 연결로 한 번만 다시 보냅니다.
+            self.get().sendmail(sender, recipient, message)
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self.server is not None and time.monotonic() - self.last_used > self.IDLE_CLOSE_SECONDS:
+            self.close()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+class MailOutbox:
+    """
+    SQLite 기반의 영속 발송함입니다.
+    enqueue()는 즉시 반환하며, start()로 띄운 작업 스레드가 메일을 실제로 보냅니다.
+    """
+
+    def __init__(self, db_path, settings, pool_size=2, max_attempts=6,
+                 backoff_base=5.0, backoff_max=600.0, poll_interval=5.0):
+        self.db_path = db_path
+        self.settings = settings
+        self.pool_size = pool_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ────────────────────────────────────────────────────────
+    def enqueue(self, sender, recipient, message, db=None):
+        """
+        메일을 발송함에 기록하고 작업 스레드를 깨웁니다. 기록된 행 id를 반환합니다.
+        db를 넘기면 호출한 쪽의 트랜잭션 안에서 기록만 하며, 커밋 후 wake()는 호출한 쪽이 합니다.
+        """
+        now = time.time()
+        own = db is None
+        if own:
+            db = self._connect()
+        try:
+            cursor = db.execute(
+                "INSERT INTO outbox (sender, recipient, message, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sender, recipient, message, now, now),
+            )
+            message_id = cursor.lastrowid
+        finally:
+            if own:
+                db.close()
+        if own:
+            self.wake()
+        return message_id
+
+    def wake(self):
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def stats(self):
+        db = self._connect()
+        try:
+            rows = db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        finally:
+            db.close()
+        return dict(rows)
+
+    def wait_until_drained(self, timeout=None):
+        """
+        보낼 수 있는 메일이 모두 처리될 때까지 기다립니다(테스트·종료용).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            counts = self.stats()
+            if not counts.get(PENDING) and not counts.get(SENDING):
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+    # ────────────────────────────────────────────────────────
+
+    # ────────────────────────────────────────────────────────
+    def start(self):
+        """
+        이전 실행에서 발송 중이던 메일을 되살리고 작업 스레드를 시작합니다.
+        """
+        db = self._connect()
+        try:
+            db.execute("UPDATE outbox SET status = ? WHERE status = ?", (PENDING, SENDING))
+        finally:
+            db.close()
+        self._stopping = False
+        for i in range(self.pool_size):
+            thread = threading.Thread(target=self._run, name=f"mail-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self, db):
+        """
+        기한이 된 메일 한 통을 'sending'으로 바꿔 가져옵니다.
+        BEGIN IMMEDIATE로 여러 스레드·프로세스가 같은 메일을 집지 않도록 합니다.
+        """
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT id, sender, recipient, message, attempts FROM outbox "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 1",
+                (PENDING, time.time()),
+            ).fetchone()
+            if row is not None:
+                db.execute("UPDATE outbox SET status = ? WHERE id = ?", (SENDING, row[0]))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return row
+
+    def _run(self):
+        connection = _PooledConnection(self.settings)
+        db = self._connect()
+        try:
+            while not self._stopping:
+                row = self._claim(db)
+                if row is None:
+                    connection.close_if_idle()
+                    with self._wakeup:
+                        if not self._stopping:
+                            self._wakeup.wait(self.poll_interval)
+                    continue
+                self._deliver(db, connection, *row)
+        finally:
+            connection.close()
+            db.close()
+
+    def _deliver(self, db, connection, message_id, sender, recipient, message, attempts):
+        attempts += 1
+        try:
+            with metrics.timed("smtp_send"):
+                connection.sendmail(sender, recipient, message)
+        except Exception as e:
+            if not isinstance(e, smtplib.SMTPResponseException):
+                # 서버 응답 오류가 아니면 연결 상태를 알 수 없으므로 버립니다.
+                connection.close()
+            unavailable = _server_unavailable(e)
+            permanent = isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+            permanent = permanent or isinstance(e, smtplib.SMTPRecipientsRefused)
+            if unavailable:
+                metrics.inc("smtp_unavailable_total")
+            if not unavailable and (permanent or attempts >= self.max_attempts):
+                metrics.inc("mail_failed_total")
+                db.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+                    (FAILED, attempts, repr(e), message_id),
+                )
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+                db.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? "
+                    "WHERE id = ?",
+                    (PENDING, attempts, time.time() + delay, repr(e), message_id),
+                )
+            return
+        metrics.inc("mail_sent_total")
+        metrics.inc("mail_sent_bytes_total", len(message))
+        # 보낸 메일은 첨부 PDF(개인정보)를 남기지 않도록 본문을 비웁니다.
+        db.execute(
+            "UPDATE outbox SET status = ?, attempts = ?, message = x'', last_error = NULL WHERE id = ?",
+            (SENT, attempts, message_id),
+        )
+    # ────────────────────────────────────────────────────────
+
+
+# ────────────────────────────────────────────────────────
+def _unique_names(names):
+    seen = {}
+    unique = []
+    for name in names:
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        if count > 1:
+            stem, dot, ext = name.rpartition(".")
+            name = f"{stem} ({count}).{ext}" if dot else f"{name} ({count})"
+        unique.append(name)
+    return unique
+
+
+def build_digest_message(sender, recipient, items, sender_name=None, zip_attachments=False):
+    """
+    items는 [(제목, 첨부 파일 이름, PDF 바이트), ...]입니다.
+    제출 건수와 제목 목록을 본문에 적고 PDF를 각각(또는 zip 하나로) 첨부한 메일 바이트를 반환합니다.
+    """
+    from email import encoders
+    from email.header import Header
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.utils import formataddr
+
+    msg = MIMEMultipart()
+    msg['From'] = formataddr((str(Header(sender_name, 'utf-8')), sender)) if sender_name else sender
+    msg['To'] = recipient
+    msg['Subject'] = f"전입학예정확인서 {len(items)}건 모음"
+
+    listing = "\n".join(f"- {title}" for title, _, _ in items)
+    body = (f"안녕하세요.\n\n전입학예정확인서 {len(items)}건이 제출되었습니다.\n\n{listing}\n\n"
+            "PDF 파일에 이상이 없는지 확인해 주세요.\n아울러, 철저한 개인정보 관리 부탁드립니다.\n\n감사합니다.")
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+
+    names = _unique_names([name for _, name, _ in items])
+    if zip_attachments:
+        # PDF는 이미 압축되어 있으므로 용량보다는 첨부 개수를 줄이려는 용도입니다.
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for name, (_, _, pdf) in zip(names, items):
+                archive.writestr(name, pdf)
+        attachments = [("Confirmations of Prospective School Transfer.zip", "zip", buffer.getvalue())]
+    else:
+        attachments = [(name, "pdf", pdf) for name, (_, _, pdf) in zip(names, items)]
+
+    for name, subtype, data in attachments:
+        part = MIMEBase('application', subtype)
+        part.set_payload(data)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename="{name}"', filename=('utf-8', '', name))
+        part.add_header('Content-Type', f'application/{subtype}; name="{name}"')
+        msg.attach(part)
+    return msg.as_bytes()
+
+
+class DigestQueue:
+    """
+    묶음 발송 학교의 제출을 모아 두었다가 간격마다 한 통으로 발송함에 넣습니다.
+
+    - add()는 제출 하나를 기록하고 즉시 반환합니다. 기한은 기록 시각 + 간격입니다.
+    - 받는 사람별로 기한이 지난 제출을 묶어 보냅니다. 아직 기한 전인 제출은 다음 묶음으로 남깁니다.
+      첨부 합계가 max_bytes를 넘으면 여러 통으로 나눕니다(메일 서버 크기 제한).
+    - 묶음 메일을 발송함에 넣는 것과 묶인 제출을 지우는 것은 한 트랜잭션이라, 중단되어도 중복·유실이 없습니다.
+    """
+
+    def __init__(self, outbox, default_interval=3600.0, sender_name=None, zip_attachments=False,
+                 max_bytes=15 * 1024 * 1024, poll_interval=30.0):
+        self.outbox = outbox
+        self.default_interval = default_interval
+        self.sender_name = sender_name
+        self.zip_attachments = zip_attachments
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self._stopping = threading.Event()
+        self._thread = None
+        db = outbox._connect()
+        try:
+            db.executescript(_DIGEST_SCHEMA)
+        finally:
+            db.close()
+
+    # ────────────────────────────────────────────────────────
+    def add(self, sender, recipient, title, attachment_name, pdf, interval=None):
+        """
+        제출 하나를 묶음에 넣습니다. interval(초)이 None이면 default_interval을 씁니다.
+        """
+        now = time.time()
+        interval = self.default_interval if interval is None else interval
+        db = self.outbox._connect()
+        try:
+            cursor = db.execute(
+                "INSERT INTO digest_items (sender, recipient, title, attachment_name, pdf, due_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sender, recipient, title, attachment_name, pdf, now + interval, now),
+            )
+            return cursor.lastrowid
+        finally:
+            db.close()
+
+    def flush(self, force=False):
+        """
+        기한이 지난(force=True면 모든) 묶음을 발송함에 넣고, 넣은 메일 수를 반환합니다.
+        """
+        now = time.time()
+        cutoff = None if force else now
+        db = self.outbox._connect()
+        enqueued = 0
+        try:
+            due = db.execute(
+                "SELECT sender, recipient FROM digest_items GROUP BY sender, recipient "
+                "HAVING ? OR MIN(due_at) <= ?",
+                (force, now),
+            ).fetchall()
+            for sender, recipient in due:
+                while self._flush_one(db, sender, recipient, cutoff):
+                    enqueued += 1
+        finally:
+            db.close()
+        if enqueued:
+            self.outbox.wake()
+        return enqueued
+
+    def stats(self):
+        db = self.outbox._connect()
+        try:
+            items, recipients, oldest = db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT recipient), MIN(created_at) FROM digest_items"
+            ).fetchone()
+        finally:
+            db.close()
+        return {"items": items, "recipients": recipients, "oldest_age": time.time() - oldest if oldest else None}
+    # ────────────────────────────────────────────────────────
+
+    # ────────────────────────────────────────────────────────
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-digest", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def _flush_one(self, db, sender, recipient, cutoff=None):
+        """
+        받는 사람 하나의 제출 중 기한이 cutoff 이하인(None이면 모든) 것을 max_bytes 안에서 오래된 순으로 묶어
+        발송함에 넣습니다. 남은 제출이 없으면 False를 반환합니다.
+        """
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            ids, items, total = [], [], 0
+            rows = db.execute(
+                "SELECT id, title, attachment_name, pdf FROM digest_items "
+                "WHERE sender = ? AND recipient = ? AND (? IS NULL OR due_at <= ?) ORDER BY id",
+                (sender, recipient, cutoff, cutoff),
+            )
+            for item_id, title, name, pdf in rows:
+                if items and total + len(pdf) > self.max_bytes:
+                    break
+                ids.append(item_id)
+                items.append((title, name, pdf))
+                total += len(pdf)
+            if not items:
+                db.execute("COMMIT")
+                return False
+            message = build_digest_message(
+                sender, recipient, items, sender_name=self.sender_name, zip_attachments=self.zip_attachments
+            )
+            self.outbox.enqueue(sender, recipient, message, db=db)
+            db.executemany("DELETE FROM digest_items WHERE id = ?", [(item_id,) for item_id in ids])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        metrics.inc("mail_digests_total")
+        metrics.inc("mail_digest_items_total", len(items))
+        return True
+    # ────────────────────────────────────────────────────────
@@ -0,0 +1,208 @@
+"""
+원본 PDF 페이지는 그대로 두고, 그 위에 오버레이 PDF 페이지를 얹은 결과를
+증분 갱신(incremental update)으로 덧붙여 만듭니다.
+
+기본 문서는 프로세스당 한 번만 만들고, 제출마다 오버레이에서 나온 객체 몇 개와
+갱신된 페이지 객체, 새 xref 구역만 기록하므로 원본 객체를 다시 파싱하지 않습니다.
+"""
+from io import BytesIO
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+_OVERLAY_NAME = "/FormOverlay"
+
+
+class _BasePage:
+    def __init__(self, idnum, page):
+        self.idnum = idnum
+        self.page = page
+        resources = page.get("/Resources")
+        self.resources = resources.get_object() if resources is not None else DictionaryObject()
+        contents = page.get("/Contents")
+        if contents is None:
+            self.contents = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            self.contents = list(contents.get_object())
+        else:
+            self.contents = [contents]
+        box = page.mediabox
+        self.origin = (float(box.left), float(box.bottom))
+        self.size = (float(box.width), float(box.height))
+
+
+class OverlayBase:
+    """
+    sources = [(pdf_bytes, page_index), ...]의 페이지를 순서대로 합친 기본 문서입니다.
+    stamp()로 같은 수의 페이지를 가진 오버레이 PDF를 얹은 새 PDF 바이트를 얻습니다.
+    """
+
+    def __init__(self, sources):
+        writer = PdfWriter()
+        for data, index in sources:
+            writer.add_page(PdfReader(BytesIO(data)).pages[index])
+        buffer = BytesIO()
+        writer.write(buffer)
+        self.data = buffer.getvalue()
+
+        reader = PdfReader(BytesIO(self.data))
+        self.pages = [
+            _BasePage(page.indirect_reference.idnum, page) for page in reader.pages
+        ]
+        trailer = reader.trailer
+        self.size = int(trailer["/Size"])
+        self.trailer_refs = {
+            key: trailer.raw_get(key) for key in ("/Root", "/Info", "/ID") if key in trailer
+        }
+        tail = self.data[self.data.rindex(b"startxref") + len(b"startxref"):]
+        self.startxref = int(tail.split()[0])
+
+    @property
+    def page_sizes(self):
+        return [page.size for page in self.pages]
+
+    def stamp(self, overlay_bytes):
+        """
+        오버레이 PDF의 i번째 페이지를 Form XObject로 감싸 기본 문서 i번째 페이지 위에 그립니다.
+        """
+        overlay = PdfReader(BytesIO(overlay_bytes))
+        if len(overlay.pages) != len(self.pages):
+            raise ValueError("오버레이 페이지 수가 기본 문서와 다릅니다.")
+
+        out = BytesIO()
+        out.write(self.data)
+        if not self.data.endswith(b"\n"):
+            out.write(b"\n")
+
+        offsets = {}
+        mapping = {}
+        pending = []
+        next_num = [self.size]
+
+        def alloc():
+            num = next_num[0]
+            next_num[0] += 1
+            return num
+
+        def translate(obj):
+            # 오버레이 문서의 객체 번호를 기본 문서 뒤에 이어지는 번호로 바꿉니다.
+            if isinstance(obj, IndirectObject):
+                num = mapping.get(obj.idnum)
+                if num is None:
+                    num = mapping[obj.idnum] = alloc()
+                    pending.append((num, obj.get_object()))
+                return IndirectObject(num, 0, None)
+            if isinstance(obj, StreamObject):
+                copy = StreamObject()
+                for key, value in obj.items():
+                    copy[NameObject(key)] = translate(value)
+                copy._data = obj._data
+                return copy
+            if isinstance(obj, DictionaryObject):
+                return DictionaryObject({NameObject(k): translate(v) for k, v in obj.items()})
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(translate(v) for v in obj)
+            return obj
+
+        def write_object(num, obj):
+            offsets[num] = out.tell()
+            out.write(f"{num} 0 obj\n".encode())
+            obj.write_to_stream(out)
+            out.write(b"\nendobj\n")
+
+        def flush_pending():
+            while pending:
+                num, obj = pending.pop()
+                write_object(num, translate(obj))
+
+        save_num = alloc()
+        write_object(save_num, _content_stream(b"q\n"))
+
+        for base, overlay_page in zip(self.pages, overlay.pages):
+            form = _form_xobject(overlay_page, translate)
+            form_num = alloc()
+            write_object(form_num, form)
+            flush_pending()
+
+            resources = DictionaryObject(base.resources)
+            xobjects = resources.get("/XObject")
+            xobjects = DictionaryObject(xobjects.get_object()) if xobjects is not None else DictionaryObject()
+            name = _OVERLAY_NAME
+            while name in xobjects:
+                name += "X"
+            xobjects[NameObject(name)] = IndirectObject(form_num, 0, None)
+            resources[NameObject("/XObject")] = xobjects
+
+            x0, y0 = base.origin
+            draw_num = alloc()
+            write_object(draw_num, _content_stream(
+                f"\nQ\nq 1 0 0 1 {x0:g} {y0:g} cm {name} Do Q\n".encode()
+            ))
+
+            page = DictionaryObject(base.page)
+            page[NameObject("/Resources")] = resources
+            page[NameObject("/Contents")] = ArrayObject(
+                [IndirectObject(save_num, 0, None), *base.contents, IndirectObject(draw_num, 0, None)]
+            )
+            write_object(base.idnum, page)
+
+        xref_offset = out.tell()
+        out.write(b"xref\n0 1\n0000000000 65535 f \n")
+        numbers = sorted(offsets)
+        start = 0
+        while start < len(numbers):
+            end = start
+            while end + 1 < len(numbers) and numbers[end + 1] == numbers[end] + 1:
+                end += 1
+            out.write(f"{numbers[start]} {end - start + 1}\n".encode())
+            for num in numbers[start:end + 1]:
+                out.write(f"{offsets[num]:010d} 00000 n \n".encode())
+            start = end + 1
+
+        trailer = DictionaryObject({
+            NameObject("/Size"): NumberObject(next_num[0]),
+            NameObject("/Prev"): NumberObject(self.startxref),
+        })
+        for key, value in self.trailer_refs.items():
+            trailer[NameObject(key)] = value
+        out.write(b"trailer\n")
+        trailer.write_to_stream(out)
+        out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        return out.getvalue()
+
+
+def _content_stream(data):
+    stream = StreamObject()
+    stream._data = data
+    return stream
+
+
+def _form_xobject(overlay_page, translate):
+    """
+    오버레이 페이지의 내용 스트림과 리소스로 Form XObject를 만듭니다.
+    """
+    contents = overlay_page["/Contents"].get_object()
+    form = StreamObject()
+    if isinstance(contents, ArrayObject):
+        form._data = b"\n".join(part.get_object().get_data() for part in contents)
+    else:
+        for key in ("/Filter", "/DecodeParms"):
+            if key in contents:
+                form[NameObject(key)] = translate(contents[key])
+        form._data = contents._data
+    box = overlay_page.mediabox
+    form[NameObject("/Type")] = NameObject("/XObject")
+    form[NameObject("/Subtype")] = NameObject("/Form")
+    form[NameObject("/BBox")] = ArrayObject(
+        FloatObject(v) for v in (box.left, box.bottom, box.right, box.top)
+    )
+    form[NameObject("/Resources")] = translate(overlay_page.get("/Resources", DictionaryObject()))
+    return form
@@ -0,0 +1,252 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageChops
+
+CACHE_DIR = os.getenv("PDF_IMAGE_CACHE_DIR", os.path.join(".cache", "pdf_images"))
+
+# 동시에 래스터화할 문서 수와 문서 한 개를 나눠 처리할 poppler 프로세스 수입니다.
+# 동시에 도는 poppler 프로세스는 최대 RASTER_WORKERS × RASTER_THREADS개입니다.
+RASTER_WORKERS = int(os.getenv("PDF_RASTER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RASTER_THREADS = int(os.getenv("PDF_RASTER_THREADS", "2"))
+USE_PDFTOCAIRO = os.getenv("PDF_USE_PDFTOCAIRO", "0") == "1"
+
+# 채널 간 차이가 이 값 이하인 양식은 흑백으로 간주합니다.
+_GRAY_TOLERANCE = 2
+
+# (절대경로, dpi) → (파일 서명, 이미지 목록)
+_memory_cache = {}
+# (절대경로, dpi, 페이지) → (파일 서명, 압축 보관된 양식 페이지)
+_template_cache = {}
+_key_locks = {}
+_cache_lock = threading.Lock()
+_executor = None
+
+
+# ────────────────────────────────────────────────────────
+def convert_from_path(pdf_path, **kwargs):
+    # pdf2image는 실제로 래스터화할 때만 불러옵니다(캐시 적중 시 불필요).
+    from pdf2image import convert_from_path as _convert_from_path
+
+    kwargs.setdefault("thread_count", RASTER_THREADS)
+    kwargs.setdefault("use_pdftocairo", USE_PDFTOCAIRO)
+    return _convert_from_path(pdf_path, **kwargs)
+
+
+def _map(func, items):
+    """
+    여러 문서를 RASTER_WORKERS개 스레드로 동시에 처리합니다(poppler는 별도 프로세스이므로 GIL과 무관).
+    """
+    global _executor
+    items = list(items)
+    if len(items) < 2 or RASTER_WORKERS < 2:
+        return [func(item) for item in items]
+    if _executor is None:
+        with _cache_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=RASTER_WORKERS, thread_name_prefix="pdf-raster")
+    return list(_executor.map(func, items))
+
+
+def convert_many(targets):
+    """
+    [(pdf_path, dpi), ...]를 캐시 없이 동시에 래스터화합니다(벤치마크·캐시 재생성용).
+    """
+    return _map(lambda target: convert_from_path(target[0], dpi=target[1]), targets)
+
+
+def _file_signature(pdf_path):
+    """
+    파일의 수정 시각(ns)과 크기로 서명을 만듭니다.
+    템플릿이 교체되면 서명이 달라져 캐시가 자동으로 무효화됩니다.
+    """
+    stat = os.stat(pdf_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _disk_entry_dir(abs_path, signature, dpi):
+    raw = f"{abs_path}|{signature[0]}|{signature[1]}|{dpi}".encode("utf-8")
+    return os.path.join(CACHE_DIR, hashlib.sha1(raw).hexdigest())
+
+
+def _load_from_disk(entry_dir):
+    """
+    디스크 캐시 디렉터리에서 페이지 PNG를 순서대로 읽어 옵니다.
+    캐시가 없거나 손상된 경우 None을 반환합니다.
+    """
+    if not os.path.isdir(entry_dir):
+        return None
+    try:
+        names = sorted(
+            (name for name in os.listdir(entry_dir) if name.endswith(".png")),
+            key=lambda name: int(name[:-4]),
+        )
+        if not names:
+            return None
+        images = []
+        for name in names:
+            with Image.open(os.path.join(entry_dir, name)) as img:
+                img.load()
+                images.append(img.copy())
+        return images
+    except Exception:
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+
+
+def _save_to_disk(entry_dir, images):
+    """
+    임시 디렉터리에 모두 기록한 뒤 rename 하여,
+    다른 프로세스가 반쯤 쓰인 캐시를 읽지 않도록 합니다.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=CACHE_DIR, prefix=".tmp-")
+        for i, img in enumerate(images):
+            img.save(os.path.join(tmp_dir, f"{i}.png"), format="PNG")
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # 다른 프로세스가 먼저 기록한 경우
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except OSError:
+        # 디스크 캐시는 선택 사항이므로 기록 실패는 무시합니다.
+        pass
+
+
+def _load_pages(abs_path, signature, dpi):
+    """
+    디스크 캐시에 있으면 읽고, 없으면 poppler로 래스터화한 뒤 디스크에 기록합니다.
+    """
+    entry_dir = _disk_entry_dir(abs_path, signature, dpi)
+    images = _load_from_disk(entry_dir)
+    if images is None:
+        images = convert_from_path(abs_path, dpi=dpi)
+        _save_to_disk(entry_dir, images)
+    return images
+
+
+def compact_page(image):
+    """
+    흑백 양식은 'L' 모드로, 컬러 양식은 'RGB' 모드로 보관합니다.
+    RGBA 대비 메모리를 1/4~3/4 수준으로 줄입니다.
+    """
+    rgb = image.convert("RGB")
+    r, g, b = rgb.split()
+    spread = max(
+        ImageChops.difference(r, g).getextrema()[1],
+        ImageChops.difference(g, b).getextrema()[1],
+    )
+    if spread <= _GRAY_TOLERANCE:
+        return rgb.convert("L")
+    return rgb
+
+
+def _lock_for(key):
+    with _cache_lock:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+# ────────────────────────────────────────────────────────
+
+
+def rasterize_pdf(pdf_path, dpi=150):
+    """
+    PDF의 모든 페이지를 PIL 이미지 목록으로 반환합니다.
+    (경로, 수정 시각·크기, dpi) 단위로 메모리 → 디스크 → poppler 순으로 조회하며,
+    결과는 모든 세션이 공유하므로 반환된 이미지를 수정하지 마세요.
+    """
+    abs_path = os.path.abspath(pdf_path)
+    signature = _file_signature(abs_path)
+    key = (abs_path, dpi)
+
+    cached = _memory_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    # 같은 PDF를 여러 세션이 동시에 요청해도 poppler는 한 번만 실행합니다.
+    with _lock_for(key):
+        cached = _memory_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        images = _load_pages(abs_path, signature, dpi)
+        _memory_cache[key] = (signature, images)
+        return images
+
+
+def get_template_page(pdf_path, dpi=200, page=0):
+    """
+    양식 PDF의 한 페이지를 프로세스당 한 번만 래스터화하여 보관하고,
+    호출할 때마다 그 위에 바로 그릴 수 있는 RGB 사본을 반환합니다.
+    """
+    abs_path = os.path.abspath(pdf_path)
+    signature = _file_signature(abs_path)
+    key = (abs_path, dpi, page)
+
+    cached = _template_cache.get(key)
+    if not (cached and cached[0] == signature):
+        with _lock_for(("template",) + key):
+            cached = _template_cache.get(key)
+            if not (cached and cached[0] == signature):
+                pages = _load_pages(abs_path, signature, dpi)
+                cached = _template_cache[key] = (signature, compact_page(pages[page]))
+
+    base = cached[1]
+    if base.mode == "RGB":
+        return base.copy()
+    return base.convert("RGB")
+
+
+def get_template_pages(pdf_paths, dpi=200):
+    """
+    여러 양식의 첫 페이지 사본을 함께 반환합니다. 캐시에 없는 양식은 동시에 래스터화합니다.
+    """
+    return _map(lambda pdf_path: get_template_page(pdf_path, dpi=dpi), pdf_paths)
+
+
+def _ignore_errors(func):
+    def run(target):
+        try:
+            func(*target)
+        except Exception:
+            pass
+    return run
+
+
+def warm_up(targets):
+    """
+    [(pdf_path, dpi), ...] 목록을 동시에 미리 래스터화하여 캐시를 채웁니다.
+    실패한 항목은 건너뛰고, 첫 요청 시 다시 시도됩니다.
+    """
+    _map(_ignore_errors(lambda pdf_path, dpi: rasterize_pdf(pdf_path, dpi=dpi)), targets)
+
+
+def warm_up_templates(targets):
+    """
+    [(pdf_path, dpi), ...] 양식의 첫 페이지를 동시에 미리 보관해 둡니다.
+    """
+    _map(_ignore_errors(lambda pdf_path, dpi: get_template_page(pdf_path, dpi=dpi)), targets)
+
+
+def clear_memory_cache():
+    with _cache_lock:
+        _memory_cache.clear()
+        _template_cache.clear()
+
+
+if __name__ == "__main__":
+    # 배포 시 디스크 캐시를 미리 만들어 둡니다.
+    #   python pdf_raster.py consent_sample.pdf transfer_sample.pdf
+    import sys
+
+    for path in sys.argv[1:] or ["consent_sample.pdf", "transfer_sample.pdf"]:
+        print(path, len(rasterize_pdf(path, dpi=150)), "page(s) cached")
+    if not sys.argv[1:]:
+        for path in ["consent.pdf", "transfer.pdf"]:
+            print(path, get_template_page(path, dpi=200).size, "template cached")
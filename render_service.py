@@ -0,0 +1,154 @@
+"""
+3단계 PDF 렌더링을 고정 크기 프로세스 풀에서 처리하고, 대기열 길이를 제한합니다.
+
+- 동시에 렌더링하는 작업은 workers개이며, 나머지는 max_backlog개까지 차례를 기다립니다.
+- 그 이상 들어오면 ServiceBusy를 일으켜 화면에서 "잠시 후 다시 시도" 안내를 하게 합니다.
+- 대기 중인 작업은 position()으로 앞선 작업 수를, eta()로 최근 처리 시간 기준 예상 대기 시간을 알 수 있습니다.
+
+작업 프로세스는 spawn으로 띄우므로 Streamlit 서버의 스레드·잠금 상태를 물려받지 않습니다.
+그 대신 캐시도 프로세스마다 따로 가지므로, 작업 프로세스가 뜰 때 form_render.warm_up()으로 렌더 계획·양식 페이지·글꼴을 준비하고,
+미리 그린 양식 레이어(layer_cache)도 프로세스마다 LAYER_CACHE_MB씩 보관합니다. 최대 사용량은 workers × LAYER_CACHE_MB(기본 128 MB)입니다.
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import form_layout
+import form_render
+import metrics
+
+
+class ServiceBusy(RuntimeError):
+    pass
+
+
+def _init_worker(templates, font_path):
+    # 작업 프로세스마다 (최종·초안 해상도의) 렌더 계획·양식 페이지·글꼴을 한 번 준비합니다.
+    if templates:
+        form_render.warm_up(templates, font_path)
+    else:
+        form_layout.get_plans(font_path)
+        form_layout.get_plans(font_path, form_render.DRAFT_DPI)
+
+
+def _render(applicant, stamps, templates, font_path, backend, profile, preview, final):
+    start = time.perf_counter()
+    rendered = form_render.render_application(
+        applicant, stamps, templates, font_path, backend=backend, preview=preview, profile=profile, final=final
+    )
+    return rendered, time.perf_counter() - start
+
+
+class RenderTicket:
+    """
+    제출된 렌더링 작업 하나입니다. result()는 RenderedForm을 반환합니다.
+    """
+
+    def __init__(self, service, future):
+        self._service = service
+        self.future = future
+        self.submitted_at = time.monotonic()
+
+    def done(self):
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        try:
+            self.future.exception(timeout=timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def result(self, timeout=None):
+        return self.future.result(timeout=timeout)[0]
+
+    def position(self):
+        return self._service.position(self)
+
+    def eta(self):
+        return self._service.eta(self)
+
+
+class RenderService:
+    """
+    templates(동의서, 전입학예정확인서)를 주면 작업 프로세스가 뜰 때 그 양식까지 미리 준비합니다.
+    """
+
+    def __init__(self, font_path, workers=2, max_backlog=8, history=50, templates=None):
+        self.font_path = font_path
+        self.workers = workers
+        self.max_backlog = max_backlog
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(templates, font_path),
+        )
+        self._in_flight = []
+        self._durations = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    # ────────────────────────────────────────────────────────
+    def submit(self, applicant, stamps, templates, backend=None, profile=None, preview=True, final=True):
+        """
+        작업을 대기열에 넣고 RenderTicket을 반환합니다. 대기열이 가득 차면 ServiceBusy를 일으킵니다.
+        preview/final은 render_application()과 같습니다(초안 미리보기만 필요하면 final=False).
+        """
+        with self._lock:
+            if len(self._in_flight) >= self.workers + self.max_backlog:
+                metrics.inc("render_rejected_total")
+                raise ServiceBusy(f"렌더링 대기열이 가득 찼습니다({len(self._in_flight)}건).")
+            future = self._executor.submit(
+                _render, applicant, stamps, templates, self.font_path, backend, profile, preview, final
+            )
+            ticket = RenderTicket(self, future)
+            self._in_flight.append(ticket)
+        future.add_done_callback(lambda f: self._finished(ticket, f))
+        return ticket
+
+    def position(self, ticket):
+        """
+        대기 순번(1부터)을 반환합니다. 0이면 렌더링 중(또는 끝남)입니다.
+        """
+        with self._lock:
+            try:
+                index = self._in_flight.index(ticket)
+            except ValueError:
+                return 0
+        return max(0, index - self.workers + 1)
+
+    def eta(self, ticket):
+        """
+        최근 처리 시간의 평균으로 어림한 남은 시간(초)입니다. 기록이 없으면 None입니다.
+        """
+        with self._lock:
+            if not self._durations:
+                return None
+            average = sum(self._durations) / len(self._durations)
+        # 앞선 작업들이 workers개씩 끝나기를 기다린 뒤 자기 차례 한 번을 더합니다.
+        rounds = -(-self.position(ticket) // self.workers) + 1
+        return rounds * average
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "workers": self.workers,
+            "running": min(in_flight, self.workers),
+            "queued": max(0, in_flight - self.workers),
+            "max_backlog": self.max_backlog,
+        }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+    # ────────────────────────────────────────────────────────
+
+    def _finished(self, ticket, future):
+        with self._lock:
+            if ticket in self._in_flight:
+                self._in_flight.remove(ticket)
+            if not future.cancelled() and future.exception() is None:
+                self._durations.append(future.result()[1])
+        metrics.observe("render_queue_total_seconds", time.monotonic() - ticket.submitted_at)
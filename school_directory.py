@@ -0,0 +1,268 @@
+"""
+school_data.xlsx를 한 번만 읽어 지역 → 학교 목록, 학교 → 이메일 조회표로 만들고,
+모든 세션이 공유합니다.
+
+openpyxl 파싱이 느리므로 결과를 피클 사이드카 파일로 저장해 두고,
+xlsx의 수정 시각·크기가 바뀐 경우에만 다시 만듭니다.
+
+선택 컬럼 '발송방식'에 "묶음"(기본 간격) 또는 "묶음 30"(30분)처럼 적은 학교는
+제출 메일을 모아 간격마다 한 통으로 받습니다(delivery_for()). 비어 있거나 "즉시"이면 제출마다 보냅니다.
+알아볼 수 없는 값은 그 학교만 "즉시"로 처리하고, 학교와 값을 경고 로그로 남깁니다.
+
+학교가 많은 지역을 위해 지역별 검색 색인도 제공합니다(search()).
+학교 이름을 자모 단위로 풀어 두어 입력 중인 글자("민구" → "민국초등학교")와
+초성 검색("ㅁㄱㅊ")을 모두 앞부분 일치로 찾고, 상위 limit개만 돌려줍니다.
+"""
+import logging
+import os
+import pickle
+import re
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+import metrics
+
+CACHE_DIR = os.getenv("SCHOOL_DIRECTORY_CACHE_DIR", ".cache")
+REQUIRED_COLUMNS = ('지역', '학교', '이메일')
+DELIVERY_COLUMN = '발송방식'
+
+# mode는 "immediate" 또는 "digest", interval_minutes는 묶음 간격(None이면 앱 기본값)입니다.
+Delivery = namedtuple("Delivery", "mode interval_minutes")
+IMMEDIATE = Delivery("immediate", None)
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+             "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+# 두 번의 키 입력으로 만들어지는 모음·받침은 입력 순서대로 풀어 둡니다("고" → "과", "달" → "닭").
+_COMPOUND_JAMO = {
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+    "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+}
+_SYLLABLE_BASE = 0xAC00
+_SYLLABLE_LAST = 0xD7A3
+
+_directories = {}
+_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+
+class DirectoryFormatError(ValueError):
+    pass
+
+
+def parse_delivery(value):
+    """
+    '발송방식' 칸을 Delivery로 바꿉니다. 빈 칸·"즉시"는 IMMEDIATE, "묶음"·"묶음 30분"은 묶음 발송입니다.
+    """
+    text = "" if value is None else str(value).strip()
+    if not text or text.lower() == "nan" or text.startswith("즉시"):
+        return IMMEDIATE
+    if text.startswith("묶음") or text.lower().startswith("digest"):
+        minutes = re.search(r"\d+", text)
+        return Delivery("digest", int(minutes.group()) if minutes else None)
+    raise DirectoryFormatError(f"알 수 없는 발송방식입니다: {text} ('즉시' 또는 '묶음 [분]')")
+
+
+# ────────────────────────────────────────────────────────
+def _normalize(text):
+    return "".join(str(text).split()).lower()
+
+
+def to_jamo(text):
+    """
+    한글 음절을 키 입력 순서의 자모로 풀어 씁니다. 한글이 아닌 글자는 그대로 둡니다.
+    """
+    out = []
+    for ch in _normalize(text):
+        code = ord(ch) - _SYLLABLE_BASE
+        if 0 <= code <= _SYLLABLE_LAST - _SYLLABLE_BASE:
+            jung, jong = JUNGSEONG[code % 588 // 28], JONGSEONG[code % 28]
+            out.append(CHOSEONG[code // 588])
+            out.append(_COMPOUND_JAMO.get(jung, jung))
+            out.append(_COMPOUND_JAMO.get(jong, jong))
+        else:
+            out.append(_COMPOUND_JAMO.get(ch, ch))
+    return "".join(out)
+
+
+def to_initials(text):
+    """
+    한글 음절을 초성으로 바꿉니다("민국초" → "ㅁㄱㅊ").
+    """
+    out = []
+    for ch in _normalize(text):
+        code = ord(ch) - _SYLLABLE_BASE
+        out.append(CHOSEONG[code // 588] if 0 <= code <= _SYLLABLE_LAST - _SYLLABLE_BASE else ch)
+    return "".join(out)
+
+
+class SchoolIndex:
+    """
+    학교 이름 목록의 앞부분 일치 색인입니다. 자모 키와 초성 키를 각각 정렬해 두고 bisect로 찾습니다.
+    이름에 띄어쓰기가 있으면 각 어절로 시작하는 키도 색인합니다("서울 민국초" → "민국"으로도 검색).
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        jamo_keys, initial_keys = [], []
+        for rank, name in enumerate(self.names):
+            words = str(name).split()
+            for start in range(len(words)):
+                suffix = " ".join(words[start:])
+                jamo_keys.append((to_jamo(suffix), rank))
+                initial_keys.append((to_initials(suffix), rank))
+        self._jamo_keys = sorted(jamo_keys)
+        self._initial_keys = sorted(initial_keys)
+
+    def search(self, query, limit=20):
+        """
+        query로 시작하는 이름을 가나다순으로 최대 limit개 반환합니다.
+        query가 초성만으로 되어 있으면 초성 색인을, 아니면 자모 색인을 씁니다. 빈 query는 파일 순서입니다.
+        """
+        query = _normalize(query)
+        if not query:
+            return self.names[:limit]
+        if all(ch in CHOSEONG for ch in query):
+            keys, prefix = self._initial_keys, query
+        else:
+            keys, prefix = self._jamo_keys, to_jamo(query)
+        results, seen = [], set()
+        # 목록을 잘라 복사하지 않고, 앞부분이 맞지 않는 첫 키에서 멈춥니다.
+        for index in range(bisect_left(keys, (prefix,)), len(keys)):
+            key, rank = keys[index]
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            if rank not in seen:
+                seen.add(rank)
+                results.append(self.names[rank])
+        return results
+# ────────────────────────────────────────────────────────
+
+
+class SchoolDirectory:
+    def __init__(self, schools_by_region, email_by_school, delivery_by_school=None):
+        self.schools_by_region = schools_by_region
+        self.email_by_school = email_by_school
+        self.delivery_by_school = delivery_by_school or {}
+        self.regions = list(schools_by_region)
+        self._indexes = {}
+
+    def schools(self, region):
+        return self.schools_by_region.get(region, [])
+
+    def email_for(self, school):
+        return self.email_by_school.get(school)
+
+    def delivery_for(self, school):
+        return self.delivery_by_school.get(school, IMMEDIATE)
+
+    def search(self, region, query, limit=20):
+        """
+        지역 안에서 query로 시작하는 학교를 최대 limit개 반환합니다. 색인은 지역별로 처음 검색할 때 만듭니다.
+        """
+        index = self._indexes.get(region)
+        if index is None:
+            index = self._indexes[region] = SchoolIndex(self.schools(region))
+        return index.search(query, limit)
+
+
+# ────────────────────────────────────────────────────────
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _sidecar_path(abs_path):
+    return os.path.join(CACHE_DIR, os.path.basename(abs_path) + ".directory.pickle")
+
+
+def _build(abs_path):
+    """
+    xlsx를 읽어 조회표를 만듭니다. 지역은 정렬 순서, 학교는 파일 순서를 따르며,
+    같은 학교가 여러 번 나오면 처음 나온 이메일을 쓰고, 이메일이 빈 행은 건너뜁니다.
+    발송방식 조회표에는 묶음 발송 학교만 담으며, 잘못 적힌 발송방식 한 칸 때문에 조회표 전체를 버리지 않습니다.
+    """
+    import pandas as pd
+
+    with metrics.timed("directory_build"):
+        df = pd.read_excel(abs_path)
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise DirectoryFormatError("XLSX 파일에 '지역', '학교', '이메일' 컬럼이 있어야 합니다.")
+    schools_by_region = df.groupby('지역')['학교'].apply(list).to_dict()
+    email_by_school = {}
+    for school, email in zip(df['학교'], df['이메일']):
+        if pd.notna(email):
+            email_by_school.setdefault(school, str(email).strip())
+    delivery_by_school = {}
+    if DELIVERY_COLUMN in df.columns:
+        for school, value in zip(df['학교'], df[DELIVERY_COLUMN]):
+            try:
+                delivery = parse_delivery(value if pd.notna(value) else None)
+            except DirectoryFormatError as e:
+                metrics.inc("directory_delivery_invalid_total")
+                logger.warning("%s: %s 즉시 발송으로 처리합니다.", school, e)
+                continue
+            if delivery != IMMEDIATE:
+                delivery_by_school.setdefault(school, delivery)
+    return schools_by_region, email_by_school, delivery_by_school
+
+
+def _load_sidecar(sidecar, abs_path, signature):
+    try:
+        with open(sidecar, "rb") as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        return None
+    if payload.get("source") != abs_path or payload.get("signature") != signature:
+        return None
+    if "delivery_by_school" not in payload:
+        # 발송방식 조회표가 없던 시절의 사이드카는 다시 만듭니다.
+        return None
+    return payload["schools_by_region"], payload["email_by_school"], payload["delivery_by_school"]
+
+
+def _save_sidecar(sidecar, abs_path, signature, tables):
+    payload = {
+        "source": abs_path,
+        "signature": signature,
+        "schools_by_region": tables[0],
+        "email_by_school": tables[1],
+        "delivery_by_school": tables[2],
+    }
+    try:
+        os.makedirs(os.path.dirname(sidecar) or ".", exist_ok=True)
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, sidecar)
+    except OSError:
+        pass
+# ────────────────────────────────────────────────────────
+
+
+def load_directory(xlsx_path):
+    """
+    학교 조회표를 반환합니다. 메모리 → 사이드카 → xlsx 순으로 찾고,
+    xlsx가 바뀌면 자동으로 다시 만듭니다.
+    """
+    abs_path = os.path.abspath(xlsx_path)
+    signature = _file_signature(abs_path)
+    cached = _directories.get(abs_path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with _lock:
+        cached = _directories.get(abs_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        sidecar = _sidecar_path(abs_path)
+        tables = _load_sidecar(sidecar, abs_path, signature)
+        if tables is None:
+            tables = _build(abs_path)
+            _save_sidecar(sidecar, abs_path, signature, tables)
+        directory = SchoolDirectory(*tables)
+        _directories[abs_path] = (signature, directory)
+        return directory
@@ -0,0 +1,155 @@
+"""
+제출 기록을 로컬 SQLite 저널에 먼저 쌓고, 백그라운드 스레드가 모아서
+worksheet.append_rows()로 한 번에 구글 시트에 기록합니다.
+
+- 워크시트 핸들은 handle_ttl초 동안 재사용하고, 기록 실패 시 다시 엽니다.
+- batch_size개가 쌓이거나 flush_interval초가 지나면 기록합니다.
+- 저널에 남은 행은 프로세스가 재시작되어도 다음 기록 때 함께 올라갑니다.
+"""
+import atexit
+import json
+import sqlite3
+import threading
+import time
+
+import metrics
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row TEXT NOT NULL
+);
+"""
+
+
+class SheetsLogger:
+    """
+    open_worksheet는 인자 없이 gspread Worksheet(또는 append_rows를 가진 객체)를 반환하는 함수입니다.
+    """
+
+    def __init__(self, open_worksheet, journal_path, batch_size=20, flush_interval=10.0,
+                 handle_ttl=600.0, retry_delay=30.0):
+        self.open_worksheet = open_worksheet
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.handle_ttl = handle_ttl
+        self.retry_delay = retry_delay
+        self._worksheet = None
+        self._worksheet_opened_at = 0.0
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self.last_error = None
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.journal_path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ────────────────────────────────────────────────────────
+    def log(self, row):
+        """
+        한 행을 저널에 기록합니다. 시트 API는 호출하지 않으므로 즉시 반환합니다.
+        """
+        db = self._connect()
+        try:
+            db.execute("INSERT INTO journal (row) VALUES (?)", (json.dumps(row, ensure_ascii=False),))
+            pending = db.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+        finally:
+            db.close()
+        if pending >= self.batch_size:
+            with self._wakeup:
+                self._wakeup.notify()
+
+    def pending_count(self):
+        db = self._connect()
+        try:
+            return db.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+        finally:
+            db.close()
+
+    def worksheet(self):
+        """
+        캐시된 워크시트 핸들을 반환하며, handle_ttl이 지났으면 다시 엽니다.
+        """
+        if self._worksheet is None or time.monotonic() - self._worksheet_opened_at > self.handle_ttl:
+            self._worksheet = self.open_worksheet()
+            self._worksheet_opened_at = time.monotonic()
+        return self._worksheet
+
+    def flush(self):
+        """
+        저널의 행을 batch_size개씩 append_rows로 기록하고, 성공한 행만 저널에서 지웁니다.
+        기록한 행 수를 반환합니다. 실패하면 행은 저널에 남고 예외가 전달됩니다.
+        """
+        written = 0
+        with self._flush_lock:
+            db = self._connect()
+            try:
+                while True:
+                    batch = db.execute(
+                        "SELECT id, row FROM journal ORDER BY id LIMIT ?", (self.batch_size,)
+                    ).fetchall()
+                    if not batch:
+                        break
+                    try:
+                        with metrics.timed("sheets_append"):
+                            self.worksheet().append_rows([json.loads(row) for _, row in batch])
+                    except Exception:
+                        # 핸들이 만료되었을 수 있으므로 다음 시도에서 다시 엽니다.
+                        self._worksheet = None
+                        raise
+                    db.execute("DELETE FROM journal WHERE id <= ?", (batch[-1][0],))
+                    written += len(batch)
+                    metrics.inc("sheets_rows_written_total", len(batch))
+            finally:
+                db.close()
+        return written
+    # ────────────────────────────────────────────────────────
+
+    # ────────────────────────────────────────────────────────
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="sheets-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=10.0):
+        """
+        백그라운드 스레드를 멈추고 남은 행을 마지막으로 기록해 봅니다.
+        """
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            self.last_error = e
+
+    def _run(self):
+        delay = self.flush_interval
+        while not self._stopping:
+            with self._wakeup:
+                self._wakeup.wait(delay)
+            if self._stopping:
+                break
+            try:
+                self.flush()
+                self.last_error = None
+                delay = self.flush_interval
+            except Exception as e:
+                self.last_error = e
+                delay = self.retry_delay
+    # ────────────────────────────────────────────────────────
@@ -0,0 +1,176 @@
+"""
+서명 캔버스(st_canvas)의 RGBA 배열을 한 번 훑어서
+서명 면적 검사, 잉크 영역 잘라내기, 도장 크기 맞춤을 처리합니다.
+
+캔버스의 json_data(fabric.js 획 경로)가 있으면 process_strokes()로
+획의 좌표에서 면적을 어림하고, 150×300 비트맵을 키우는 대신 도장 크기에서 바로 그립니다.
+
+알파가 없거나 모두 불투명한 서명(스캔, JPEG, 흰 바탕 PNG)은 밝기에서 알파를 만들어,
+종이 바탕은 투명하게 하고 잉크만 양식 위에 얹습니다.
+"""
+import math
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from form_layout import SIGNATURE_BOX
+
+MIN_COVERAGE = 0.05
+CANVAS_SIZE = (300, 150)
+SUPERSAMPLE = 4
+CURVE_STEPS = 8
+# 이 밝기 이상은 종이 바탕으로 보고 완전히 투명하게 합니다(스캔·JPEG의 누런 바탕과 잡음).
+PAPER_LEVEL = 235
+
+
+def _to_array(image_data):
+    if isinstance(image_data, Image.Image):
+        array = np.asarray(image_data.convert('RGBA'))
+    else:
+        array = np.asarray(image_data)
+        if array.shape[-1] == 3:
+            array = np.dstack([array, np.full(array.shape[:2], 255, array.dtype)])
+    if array.size and array[..., 3].min() == 255:
+        return _alpha_from_luminance(array)
+    return array
+
+
+def _alpha_from_luminance(array):
+    """
+    불투명한 흰 바탕 서명의 알파를 밝기로 만듭니다(어두울수록 진한 잉크, 모든 채널이 PAPER_LEVEL 이상이면 투명).
+    색은 흰 바탕 위에 다시 얹었을 때 원래 색이 되도록 바탕을 걷어 낸 값으로 바꿉니다.
+    """
+    rgb = array[..., :3].astype(np.float32)
+    # 가장 어두운 채널로 재야 파란 잉크처럼 밝은 채널이 있는 색도 바탕을 걷어 낸 색이 0~255 안에 듭니다.
+    darkest = rgb.min(axis=-1)
+    alpha = np.where(darkest >= PAPER_LEVEL, 0, 255 - darkest)
+    ink = 255 - (255 - rgb) * 255 / np.maximum(alpha, 1)[..., None]
+    color = np.where(alpha[..., None] > 0, np.clip(ink, 0, 255), 0)
+    return np.dstack([color, alpha]).round().astype(np.uint8)
+
+
+def _fit(crop, box):
+    """
+    잘라낸 잉크 영역을 가로세로 비율을 유지한 채 box 안에 맞추고 가운데에 둡니다.
+    알파를 곱한(premultiplied) 상태로 리샘플링하여 획 가장자리에 검은 테두리가 생기지 않게 합니다.
+    """
+    image = Image.fromarray(crop.astype(np.uint8, copy=False), 'RGBA')
+    scale = min(box[0] / image.width, box[1] / image.height)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    resized = image.convert('RGBa').resize(size, Image.LANCZOS).convert('RGBA')
+    stamp = Image.new('RGBA', box, (0, 0, 0, 0))
+    stamp.paste(resized, ((box[0] - size[0]) // 2, (box[1] - size[1]) // 2))
+    return stamp
+
+
+def process_signature(image_data, box=SIGNATURE_BOX, min_coverage=MIN_COVERAGE):
+    """
+    (면적 비율, 도장 이미지)를 반환합니다. 면적이 min_coverage 미만이면 도장은 None입니다.
+    면적 비율은 전체 캔버스 중 알파가 0보다 큰 픽셀의 비율입니다.
+    """
+    array = _to_array(image_data)
+    ink = array[..., 3] > 0
+    coverage = np.count_nonzero(ink) / ink.size
+    if coverage == 0 or coverage < min_coverage:
+        return coverage, None
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    crop = array[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    return coverage, _fit(crop, box)
+
+
+def make_stamp(image_data, box=SIGNATURE_BOX):
+    """
+    면적 검사 없이 도장 이미지만 만듭니다(일괄 생성처럼 미리 받은 서명용). 빈 서명은 투명 도장이 됩니다.
+    """
+    stamp = process_signature(image_data, box, min_coverage=0)[1]
+    if stamp is None:
+        return Image.new('RGBA', box, (0, 0, 0, 0))
+    return stamp
+
+
+# ────────────────────────────────────────────────────────
+def _flatten_path(commands):
+    """
+    fabric.js 경로 명령(M, L, Q)을 꺾은선 좌표 목록으로 풉니다. Q는 CURVE_STEPS개의 선분으로 나눕니다.
+    """
+    points = []
+    for command in commands:
+        op, args = command[0], command[1:]
+        if op in ("M", "L") and len(args) >= 2:
+            points.append((float(args[0]), float(args[1])))
+        elif op == "Q" and len(args) >= 4 and points:
+            (x0, y0), (cx, cy), (x1, y1) = points[-1], (float(args[0]), float(args[1])), (float(args[2]), float(args[3]))
+            for step in range(1, CURVE_STEPS + 1):
+                t = step / CURVE_STEPS
+                u = 1 - t
+                points.append((u * u * x0 + 2 * u * t * cx + t * t * x1, u * u * y0 + 2 * u * t * cy + t * t * y1))
+    return points
+
+
+def parse_strokes(json_data):
+    """
+    st_canvas의 json_data에서 자유 그리기 획을 [(좌표 목록, 굵기), ...]로 꺼냅니다.
+    freedraw 모드의 경로 좌표는 캔버스 기준 절대 좌표이므로 그대로 씁니다.
+    """
+    strokes = []
+    for obj in (json_data or {}).get("objects", []):
+        if obj.get("type") != "path":
+            continue
+        points = _flatten_path(obj.get("path") or [])
+        if points:
+            strokes.append((points, float(obj.get("strokeWidth") or 1)))
+    return strokes
+
+
+def stroke_coverage(strokes, canvas_size=CANVAS_SIZE):
+    """
+    획 길이 × 굵기(와 양 끝의 둥근 머리)로 어림한 잉크 면적을 캔버스 면적에 대한 비율로 반환합니다.
+    겹친 획은 두 번 세므로 비트맵 기준 면적보다 조금 클 수 있습니다.
+    """
+    area = 0.0
+    for points, width in strokes:
+        length = sum(math.dist(a, b) for a, b in zip(points, points[1:]))
+        area += length * width + math.pi * (width / 2) ** 2
+    return min(1.0, area / (canvas_size[0] * canvas_size[1]))
+
+
+def render_strokes(strokes, box=SIGNATURE_BOX):
+    """
+    획 전체의 경계 상자를 가로세로 비율을 유지한 채 box 안에 맞추고 가운데에 그립니다.
+    SUPERSAMPLE배로 그린 뒤 줄여 가장자리를 부드럽게 합니다.
+    """
+    half = max(width for _, width in strokes) / 2
+    xs = [x for points, _ in strokes for x, _ in points]
+    ys = [y for points, _ in strokes for _, y in points]
+    left, top = min(xs) - half, min(ys) - half
+    ink_width, ink_height = max(xs) + half - left, max(ys) + half - top
+    scale = min(box[0] / ink_width, box[1] / ink_height) * SUPERSAMPLE
+    offset_x = (box[0] * SUPERSAMPLE - ink_width * scale) / 2
+    offset_y = (box[1] * SUPERSAMPLE - ink_height * scale) / 2
+
+    mask = Image.new('L', (box[0] * SUPERSAMPLE, box[1] * SUPERSAMPLE), 0)
+    draw = ImageDraw.Draw(mask)
+    for points, width in strokes:
+        scaled = [((x - left) * scale + offset_x, (y - top) * scale + offset_y) for x, y in points]
+        radius = width * scale / 2
+        if len(scaled) > 1:
+            draw.line(scaled, fill=255, width=max(1, round(width * scale)), joint="curve")
+        for x, y in (scaled[0], scaled[-1]):
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=255)
+    mask = mask.reduce(SUPERSAMPLE)
+    black = Image.new('L', box, 0)
+    return Image.merge('RGBA', (black, black, black, mask))
+
+
+def process_strokes(json_data, box=SIGNATURE_BOX, min_coverage=MIN_COVERAGE, canvas_size=CANVAS_SIZE):
+    """
+    process_signature()의 획 경로판입니다. (면적 비율, 도장 이미지)를 반환하며,
+    면적이 min_coverage 미만이면 도장은 None입니다.
+    """
+    strokes = parse_strokes(json_data)
+    coverage = stroke_coverage(strokes, canvas_size)
+    if coverage == 0 or coverage < min_coverage:
+        return coverage, None
+    return coverage, render_strokes(strokes, box)
+# ────────────────────────────────────────────────────────
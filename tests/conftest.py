@@ -0,0 +1,32 @@
+"""
+테스트 공용 설정입니다. 저장소 루트의 모듈을 불러오고, 양식 PDF·글꼴 같은 상대 경로가 맞도록 루트에서 실행합니다.
+
+글꼴(malgun.ttf 또는 TEST_FONT_PATH)이나 poppler(pdftoppm)가 필요한 테스트는 없으면 건너뜁니다.
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def _repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture
+def font_path():
+    path = os.getenv("TEST_FONT_PATH") or os.path.join(ROOT, "malgun.ttf")
+    if not os.path.exists(path):
+        pytest.skip("글꼴이 없습니다(malgun.ttf 또는 TEST_FONT_PATH).")
+    return path
+
+
+@pytest.fixture
+def poppler():
+    if shutil.which("pdftoppm") is None:
+        pytest.skip("poppler(pdftoppm)가 없습니다.")
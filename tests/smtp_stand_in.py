@@ -0,0 +1,79 @@
+"""
+발송함 테스트와 부하 시험(load_test.py)이 함께 쓰는 로컬 SMTP 대역 서버입니다.
+실제 메일은 어디로도 가지 않습니다.
+"""
+import base64
+import socketserver
+import threading
+import time
+from collections import deque
+
+
+# ────────────────────────────────────────────────────────
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    # 발송함이 쓰는 명령(EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT)만 받아 주는 최소 SMTP 대화입니다.
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.wfile.write(b"220 load-test\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().upper()
+            if command.startswith((b"EHLO", b"HELO")):
+                self.wfile.write(b"250-load-test\r\n250 AUTH PLAIN\r\n" if server.password else b"250 load-test\r\n")
+            elif command.startswith(b"AUTH PLAIN"):
+                # 초기 응답은 base64("\0아이디\0비밀번호")입니다.
+                credentials = base64.b64decode(line.split()[2]).split(b"\0")
+                accepted = credentials[-1].decode() == server.password
+                self.wfile.write(b"235 accepted\r\n" if accepted else b"535 authentication failed\r\n")
+            elif command == b"DATA":
+                self.wfile.write(b"354 end with <CRLF>.<CRLF>\r\n")
+                size, lines = 0, []
+                for data in iter(self.rfile.readline, b""):
+                    if data == b".\r\n":
+                        break
+                    size += len(data)
+                    if server.keep_messages:
+                        lines.append(data[1:] if data.startswith(b"..") else data)
+                time.sleep(server.delay)
+                with server.lock:
+                    reply = server.data_replies.popleft() if server.data_replies else None
+                    if reply is None:
+                        server.received.append((time.monotonic(), size))
+                        if server.keep_messages:
+                            server.messages.append(b"".join(lines))
+                self.wfile.write((reply or "250 queued").encode() + b"\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 ok\r\n")
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    """
+    받은 메시지를 (도착 시각, 크기)로 기록하는 로컬 SMTP 서버입니다. keep_messages면 본문 바이트도 messages에 남깁니다.
+    password를 주면 AUTH PLAIN을 요구하고, data_replies에 넣은 응답("451 ...", "550 ...")은
+    다음 DATA부터 차례로 돌려줍니다(그 메시지는 받지 않은 것으로 칩니다).
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, password=None, keep_messages=False):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.delay = delay
+        self.password = password
+        self.keep_messages = keep_messages
+        self.data_replies = deque()
+        self.received = []
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="smtp-stand-in", daemon=True).start()
+        return self
+# ────────────────────────────────────────────────────────
@@ -0,0 +1,76 @@
+"""
+일괄 생성 명단을 렌더링 전에 앱과 같은 규칙으로 검사하고, 틀린 열을 행 번호와 함께 보고하는지 확인합니다.
+"""
+import pandas as pd
+import pytest
+from PIL import Image
+
+import batch_generate
+
+VALID = {
+    "학생 성명": "한잎새",
+    "학생 생년월일": "2017-01-01",
+    "현 소속 학교 및 학년": "대한초등학교 1학년",
+    "법정대리인 성명": "한나무",
+    "학생과의 관계": "부",
+    "휴대전화 번호": "01056785678",
+    "전입 예정일": "2025-02-02",
+    "전입 예정 주소": "A-1 Block 101",
+    "전학 예정일": "2025-03-01",
+    "전학 예정 학교": "민국초등학교",
+    "전학 예정 학년": "2학년",
+    "학생 서명": "student.png",
+    "법정대리인 서명": "parent.png",
+}
+
+
+def write_roster(tmp_path, *changes):
+    for name in ("student.png", "parent.png"):
+        image = Image.new("RGBA", (300, 150), (0, 0, 0, 0))
+        image.paste((0, 0, 0, 255), (40, 60, 260, 80))
+        image.save(tmp_path / name)
+    path = tmp_path / "applicants.csv"
+    pd.DataFrame([{**VALID, **change} for change in changes]).to_csv(path, index=False)
+    return str(path)
+
+
+def test_valid_row_is_normalized_like_the_app(tmp_path):
+    rows, invalid = batch_generate.read_applicants(write_roster(tmp_path, {}, {"전학 예정 학년": "3"}))
+
+    assert invalid == []
+    (_, applicant, signs), (_, second, _) = rows
+    assert applicant["parent_phone"] == "010-5678-5678"
+    assert applicant["next_grade"] == "2학년" and second["next_grade"] == "3학년"
+    assert applicant["move_date"].isoformat() == "2025-02-02"
+    assert signs == (str(tmp_path / "student.png"), str(tmp_path / "parent.png"))
+
+
+@pytest.mark.parametrize("column, value, message", [
+    ("전입 예정일", "곧", "날짜로 읽을 수 없습니다"),
+    ("휴대전화 번호", "02-123-4567", "010으로 시작"),
+    ("학생 성명", "Kim", "한글로만"),
+    ("현 소속 학교 및 학년", "대한초등학교", "'학교'와 '학년'"),
+    ("전학 예정 학년", "7", "1~6"),
+    ("전입 예정 주소", "", "빈칸"),
+    ("학생 서명", "missing.png", "파일이 없습니다"),
+])
+def test_invalid_row_reports_the_failing_column(tmp_path, column, value, message):
+    rows, invalid = batch_generate.read_applicants(write_roster(tmp_path, {}, {column: value}))
+
+    assert [index for index, _, _ in rows] == [1]
+    [(index, error)] = invalid
+    assert index == 2
+    assert str(error).startswith(f"{column}: ") and message in str(error)
+
+
+def test_summary_names_the_profile_only_for_raster(tmp_path, font_path, capsys):
+    roster = write_roster(tmp_path, {}, {"전입 예정일": "곧"})
+
+    code = batch_generate.main([roster, "-o", str(tmp_path / "out"), "-w", "1", "--backend", "vector",
+                                "--font", font_path])
+
+    out, err = capsys.readouterr()
+    assert code == 1
+    assert out.startswith("1/2 forms") and out.rstrip().endswith("1 workers, vector)")
+    assert "dpi" not in out
+    assert "row 2: 전입 예정일: 날짜로 읽을 수 없습니다" in err
@@ -0,0 +1,68 @@
+"""
+같은 배치를 초안(DRAFT_DPI)과 최종(LAYOUT_DPI) 해상도로 컴파일했을 때 작성칸 위치가 반올림 오차 안에서 같은지 확인합니다.
+"""
+import dataclasses
+
+import pytest
+
+import form_layout
+import form_render
+
+LAYOUTS = {"consent": form_layout.CONSENT_LAYOUT, "transfer": form_layout.TRANSFER_LAYOUT}
+
+
+def tolerance(dpi):
+    # 낮은 쪽 해상도의 반 픽셀을 배치 단위로 나타낸 값입니다(딱 반 픽셀일 때의 부동소수점 오차는 허용).
+    return form_layout.LAYOUT_UNITS_PER_INCH / min(dpi, form_layout.LAYOUT_DPI) / 2 + 1e-9
+
+
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_final_plan_matches_declared_layout(font_path, name):
+    plan = form_layout.compile_layout(LAYOUTS[name], font_path, form_layout.LAYOUT_DPI)
+
+    expected = [
+        (key, x + placement.get("dx", 0), y)
+        for key, placements in LAYOUTS[name].items()
+        for placement in placements
+        for x, y in [placement["at"]]
+    ]
+    placed = sorted((op.key, op.x, op.y) for op in plan.texts + plan.images)
+    assert placed == sorted(expected)
+
+
+@pytest.mark.parametrize("dpi", sorted({form_render.DRAFT_DPI, 72, 96, 150}))
+@pytest.mark.parametrize("name", LAYOUTS)
+def test_draft_plan_stays_within_rounding_of_final(font_path, name, dpi):
+    final = form_layout.compile_layout(LAYOUTS[name], font_path, form_layout.LAYOUT_DPI)
+    draft = form_layout.compile_layout(LAYOUTS[name], font_path, dpi)
+
+    assert form_layout.placement_error(draft, final) <= tolerance(dpi)
+    # 작성칸마다 따로도 확인해, 한 칸의 큰 어긋남이 다른 칸에 가려지지 않게 합니다.
+    for op, ref in zip(draft.texts + draft.images, final.texts + final.images):
+        single = form_layout.RenderPlan((op,), (), dpi)
+        reference = form_layout.RenderPlan((ref,), (), form_layout.LAYOUT_DPI)
+        assert form_layout.placement_error(single, reference) <= tolerance(dpi), op.key
+
+
+def test_get_plans_at_draft_and_final_dpi_agree(font_path):
+    drafts = form_layout.get_plans(font_path, form_render.DRAFT_DPI)
+    finals = form_layout.get_plans(font_path)
+
+    for draft, final in zip(drafts, finals):
+        assert draft.dpi == form_render.DRAFT_DPI and final.dpi == form_layout.LAYOUT_DPI
+        assert form_layout.placement_error(draft, final) <= tolerance(form_render.DRAFT_DPI)
+
+
+def test_shifted_field_is_reported(font_path):
+    final = form_layout.compile_layout(form_layout.CONSENT_LAYOUT, font_path)
+    draft = form_layout.compile_layout(form_layout.CONSENT_LAYOUT, font_path, form_render.DRAFT_DPI)
+    moved = dataclasses.replace(draft.texts[0], x=draft.texts[0].x + 3)
+    shifted = dataclasses.replace(draft, texts=(moved, *draft.texts[1:]))
+
+    assert form_layout.placement_error(shifted, final) > tolerance(form_render.DRAFT_DPI)
+
+
+def test_plans_from_different_layouts_are_rejected(font_path):
+    consent, transfer = form_layout.get_plans(font_path)
+    with pytest.raises(ValueError):
+        form_layout.placement_error(consent, transfer)
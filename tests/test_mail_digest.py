@@ -0,0 +1,140 @@
+"""
+묶음 발송(DigestQueue)을 로컬 SMTP 대역에 붙여, 기한별 묶음·크기 나눔·zip 첨부·실패 후 재발송을 확인합니다.
+"""
+import io
+import zipfile
+from email import message_from_bytes, policy
+
+import pytest
+
+import mail_outbox
+from smtp_stand_in import SmtpStandIn
+
+SENDER = "school@example.com"
+RECIPIENT = "office@example.com"
+
+
+@pytest.fixture
+def smtp():
+    server = SmtpStandIn(keep_messages=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(tmp_path, smtp):
+    settings = mail_outbox.SmtpSettings(
+        host="127.0.0.1", port=smtp.server_address[1], username=SENDER, password="", starttls=False, timeout=5,
+    )
+    return mail_outbox.MailOutbox(
+        str(tmp_path / "outbox.sqlite3"), settings,
+        pool_size=1, backoff_base=0.01, backoff_max=0.05, poll_interval=0.02,
+    )
+
+
+def make_digest(outbox, **kwargs):
+    return mail_outbox.DigestQueue(outbox, default_interval=0, poll_interval=60, **kwargs)
+
+
+def deliver(outbox):
+    outbox.start()
+    try:
+        assert outbox.wait_until_drained(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+
+
+def sent(smtp):
+    return [message_from_bytes(data, policy=policy.default) for data in smtp.messages]
+
+
+def attachments(message):
+    return {part.get_filename(): part.get_content() for part in message.iter_attachments()}
+
+
+def test_due_items_are_sent_as_one_message(outbox, smtp):
+    digest = make_digest(outbox)
+    for i in range(3):
+        digest.add(SENDER, RECIPIENT, f"학생{i}", f"form{i}.pdf", b"%PDF-" + bytes([i]) * 100)
+
+    assert digest.flush() == 1
+    assert digest.stats()["items"] == 0
+    deliver(outbox)
+
+    [message] = sent(smtp)
+    assert message["To"] == RECIPIENT
+    assert "3건" in message["Subject"]
+    assert sorted(attachments(message)) == ["form0.pdf", "form1.pdf", "form2.pdf"]
+    assert all(f"학생{i}" in message.get_body().get_content() for i in range(3))
+
+
+def test_items_not_yet_due_stay_queued(outbox, smtp):
+    digest = make_digest(outbox)
+    digest.add(SENDER, RECIPIENT, "먼저", "first.pdf", b"%PDF-1")
+    digest.add(SENDER, RECIPIENT, "나중", "later.pdf", b"%PDF-2", interval=3600)
+
+    assert digest.flush() == 1
+    assert digest.stats()["items"] == 1
+    assert digest.flush() == 0
+
+    assert digest.flush(force=True) == 1
+    deliver(outbox)
+    assert [sorted(attachments(message)) for message in sent(smtp)] == [["first.pdf"], ["later.pdf"]]
+
+
+def test_large_batches_are_split_by_size(outbox, smtp):
+    digest = make_digest(outbox, max_bytes=2500)
+    for i in range(5):
+        digest.add(SENDER, RECIPIENT, f"학생{i}", f"form{i}.pdf", bytes(1000))
+
+    assert digest.flush() == 3
+    deliver(outbox)
+    assert [len(attachments(message)) for message in sent(smtp)] == [2, 2, 1]
+
+
+def test_zip_attachment_holds_every_pdf(outbox, smtp):
+    digest = make_digest(outbox, zip_attachments=True)
+    digest.add(SENDER, RECIPIENT, "가", "form.pdf", b"%PDF-a")
+    digest.add(SENDER, RECIPIENT, "나", "form.pdf", b"%PDF-b")
+
+    digest.flush()
+    deliver(outbox)
+
+    [message] = sent(smtp)
+    [(name, data)] = attachments(message).items()
+    assert name.endswith(".zip")
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        contents = {info.filename: archive.read(info) for info in archive.infolist()}
+    assert len(contents) == 2 and sorted(contents.values()) == [b"%PDF-a", b"%PDF-b"]
+
+
+def test_failed_send_is_retried(outbox, smtp):
+    smtp.data_replies.append("451 try again later")
+    digest = make_digest(outbox)
+    digest.add(SENDER, RECIPIENT, "학생", "form.pdf", b"%PDF-1")
+
+    digest.flush()
+    deliver(outbox)
+
+    assert outbox.stats() == {mail_outbox.SENT: 1}
+    assert len(smtp.messages) == 1
+
+
+def test_failed_enqueue_keeps_items(outbox, smtp, monkeypatch):
+    digest = make_digest(outbox)
+    digest.add(SENDER, RECIPIENT, "학생", "form.pdf", b"%PDF-1")
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("build failed")
+
+    monkeypatch.setattr(mail_outbox, "build_digest_message", broken)
+    with pytest.raises(RuntimeError):
+        digest.flush()
+    assert digest.stats()["items"] == 1
+    assert outbox.stats() == {}
+
+    monkeypatch.undo()
+    assert digest.flush() == 1
+    deliver(outbox)
+    assert len(smtp.messages) == 1
@@ -0,0 +1,112 @@
+"""
+발송함을 로컬 SMTP 대역(smtp_stand_in)에 붙여, 연결 재사용과 오류별 재시도·실패 처리를 확인합니다.
+"""
+import time
+
+import pytest
+
+import mail_outbox
+from smtp_stand_in import SmtpStandIn
+
+
+@pytest.fixture
+def smtp():
+    server = SmtpStandIn(password="current").start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_outbox(tmp_path, smtp, password="current", **kwargs):
+    settings = mail_outbox.SmtpSettings(
+        host="127.0.0.1", port=smtp.server_address[1], username="school@example.com",
+        password=password, starttls=False, timeout=5,
+    )
+    options = {"pool_size": 1, "backoff_base": 0.01, "backoff_max": 0.05, "poll_interval": 0.02, **kwargs}
+    return mail_outbox.MailOutbox(str(tmp_path / "outbox.sqlite3"), settings, **options)
+
+
+def attempts(outbox):
+    db = outbox._connect()
+    try:
+        return db.execute("SELECT MAX(attempts) FROM outbox").fetchone()[0]
+    finally:
+        db.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "시간 안에 조건을 만족하지 못했습니다."
+        time.sleep(0.02)
+
+
+def test_sends_queued_mail_over_one_connection(tmp_path, smtp):
+    outbox = make_outbox(tmp_path, smtp)
+    for i in range(3):
+        outbox.enqueue("school@example.com", "a@example.com", f"Subject: {i}\r\n\r\nbody".encode())
+    outbox.start()
+    try:
+        assert outbox.wait_until_drained(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+    assert outbox.stats() == {mail_outbox.SENT: 3}
+    assert len(smtp.received) == 3
+    assert smtp.connections == 1
+
+
+def test_transient_reply_is_retried(tmp_path, smtp):
+    smtp.data_replies.extend(["451 try again later", "421 busy"])
+    outbox = make_outbox(tmp_path, smtp)
+    outbox.enqueue("school@example.com", "a@example.com", b"Subject: x\r\n\r\nbody")
+    outbox.start()
+    try:
+        assert outbox.wait_until_drained(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+    assert outbox.stats() == {mail_outbox.SENT: 1}
+    assert attempts(outbox) == 3
+
+
+def test_permanent_reply_fails_the_message(tmp_path, smtp):
+    smtp.data_replies.append("550 mailbox unavailable")
+    outbox = make_outbox(tmp_path, smtp)
+    outbox.enqueue("school@example.com", "a@example.com", b"Subject: x\r\n\r\nbody")
+    outbox.start()
+    try:
+        assert outbox.wait_until_drained(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+    assert outbox.stats() == {mail_outbox.FAILED: 1}
+    assert smtp.received == []
+
+
+def test_rejected_login_keeps_mail_queued_until_password_is_fixed(tmp_path, smtp):
+    # 앱 비밀번호를 바꾼 직후처럼 535가 나도, 최대 시도 횟수를 넘겨 실패 처리하지 않습니다.
+    outbox = make_outbox(tmp_path, smtp, password="rotated", max_attempts=2)
+    for i in range(2):
+        outbox.enqueue("school@example.com", "a@example.com", f"Subject: {i}\r\n\r\nbody".encode())
+    outbox.start()
+    try:
+        wait_for(lambda: (attempts(outbox) or 0) > outbox.max_attempts)
+        assert outbox.stats() == {mail_outbox.PENDING: 2}
+
+        smtp.password = "rotated"
+        assert outbox.wait_until_drained(timeout=5)
+    finally:
+        outbox.stop(timeout=5)
+    assert outbox.stats() == {mail_outbox.SENT: 2}
+    assert len(smtp.received) == 2
+
+
+def test_unreachable_server_keeps_mail_queued(tmp_path, smtp):
+    outbox = make_outbox(tmp_path, smtp, max_attempts=2)
+    smtp.shutdown()
+    smtp.server_close()
+    outbox.enqueue("school@example.com", "a@example.com", b"Subject: x\r\n\r\nbody")
+    outbox.start()
+    try:
+        wait_for(lambda: (attempts(outbox) or 0) > outbox.max_attempts)
+    finally:
+        outbox.stop(timeout=5)
+    assert outbox.stats() == {mail_outbox.PENDING: 1}
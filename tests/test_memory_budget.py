@@ -0,0 +1,72 @@
+"""
+raster PDF를 한 장씩 그려 인코딩하는 동안의 메모리가 benchmark_suite.MEMORY_BUDGETS 안에 드는지 확인합니다.
+
+파이썬 할당은 tracemalloc으로 이 프로세스에서 재고, Pillow 버퍼가 잡히는 RSS 최고치는
+MALLOC_MMAP_THRESHOLD_를 고정한 benchmark_suite 하위 프로세스로 잽니다(리눅스).
+"""
+import os
+import subprocess
+import sys
+import tracemalloc
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+
+import benchmark_suite
+import form_render
+
+TEMPLATES = ("consent.pdf", "transfer.pdf")
+
+
+@pytest.fixture
+def render_args(font_path, poppler):
+    consent_values, transfer_values, stamps = benchmark_suite.sample_render_inputs()
+    return consent_values, transfer_values, stamps, TEMPLATES, font_path
+
+
+def traced_peak(func, *args):
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def test_raster_pdf_renders_page_by_page_within_budget(render_args):
+    python_budget = benchmark_suite.MEMORY_BUDGETS["pdf_raster"][0] * 2**20
+    form_render.render_raster(*render_args)  # 템플릿·배치 캐시를 채웁니다.
+
+    data, peak = traced_peak(form_render.render_raster, *render_args)
+
+    assert len(PdfReader(BytesIO(data)).pages) == 2
+    assert peak <= python_budget, f"{peak / 2**20:.1f} MiB > {python_budget / 2**20:.0f} MiB"
+
+
+def test_budgeted_stages_stay_within_python_budget(render_args):
+    cases = benchmark_suite.build_cases(TEMPLATES, render_args[-1])
+    results = {}
+    for name in benchmark_suite.MEMORY_BUDGETS:
+        setup, func = cases[name]
+        func(*setup())
+        result = benchmark_suite.run_case(setup, func, runs=1)
+        # 이 프로세스는 MALLOC_MMAP_THRESHOLD_ 없이 떠 있어 RSS 수치가 흔들리므로 아래 테스트에서 따로 잽니다.
+        result["rss_peak_delta_bytes"] = None
+        results[name] = result
+
+    assert benchmark_suite.over_budget(results) == []
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RSS 최고치는 리눅스에서만 잽니다.")
+def test_budgeted_stages_stay_within_rss_budget(render_args, tmp_path):
+    env = {**os.environ, "MALLOC_MMAP_THRESHOLD_": benchmark_suite.MMAP_THRESHOLD}
+    command = [
+        sys.executable, "benchmark_suite.py", "--font", render_args[-1], "-n", "1",
+        "--baseline", str(tmp_path / "baseline.json"), "--only", *benchmark_suite.MEMORY_BUDGETS,
+    ]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, timeout=300)
+
+    assert "메모리 예산 초과" not in completed.stderr, completed.stderr
+    assert completed.returncode == 0, completed.stdout + completed.stderr
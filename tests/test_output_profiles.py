@@ -0,0 +1,121 @@
+"""
+raster 출력 프로필별로 PDF에 실제로 들어간 페이지 이미지를 꺼내, 색 모드와 color 프로필 대비 화질을 확인합니다.
+화질 지표는 benchmark_suite의 fidelity 시나리오와 같은 PSNR과 잉크 픽셀(밝기 128 미만) 불일치율입니다.
+"""
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+from pypdf import PdfReader
+
+import benchmark_suite
+import form_layout
+import form_render
+import pdf_raster
+
+TEMPLATES = ("consent.pdf", "transfer.pdf")
+
+
+def decoded(pdf_bytes):
+    return [page.images[0].image for page in PdfReader(BytesIO(pdf_bytes)).pages]
+
+
+def fidelity(reference, candidate):
+    def arrays(images):
+        return [np.asarray(image.convert("L"), dtype=np.float64) for image in images]
+    return benchmark_suite.fidelity(arrays(reference), arrays(candidate))
+
+
+@pytest.fixture
+def pages(font_path, poppler):
+    consent_values, transfer_values, stamps = benchmark_suite.sample_render_inputs()
+    return font_path, form_render.render_pages(consent_values, transfer_values, stamps, TEMPLATES, font_path)
+
+
+def render(pages, profile):
+    font_path, page_list = pages
+    return form_render.render_raster(None, None, None, TEMPLATES, font_path, pages=page_list, profile=profile)
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+def test_color_profile_writes_rgb_pages(mode):
+    page = Image.new(mode, (20, 30), "white")
+
+    assert form_render.prepare_page(page, form_render.get_profile("color")).mode == "RGB"
+    assert form_render.prepare_page(page, form_render.get_profile("gray")).mode == "L"
+    assert form_render.prepare_page(page, form_render.get_profile("bilevel")).mode == "1"
+
+
+@pytest.mark.parametrize("name, mode", [("color", "RGB"), ("gray", "L"), ("bilevel", "1")])
+def test_profile_sets_page_mode_and_resolution(pages, name, mode):
+    images = decoded(render(pages, name))
+
+    assert [image.mode for image in images] == [mode, mode]
+    assert [image.size for image in images] == [page.size for page in pages[1]]
+
+
+def test_color_profile_matches_drawn_pages(pages):
+    psnr, mismatch = fidelity(pages[1], decoded(render(pages, "color")))
+
+    assert psnr >= 35
+    assert mismatch <= 0.005
+
+
+@pytest.mark.parametrize("name, min_psnr", [("gray", 35), ("bilevel", 15)])
+def test_profiles_keep_ink_of_color_output(pages, name, min_psnr):
+    color_data, data = render(pages, "color"), render(pages, name)
+    psnr, mismatch = fidelity(decoded(color_data), decoded(data))
+
+    # 1비트는 회색 음영이 사라져 PSNR이 낮지만, 글자·선·서명(잉크)은 거의 그대로여야 합니다.
+    assert psnr >= min_psnr
+    assert mismatch <= 0.005
+    assert len(data) < len(color_data)
+
+
+def test_lower_dpi_profile_keeps_ink(pages):
+    profile = form_render.get_profile("gray", 150)
+    images = decoded(render(pages, profile))
+    scale = 150 / form_layout.LAYOUT_DPI
+    assert [image.size for image in images] == [
+        (round(page.width * scale), round(page.height * scale)) for page in pages[1]
+    ]
+
+    restored = [image.resize(page.size, Image.BILINEAR) for image, page in zip(images, pages[1])]
+    _, mismatch = fidelity(pages[1], restored)
+    assert mismatch <= 0.02
+
+
+def test_higher_dpi_profile_draws_at_that_dpi(pages):
+    font_path, page_list = pages
+    consent_values, transfer_values, stamps = benchmark_suite.sample_render_inputs()
+    profile = form_render.get_profile("gray", 300)
+
+    direct = decoded(form_render.render_raster(
+        consent_values, transfer_values, stamps, TEMPLATES, font_path, profile=profile))
+    upscaled = decoded(render(pages, profile))
+
+    assert [image.size for image in direct] == [
+        pdf_raster.get_template_page(path, dpi=300).size for path in TEMPLATES
+    ]
+
+    def blur(images):
+        # 잉크·선 픽셀 중 중간 밝기의 비율입니다. 키운 그림일수록 가장자리가 번져 커집니다.
+        arrays = [np.asarray(image.convert("L")) for image in images]
+        return np.mean([np.mean((a > 40) & (a < 215)) / np.mean(a < 215) for a in arrays])
+
+    assert blur(direct) < blur(upscaled) * 0.9
+
+
+def test_vector_backend_warns_about_output_profile(font_path, monkeypatch, caplog):
+    monkeypatch.setenv("OUTPUT_PROFILE", "gray")
+    monkeypatch.setattr(form_render, "OUTPUT_PROFILE", "gray")
+
+    with caplog.at_level("WARNING", logger="form_render"):
+        form_render.warm_up(TEMPLATES, font_path, backend="vector")
+    assert "OUTPUT_PROFILE" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level("WARNING", logger="form_render"):
+        form_render.warm_up(TEMPLATES, font_path, backend="raster")
+    assert "OUTPUT_PROFILE" not in caplog.text
@@ -0,0 +1,137 @@
+"""
+OverlayBase가 직접 쓰는 증분 갱신(xref·trailer)이 유효한지, pypdf로 다시 열어 확인합니다.
+"""
+import re
+from datetime import date
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+from reportlab.pdfgen.canvas import Canvas
+
+import form_render
+from pdf_overlay import OverlayBase
+
+TEMPLATES = ("consent.pdf", "transfer.pdf")
+
+
+@pytest.fixture(scope="module")
+def base():
+    sources = []
+    for path in TEMPLATES:
+        with open(path, "rb") as f:
+            sources.append((f.read(), 0))
+    return OverlayBase(sources)
+
+
+def make_overlay(base, texts):
+    buffer = BytesIO()
+    canvas = Canvas(buffer)
+    for text, (width, height) in zip(texts, base.page_sizes):
+        canvas.setPageSize((width, height))
+        canvas.setFont("Helvetica", 12)
+        canvas.drawString(72, height - 72, text)
+        canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
+
+
+def last_xref_entries(data):
+    """
+    마지막 xref 구역을 {객체 번호: 오프셋}으로 읽습니다.
+    """
+    start = int(data[data.rindex(b"startxref"):].split()[1])
+    lines = data[start:data.index(b"trailer", start)].decode().split("\n")[1:]
+    entries, number, index = {}, None, 0
+    while index < len(lines):
+        parts = lines[index].split()
+        index += 1
+        if len(parts) == 2:
+            number, count = map(int, parts)
+            for offset_line in lines[index:index + count]:
+                offset, _, kind = offset_line.split()
+                if kind == "n":
+                    entries[number] = int(offset)
+                number += 1
+            index += count
+    return entries
+
+
+def test_stamped_pdf_round_trips(base):
+    data = base.stamp(make_overlay(base, ["FIELD-CONSENT", "FIELD-TRANSFER"]))
+
+    reader = PdfReader(BytesIO(data), strict=True)
+    assert len(reader.pages) == 2
+    assert "FIELD-CONSENT" in reader.pages[0].extract_text()
+    assert "FIELD-TRANSFER" in reader.pages[1].extract_text()
+    assert "FIELD-TRANSFER" not in reader.pages[0].extract_text()
+    for page, (width, height) in zip(reader.pages, base.page_sizes):
+        assert (float(page.mediabox.width), float(page.mediabox.height)) == (width, height)
+    # 원본 페이지 내용은 그대로 두고 앞(q)과 뒤(오버레이)에 스트림 하나씩만 붙습니다.
+    for page, original in zip(reader.pages, base.pages):
+        assert len(page["/Contents"]) == len(original.contents) + 2
+
+
+def test_update_appends_to_the_base_unchanged(base):
+    data = base.stamp(make_overlay(base, ["A", "B"]))
+
+    assert data.startswith(base.data)
+    trailer = data[data.rindex(b"trailer"):]
+    assert re.search(rb"/Prev %d\b" % base.startxref, trailer)
+
+
+def test_xref_offsets_point_at_their_objects(base):
+    data = base.stamp(make_overlay(base, ["A", "B"]))
+
+    entries = last_xref_entries(data)
+    assert entries
+    for number, offset in entries.items():
+        assert data[offset:].startswith(b"%d 0 obj" % number)
+    size = int(re.search(rb"/Size (\d+)", data[data.rindex(b"trailer"):]).group(1))
+    assert max(entries) < size
+
+
+def test_second_update_on_the_same_base_stays_valid(base):
+    base_data = bytes(base.data)
+    first = base.stamp(make_overlay(base, ["FIRST-1", "FIRST-2"]))
+    second = base.stamp(make_overlay(base, ["SECOND-1", "SECOND-2"]))
+
+    assert base.data == base_data
+    reader = PdfReader(BytesIO(second), strict=True)
+    assert len(reader.pages) == 2
+    texts = [page.extract_text() for page in reader.pages]
+    assert "SECOND-1" in texts[0] and "SECOND-2" in texts[1]
+    assert not any("FIRST" in text for text in texts)
+    assert "FIRST-1" in PdfReader(BytesIO(first), strict=True).pages[0].extract_text()
+
+
+def test_overlay_page_count_must_match(base):
+    buffer = BytesIO()
+    Canvas(buffer).save()
+    with pytest.raises(ValueError):
+        base.stamp(buffer.getvalue())
+
+
+def test_render_vector_places_field_text(font_path):
+    applicant = {
+        "student_name": "한잎새",
+        "student_birth_date": date(2017, 1, 1),
+        "student_school": "대한초등학교 1학년",
+        "parent_name": "한나무",
+        "relationship": "부",
+        "parent_phone": "010-5678-5678",
+        "move_date": date(2025, 2, 2),
+        "address": "A-1 Block 101",
+        "transfer_date": date(2025, 3, 1),
+        "school_name": "민국초등학교",
+        "next_grade": "2학년",
+    }
+    consent_values, transfer_values = form_render.build_field_values(applicant)
+
+    data = form_render.render_vector(consent_values, transfer_values, {}, TEMPLATES, font_path)
+
+    reader = PdfReader(BytesIO(data), strict=True)
+    assert len(reader.pages) == 2
+    text = reader.pages[1].extract_text()
+    assert "010-5678-5678" in text
+    assert "A-1 Block 101" in text
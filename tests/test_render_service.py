@@ -0,0 +1,90 @@
+"""
+렌더링 서비스의 대기열 셈(대기열 한도, 대기 순번, 예상 대기 시간)을 확인합니다.
+작업 프로세스 대신 손으로 끝내는 Future를 돌려주는 실행기를 써서 작업이 끝나는 순서를 정합니다.
+"""
+from concurrent.futures import Future
+
+import pytest
+
+import render_service
+
+
+class ManualExecutor:
+    def __init__(self, **kwargs):
+        self.futures = []
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    monkeypatch.setattr(render_service, "ProcessPoolExecutor", ManualExecutor)
+
+    def make(workers=2, max_backlog=2):
+        return render_service.RenderService("font.ttf", workers=workers, max_backlog=max_backlog)
+    return make
+
+
+def submit(service):
+    return service.submit({}, None, ("consent.pdf", "transfer.pdf"))
+
+
+def finish(service, index, seconds):
+    service._executor.futures[index].set_result((None, seconds))
+
+
+def test_backlog_limit_raises_service_busy(make_service):
+    service = make_service(workers=2, max_backlog=2)
+    tickets = [submit(service) for _ in range(4)]
+
+    with pytest.raises(render_service.ServiceBusy):
+        submit(service)
+    assert service.stats() == {"workers": 2, "running": 2, "queued": 2, "max_backlog": 2}
+
+    finish(service, 0, 1.0)
+    tickets.append(submit(service))
+    assert service.stats()["queued"] == 2
+
+
+def test_position_counts_jobs_ahead(make_service):
+    service = make_service(workers=2, max_backlog=3)
+    tickets = [submit(service) for _ in range(5)]
+
+    assert [ticket.position() for ticket in tickets] == [0, 0, 1, 2, 3]
+
+    finish(service, 1, 1.0)
+    assert tickets[1].done() and tickets[1].position() == 0
+    assert [ticket.position() for ticket in tickets] == [0, 0, 0, 1, 2]
+
+
+def test_eta_uses_recent_durations(make_service):
+    service = make_service(workers=2, max_backlog=4)
+    tickets = [submit(service) for _ in range(6)]
+    assert tickets[2].eta() is None
+
+    finish(service, 0, 2.0)
+    finish(service, 1, 4.0)
+
+    # 남은 대기 순번 [0, 0, 1, 2], 평균 3초: 렌더링 중이면 한 번, 앞에 1~2건이면 두 번 기다립니다.
+    assert [ticket.eta() for ticket in tickets[2:]] == [3.0, 3.0, 6.0, 6.0]
+
+
+def test_failed_jobs_free_their_slot_without_skewing_eta(make_service):
+    service = make_service(workers=1, max_backlog=1)
+    first, second = submit(service), submit(service)
+
+    service._executor.futures[0].set_exception(RuntimeError("render failed"))
+
+    with pytest.raises(RuntimeError):
+        first.result()
+    assert second.position() == 0 and second.eta() is None
+    third = submit(service)
+    finish(service, 1, 5.0)
+    assert third.position() == 0 and third.eta() == 5.0
@@ -0,0 +1,116 @@
+"""
+학교 검색 색인(입력 중인 글자·겹받침·초성·띄어쓰기)과 조회표 피클 사이드카의 재사용·무효화를 확인합니다.
+"""
+import os
+import pickle
+
+import pandas as pd
+import pytest
+
+import school_directory
+
+SCHOOLS = [
+    ("서울", "민국초등학교", "minguk@example.com", None),
+    ("서울", "민들레초등학교", "mindle@example.com", "묶음 30"),
+    ("서울", "닭실초등학교", "dalsil@example.com", None),
+    ("서울", "달빛초등학교", "dalbit@example.com", None),
+    ("서울", "가람초등학교", "garam@example.com", None),
+    ("서울", "강남초등학교", "gangnam@example.com", "즉시"),
+    ("서울", "서울 대한초등학교", "daehan@example.com", None),
+    ("부산", "가야초등학교", "gaya@example.com", "아무때나"),
+]
+
+
+def write_directory(path, rows=SCHOOLS):
+    pd.DataFrame(rows, columns=[*school_directory.REQUIRED_COLUMNS, school_directory.DELIVERY_COLUMN]).to_excel(
+        path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def xlsx(tmp_path, monkeypatch):
+    monkeypatch.setattr(school_directory, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(school_directory, "_directories", {})
+    return write_directory(tmp_path / "schools.xlsx")
+
+
+@pytest.fixture
+def index():
+    return school_directory.SchoolIndex([name for region, name, _, _ in SCHOOLS if region == "서울"])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("민구", ["민국초등학교"]),  # 입력 중인 받침이 다음 글자의 초성이 될 수 있습니다.
+    ("달", ["닭실초등학교", "달빛초등학교"]),  # 겹받침 ㄺ은 ㄹ 다음에 ㄱ을 친 것입니다.
+    ("ㅁㄱㅊ", ["민국초등학교"]),
+    ("ㅁ", ["민국초등학교", "민들레초등학교"]),
+    ("가ㄹ", ["가람초등학교"]),
+    ("대한", ["서울 대한초등학교"]),  # 둘째 어절로도 찾습니다.
+    ("서울대", ["서울 대한초등학교"]),
+    ("초등", []),
+])
+def test_search_matches_prefix_as_typed(index, query, expected):
+    assert index.search(query) == expected
+
+
+def test_jamo_follow_key_order():
+    assert school_directory.to_jamo("닭 과") == "ㄷㅏㄹㄱㄱㅗㅏ"
+    assert school_directory.to_initials("민국초") == "ㅁㄱㅊ"
+
+
+def test_limit_caps_results(index):
+    assert index.search("", limit=3) == ["민국초등학교", "민들레초등학교", "닭실초등학교"]
+    assert len(index.search("ㄷ", limit=1)) == 1
+    assert index.search("가", limit=1) == ["가람초등학교"]
+
+
+def test_directory_tables_and_lazy_region_index(xlsx):
+    directory = school_directory.load_directory(xlsx)
+
+    assert directory.regions == ["부산", "서울"]
+    assert directory.email_for("가람초등학교") == "garam@example.com"
+    assert directory.delivery_for("민들레초등학교") == school_directory.Delivery("digest", 30)
+    assert directory.delivery_for("강남초등학교") == school_directory.IMMEDIATE
+    assert directory.delivery_for("가야초등학교") == school_directory.IMMEDIATE
+
+    assert directory._indexes == {}
+    assert directory.search("부산", "가") == ["가야초등학교"]
+    assert list(directory._indexes) == ["부산"]
+    assert directory.search("서울", "가") == ["가람초등학교", "강남초등학교"]
+    assert directory.search("제주", "가") == []
+
+
+def test_sidecar_is_reused_until_the_xlsx_changes(xlsx, monkeypatch):
+    build = school_directory._build
+    school_directory.load_directory(xlsx)
+    assert os.path.exists(school_directory._sidecar_path(os.path.abspath(xlsx)))
+
+    def no_rebuild(path):
+        raise AssertionError("사이드카가 있는데 xlsx를 다시 읽었습니다.")
+
+    monkeypatch.setattr(school_directory, "_directories", {})
+    monkeypatch.setattr(school_directory, "_build", no_rebuild)
+    assert school_directory.load_directory(xlsx).email_for("민국초등학교") == "minguk@example.com"
+
+    monkeypatch.setattr(school_directory, "_build", build)
+    write_directory(xlsx, [("서울", "민국초등학교", "new@example.com", None)])
+    stat = os.stat(xlsx)
+    os.utime(xlsx, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    directory = school_directory.load_directory(xlsx)
+    assert directory.email_for("민국초등학교") == "new@example.com"
+    assert directory.regions == ["서울"]
+
+
+def test_sidecar_without_delivery_table_is_rebuilt(xlsx, monkeypatch):
+    abs_path = os.path.abspath(xlsx)
+    sidecar = school_directory._sidecar_path(abs_path)
+    os.makedirs(os.path.dirname(sidecar))
+    with open(sidecar, "wb") as f:
+        pickle.dump({"source": abs_path, "signature": school_directory._file_signature(abs_path),
+                     "schools_by_region": {"서울": ["옛초등학교"]}, "email_by_school": {}}, f)
+
+    directory = school_directory.load_directory(xlsx)
+
+    assert "옛초등학교" not in directory.schools("서울")
+    assert directory.delivery_for("민들레초등학교").mode == "digest"
@@ -0,0 +1,144 @@
+"""
+가짜 gspread 클라이언트로 시트 기록기의 묶음 기록, 실패 후 저널 재전송, 워크시트 핸들 재사용(TTL)을 확인합니다.
+"""
+import time
+
+import pytest
+
+import sheets_logger
+
+
+class FakeWorksheet:
+    def __init__(self):
+        self.calls = []
+        self.fail_next = 0
+
+    def append_rows(self, rows, **kwargs):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise ConnectionError("quota exceeded")
+        self.calls.append(rows)
+
+    @property
+    def rows(self):
+        return [row for call in self.calls for row in call]
+
+
+class FakeClient:
+    """
+    gspread.Client처럼 open_by_key(...).worksheet(...)로 워크시트를 돌려주며, 연 횟수를 셉니다.
+    """
+
+    def __init__(self):
+        self.sheet = FakeWorksheet()
+        self.opens = 0
+
+    def open_by_key(self, key):
+        self.opens += 1
+        return self
+
+    def worksheet(self, name):
+        return self.sheet
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+def make_logger(tmp_path, client, **kwargs):
+    return sheets_logger.SheetsLogger(
+        lambda: client.open_by_key("spreadsheet-id").worksheet("Sheet1"),
+        str(tmp_path / "journal.sqlite3"),
+        **kwargs,
+    )
+
+
+def test_rows_are_written_in_batches(tmp_path, client):
+    logger = make_logger(tmp_path, client, batch_size=3)
+    for i in range(7):
+        logger.log(["2025-01-02 09:00:00", "민국초등학교", f"학생{i}", "2학년", "2025-03-01"])
+
+    assert client.sheet.calls == []
+    assert logger.flush() == 7
+    assert [len(call) for call in client.sheet.calls] == [3, 3, 1]
+    assert [row[2] for row in client.sheet.rows] == [f"학생{i}" for i in range(7)]
+    assert logger.pending_count() == 0
+
+
+def test_background_thread_flushes_when_a_batch_fills(tmp_path, client):
+    logger = make_logger(tmp_path, client, batch_size=2, flush_interval=60).start()
+    try:
+        logger.log(["a"])
+        logger.log(["b"])
+        deadline = time.monotonic() + 5
+        while not client.sheet.calls and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        logger.stop()
+    assert client.sheet.calls == [[["a"], ["b"]]]
+
+
+def test_failed_append_keeps_rows_for_replay(tmp_path, client):
+    logger = make_logger(tmp_path, client, batch_size=2)
+    for i in range(3):
+        logger.log([i])
+    client.sheet.fail_next = 1
+
+    with pytest.raises(ConnectionError):
+        logger.flush()
+    assert logger.pending_count() == 3
+
+    # 재시작한 프로세스처럼 같은 저널을 새 기록기로 열어도 남은 행이 순서대로 올라갑니다.
+    restarted = make_logger(tmp_path, client, batch_size=2)
+    assert restarted.flush() == 3
+    assert client.sheet.rows == [[0], [1], [2]]
+    assert restarted.pending_count() == 0
+
+
+def test_failure_after_partial_flush_only_replays_unwritten_rows(tmp_path, client):
+    logger = make_logger(tmp_path, client, batch_size=2)
+    for i in range(4):
+        logger.log([i])
+    original = client.sheet.append_rows
+
+    def fail_second_batch(rows, **kwargs):
+        if client.sheet.calls:
+            raise ConnectionError("timeout")
+        original(rows, **kwargs)
+
+    client.sheet.append_rows = fail_second_batch
+    with pytest.raises(ConnectionError):
+        logger.flush()
+    assert logger.pending_count() == 2
+
+    client.sheet.append_rows = original
+    assert logger.flush() == 2
+    assert client.sheet.rows == [[0], [1], [2], [3]]
+
+
+def test_worksheet_handle_is_reused_until_ttl(tmp_path, client):
+    logger = make_logger(tmp_path, client, handle_ttl=0.2)
+    for i in range(3):
+        logger.log([i])
+        logger.flush()
+    assert client.opens == 1
+
+    time.sleep(0.25)
+    logger.log([3])
+    logger.flush()
+    assert client.opens == 2
+
+
+def test_failed_append_reopens_the_worksheet(tmp_path, client):
+    logger = make_logger(tmp_path, client, handle_ttl=600)
+    logger.log([0])
+    logger.flush()
+    client.sheet.fail_next = 1
+    logger.log([1])
+    with pytest.raises(ConnectionError):
+        logger.flush()
+
+    logger.flush()
+    assert client.opens == 2
+    assert client.sheet.rows == [[0], [1]]
@@ -0,0 +1,57 @@
+"""
+미리 받은 서명 이미지로 도장을 만들 때, 알파가 없는 흰 바탕 이미지의 바탕이 투명해지는지 확인합니다.
+"""
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import signature
+from form_layout import SIGNATURE_BOX
+
+
+def white_signature(mode="RGB", paper="white"):
+    image = Image.new(mode, (600, 200), paper)
+    draw = ImageDraw.Draw(image)
+    draw.line([(60, 150), (200, 40), (330, 160), (540, 50)], fill="black" if mode != "RGB" else (20, 30, 120), width=8)
+    return image
+
+
+@pytest.mark.parametrize("mode", ["RGB", "L"])
+def test_white_background_becomes_transparent(mode):
+    stamp = signature.make_stamp(white_signature(mode))
+
+    assert stamp.size == SIGNATURE_BOX and stamp.mode == "RGBA"
+    alpha = np.asarray(stamp)[..., 3]
+    assert np.mean(alpha == 0) > 0.8
+    assert alpha.max() == 255
+
+
+def test_opaque_rgba_scan_and_paper_noise_are_transparent():
+    scan = white_signature("RGB", paper=(242, 240, 236)).convert("RGBA")
+
+    stamp = signature.make_stamp(scan)
+
+    alpha = np.asarray(stamp)[..., 3]
+    assert np.mean(alpha == 0) > 0.8
+    assert np.mean(alpha > 200) > 0.02
+
+
+def test_ink_keeps_its_color_over_white():
+    scan = white_signature("RGB")
+    array = signature._to_array(scan)
+
+    # 흰 바탕 위에 다시 얹으면 원본과 같습니다(바탕 잡음 PAPER_LEVEL 이상은 흰색이 됩니다).
+    page = Image.new("RGB", scan.size, "white")
+    layer = Image.fromarray(array, "RGBA")
+    page.paste(layer, (0, 0), layer)
+    assert np.abs(np.asarray(page, dtype=int) - np.asarray(scan, dtype=int)).max() <= 1
+
+
+def test_canvas_alpha_is_left_alone():
+    canvas = np.zeros((150, 300, 4), dtype=np.uint8)
+    canvas[60:90, 40:260] = (0, 0, 0, 255)
+
+    coverage, stamp = signature.process_signature(canvas, min_coverage=0)
+
+    assert coverage == pytest.approx(30 * 220 / (150 * 300))
+    assert np.asarray(stamp)[..., 3].max() == 255
@@ -0,0 +1,85 @@
+"""
+트래픽을 받기 전에 무거운 모듈과 캐시(학교 조회표, 샘플 이미지, 양식 페이지, 글꼴)를 미리 준비합니다.
+
+    python warmup.py    # 컨테이너 시작 시 디스크 캐시를 미리 만들고 단계별 소요 시간을 출력
+
+앱은 프로세스당 한 번 백그라운드 스레드에서 run()을 호출하며, 단계별 시간은 metrics에 기록됩니다.
+"""
+import importlib
+import sys
+import time
+
+import metrics
+
+# 1단계 이후에야 필요한 무거운 모듈입니다. 앱은 이들을 지연 import합니다.
+HEAVY_MODULES = (
+    "pandas",
+    "numpy",
+    "pdf2image",
+    "gspread",
+    "oauth2client.service_account",
+    "smtplib",
+    "email.mime.multipart",
+    "signature",
+    "mail_outbox",
+)
+
+
+def _import_modules():
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def default_steps(xlsx_path, samples, templates, font_path, render_in_process=True):
+    """
+    [(단계 이름, 함수), ...]를 반환합니다. samples는 [(pdf_path, dpi), ...], templates는 (동의서, 전입학예정확인서)입니다.
+    렌더링을 작업 프로세스(render_service)에 맡기면(render_in_process=False) 그쪽에서 양식·글꼴을 준비하므로 여기서는 건너뜁니다.
+    """
+    import form_render
+    import pdf_raster
+    import school_directory
+
+    steps = [
+        ("imports", _import_modules),
+        ("school_directory", lambda: school_directory.load_directory(xlsx_path)),
+        ("sample_images", lambda: pdf_raster.warm_up(samples)),
+    ]
+    if render_in_process:
+        steps.append(("templates_and_fonts", lambda: form_render.warm_up(templates, font_path)))
+    return steps
+
+
+def run(steps):
+    """
+    단계를 차례로 실행하고 [(단계 이름, 초, 오류 또는 None), ...]를 반환합니다.
+    한 단계가 실패해도 나머지는 계속하며, 실패한 캐시는 첫 요청 때 다시 만들어집니다.
+    """
+    timings = []
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            error = None
+        except Exception as e:
+            error = e
+        seconds = time.perf_counter() - start
+        metrics.observe("warmup_seconds", seconds, step=name)
+        timings.append((name, seconds, error))
+    metrics.observe("warmup_seconds", sum(seconds for _, seconds, _ in timings), step="total")
+    return timings
+
+
+if __name__ == "__main__":
+    results = run(default_steps(
+        "school_data.xlsx",
+        [("consent_sample.pdf", 150), ("transfer_sample.pdf", 150)],
+        ("consent.pdf", "transfer.pdf"),
+        "malgun.ttf",
+    ))
+    for name, seconds, error in results:
+        print(f"{name:<20} {seconds * 1000:8.1f} ms" + (f"  ({error})" if error else ""))
+    print(f"{'total':<20} {sum(seconds for _, seconds, _ in results) * 1000:8.1f} ms")
+    sys.exit(1 if any(error for _, _, error in results) else 0)